@@ -0,0 +1,362 @@
+"""
+ASGI Entry Point for Medical Symptom Checker
+============================================
+
+Serves POST /diagnose from an asyncio event loop. Requests that arrive
+within a short window are validated individually, scored together in one
+vectorized DiagnosisEngine.analyze_batch call, and answered as each
+request's result comes back. Every other route is passed through to the
+Flask app on a thread pool.
+
+Run with any ASGI server, for example:
+    uvicorn api.asgi:app --host 0.0.0.0 --port 8000
+
+Environment:
+    ASGI_BATCH_WINDOW_MS: How long to collect requests after the first one (default 2)
+    ASGI_MAX_BATCH: Flush a batch early once this many requests wait (default 256)
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import io
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import our modules
+parent_dir = Path(__file__).resolve().parent.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from app import (
+    app as flask_app, admission, analytics, engine_holder, shard_coordinator, build_diagnosis_payload,
+    validate_symptom_input
+)
+from utils.admission import request_queue_age
+from utils.metrics import metrics
+from utils.micro_batch import MicroBatcher
+from utils.response_encoder import ResponseEncoder, current_timestamp
+
+logger = logging.getLogger(__name__)
+
+INTERNAL_ERROR = {'error': 'Internal server error. Please try again.'}
+
+
+def diagnose_batch(items: List[Tuple[Any, Any, float, Any]]) -> List[Any]:
+    """
+    Score a micro-batch of validated /diagnose requests
+
+    Args:
+        items: (engines, symptoms_data, temperature, cache_key) per request
+
+    Returns:
+        Response payload (or the exception raised) per request, in order
+    """
+    # Requests validated before a hot swap keep the snapshot they started with
+    groups: Dict[int, List[int]] = OrderedDict()
+    for position, item in enumerate(items):
+        groups.setdefault(id(item[0]), []).append(position)
+
+    results: List[Any] = [None] * len(items)
+    for positions in groups.values():
+        engines = items[positions[0]][0]
+        symptoms_batch = [items[p][1] for p in positions]
+        temperatures = [items[p][2] for p in positions]
+        try:
+            diagnoses_batch = engines.diagnosis_engine.analyze_batch(
+                symptoms_batch,
+                temperatures,
+                min_confidence=flask_app.config['MIN_CONFIDENCE_THRESHOLD'],
+                top_k=flask_app.config['MAX_RESULTS']
+            )
+            recommendations_batch = engines.recommendation_engine.generate_batch(
+                diagnoses_batch, symptoms_batch, temperatures
+            )
+            for p, diagnoses, recommendations in zip(positions, diagnoses_batch, recommendations_batch):
+                _, symptoms_data, temperature, cache_key = items[p]
+                payload = build_diagnosis_payload(
+                    engines.diagnosis_engine, diagnoses, symptoms_data, temperature, recommendations
+                )
+                if cache_key is not None:
+                    engines.cache.put(cache_key, payload)
+                results[p] = payload
+        except Exception as e:
+            logger.error("Processing error: %s", e, exc_info=True)
+            for p in positions:
+                results[p] = e
+
+    logger.debug("Micro-batch completed: %d requests", len(items))
+    return results
+
+
+batcher = MicroBatcher(
+    diagnose_batch,
+    window=flask_app.config['ASGI_BATCH_WINDOW_MS'] / 1000,
+    max_batch=flask_app.config['ASGI_MAX_BATCH']
+)
+
+
+async def read_body(receive) -> bytes:
+    """Read the full request body, enforcing MAX_CONTENT_LENGTH"""
+    limit = flask_app.config['MAX_CONTENT_LENGTH']
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ConnectionError('client disconnected')
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if limit is not None and size > limit:
+            raise OverflowError('request body too large')
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def send_json(send, status: int, payload: Dict[str, Any], headers: Optional[List[Tuple[bytes, bytes]]] = None):
+    """Send a JSON response encoded the same way as Flask's jsonify"""
+    await send_body(send, status, f"{flask_app.json.dumps(payload)}\n".encode('utf-8'), headers)
+
+
+async def send_body(send, status: int, body: bytes, headers: Optional[List[Tuple[bytes, bytes]]] = None):
+    """Send an already encoded JSON response"""
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('latin-1')),
+        ] + (headers or []),
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def diagnose(scope, receive, send):
+    """Batched equivalent of the Flask /diagnose route"""
+    try:
+        body = await read_body(receive)
+    except ConnectionError:
+        return
+    except OverflowError:
+        return await send_json(send, 413, {'error': 'Request body too large'})
+
+    status, payload, encoder = await diagnose_payload(body, scope)
+    if metrics.enabled:
+        metrics.inc('requests_total', route='/diagnose', status=str(status))
+    if encoder is not None:
+        await send_body(send, status, encoder.encode_payload(payload))
+    elif 'retry_after' in payload:
+        await send_json(send, status, payload, [(b'retry-after', str(payload['retry_after']).encode('latin-1'))])
+    else:
+        await send_json(send, status, payload)
+
+
+def scope_header(scope: Dict[str, Any], name: str) -> Optional[str]:
+    """First value of a request header (case-insensitive), or None"""
+    name = name.lower().encode('latin-1')
+    for key, value in scope.get('headers', []):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def scope_client(scope: Dict[str, Any]) -> str:
+    """Client key for per-client rate limiting, like the Flask app's client_identity"""
+    header = flask_app.config['ADMISSION_CLIENT_HEADER']
+    if header:
+        # For X-Forwarded-For style lists, the first entry is the client
+        value = (scope_header(scope, header) or '').split(',')[0].strip()
+        if value:
+            return value
+    return (scope.get('client') or ('unknown', 0))[0] or 'unknown'
+
+
+def shed_payload(ticket) -> Tuple[int, Dict[str, Any], None]:
+    """429/503 payload for a request turned away by admission control"""
+    if metrics.enabled:
+        metrics.inc('admission_rejected_total', reason=ticket.reason)
+    if ticket.status == 429:
+        message = 'Too many requests. Please slow down and try again.'
+    else:
+        message = 'Server is busy. Please try again shortly.'
+    return ticket.status, {'error': message, 'retry_after': ticket.retry_after}, None
+
+
+async def diagnose_payload(
+    body: bytes,
+    scope: Dict[str, Any]
+) -> Tuple[int, Dict[str, Any], Optional[ResponseEncoder]]:
+    """
+    Validate, admit, look up and (if needed) batch-score one request body
+
+    Returns:
+        Tuple of (status, payload, encoder of the snapshot that produced
+        the payload, or None for error payloads)
+    """
+    timer = metrics.timer('/diagnose')
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return 400, {'error': 'Request body must be valid JSON'}, None
+
+    try:
+        # Use one engine snapshot for the whole request
+        engines = engine_holder.current
+        temperature, symptoms_data = validate_symptom_input(data, engines)
+        timer.mark('validate')
+
+        # Raw client identity for the population statistics
+        client = None
+        if analytics.enabled:
+            header = flask_app.config['ADMISSION_CLIENT_HEADER']
+            client = (header and scope_header(scope, header)) or (scope.get('client') or (None, 0))[0]
+
+        if not admission.enabled:
+            return await admitted_payload(engines, temperature, symptoms_data, timer, client)
+
+        # Admission control before joining a batch; critical symptoms take
+        # the priority lane. Only a request that must queue for a slot
+        # leaves the event loop (the wait blocks a worker thread).
+        critical = bool(engines.recommendation_engine.check_critical_symptoms(symptoms_data, temperature))
+        ticket = admission.admit(
+            scope_client(scope), critical, request_queue_age(scope_header(scope, 'X-Request-Start')), block=False
+        )
+        if ticket is None:
+            waiting = asyncio.get_running_loop().run_in_executor(None, admission.wait_for_slot)
+            try:
+                ticket = await asyncio.shield(waiting)
+            except asyncio.CancelledError:
+                # Give back a slot granted after the request went away
+                waiting.add_done_callback(lambda f: f.cancelled() or f.exception() or f.result().release())
+                raise
+        timer.mark('admission')
+        if not ticket.admitted:
+            return shed_payload(ticket)
+        try:
+            return await admitted_payload(engines, temperature, symptoms_data, timer, client)
+        finally:
+            ticket.release()
+
+    except ValueError as e:
+        logger.warning("Validation error: %s", e)
+        return 400, {'error': str(e)}, None
+    except Exception as e:
+        logger.error("Processing error: %s", e, exc_info=True)
+        return 500, INTERNAL_ERROR, None
+
+
+async def admitted_payload(
+    engines,
+    temperature: float,
+    symptoms_data,
+    timer,
+    client: Optional[str] = None
+) -> Tuple[int, Dict[str, Any], Optional[ResponseEncoder]]:
+    """Cache lookup or micro-batched diagnosis of one validated, admitted request"""
+    # Serve repeated symptom profiles without joining a batch
+    cache_key = None
+    if engines.cache.enabled:
+        cache_key = engines.cache.make_key(symptoms_data, temperature)
+        cached = engines.cache.get(cache_key) if cache_key is not None else None
+        timer.mark('cache')
+        if cached is not None:
+            if analytics.enabled:
+                analytics.record(client, cached['diagnoses'], symptoms_data)
+            timer.finish()
+            return 200, {**cached, 'timestamp': current_timestamp()}, engines.encoder
+
+    payload = await batcher.submit((engines, symptoms_data, temperature, cache_key))
+    timer.mark('batch')
+    if analytics.enabled:
+        analytics.record(client, payload['diagnoses'], symptoms_data)
+    timer.finish()
+    return 200, payload, engines.encoder
+
+
+def call_wsgi(scope: Dict[str, Any], body: bytes) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    """Run one request through the Flask app (PEP 3333) and collect the response"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key == 'CONTENT_LENGTH':
+            continue
+        if key != 'CONTENT_TYPE':
+            key = f'HTTP_{key}'
+        value = value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+    iterable = flask_app(environ, start_response)
+    try:
+        content = b''.join(iterable)
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+    return response['status'], response['headers'], content
+
+
+async def passthrough(scope, receive, send):
+    """Serve any other route with the Flask app on a worker thread"""
+    try:
+        body = await read_body(receive)
+    except ConnectionError:
+        return
+    except OverflowError:
+        return await send_json(send, 413, {'error': 'Request body too large'})
+
+    status, headers, content = await asyncio.get_running_loop().run_in_executor(
+        None, call_wsgi, scope, body
+    )
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': content})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            batcher.close()
+            logger.info(f"Micro-batching stats: {batcher.stats()}")
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    # A shard coordinator has no local catalog to batch-score: the Flask
+    # route fans each request out to the shards
+    if scope['path'] == '/diagnose' and scope['method'] == 'POST' and shard_coordinator is None:
+        return await diagnose(scope, receive, send)
+    return await passthrough(scope, receive, send)
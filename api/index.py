@@ -1,6 +1,10 @@
 """
 Vercel Serverless Function Handler for Medical Symptom Checker
 """
+import time
+
+_import_started = time.perf_counter()
+
 import os
 import sys
 import logging
@@ -9,59 +13,81 @@ from pathlib import Path
 # Set Vercel environment variable FIRST
 os.environ['VERCEL'] = '1'
 
-# Configure logging for Vercel with more detail
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+# Add the parent directory to the path so we can import our modules
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+
+# Insert parent directory at the beginning of the path
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+# Lean startup (the default on Vercel) skips the diagnostic logging and
+# directory listings below; set LEAN_STARTUP=0 to debug a broken deployment
+from config import LEAN_STARTUP, LOG_LEVEL, LOG_FORMAT, ASYNC_LOGGING, LOG_QUEUE_SIZE
+from utils.logging_setup import configure_logging
+
+# Configure logging before the app does, with more detail unless lean;
+# force replaces any handler the Vercel runtime installed on the root logger
+configure_logging(
+    LOG_LEVEL if LEAN_STARTUP else 'DEBUG',
+    LOG_FORMAT,
+    async_logging=ASYNC_LOGGING,
+    queue_size=LOG_QUEUE_SIZE,
     force=True
 )
 logger = logging.getLogger(__name__)
 
-# Log Python environment info
-logger.info(f"Python version: {sys.version}")
-logger.info(f"Python executable: {sys.executable}")
-logger.info(f"Current working directory: {os.getcwd()}")
+if not LEAN_STARTUP:
+    # Log Python environment info
+    logger.info(f"Python version: {sys.version}")
+    logger.info(f"Python executable: {sys.executable}")
+    logger.info(f"Current working directory: {os.getcwd()}")
 
 try:
-    # Add the parent directory to the path so we can import our modules
-    current_dir = Path(__file__).resolve().parent
-    parent_dir = current_dir.parent
-    
-    # Insert parent directory at the beginning of the path
-    if str(parent_dir) not in sys.path:
-        sys.path.insert(0, str(parent_dir))
-
-    logger.info(f"Current dir: {current_dir}")
-    logger.info(f"Parent dir: {parent_dir}")
-    logger.info(f"sys.path: {sys.path}")
-    
-    # Check what files exist
-    try:
-        logger.info(f"Files in parent: {list(parent_dir.iterdir())}")
-        data_dir = parent_dir / 'data'
-        if data_dir.exists():
-            logger.info(f"Data directory exists: {data_dir}")
-            logger.info(f"Files in data: {list(data_dir.iterdir())}")
-        else:
-            logger.error(f"Data directory NOT found at: {data_dir}")
-    except Exception as e:
-        logger.error(f"Error listing files: {e}")
+    if not LEAN_STARTUP:
+        logger.info(f"Current dir: {current_dir}")
+        logger.info(f"Parent dir: {parent_dir}")
+        logger.info(f"sys.path: {sys.path}")
+
+        # Check what files exist
+        try:
+            logger.info(f"Files in parent: {list(parent_dir.iterdir())}")
+            data_dir = parent_dir / 'data'
+            if data_dir.exists():
+                logger.info(f"Data directory exists: {data_dir}")
+                logger.info(f"Files in data: {list(data_dir.iterdir())}")
+            else:
+                logger.error(f"Data directory NOT found at: {data_dir}")
+        except Exception as e:
+            logger.error(f"Error listing files: {e}")
+
+        logger.info("Attempting to import Flask app...")
 
     # Import the Flask app from the parent directory
-    logger.info("Attempting to import Flask app...")
     from app import app as flask_app
-    logger.info("Flask app imported successfully")
-    logger.info(f"App config FLASK_ENV: {flask_app.config.get('FLASK_ENV')}")
+
+    if not LEAN_STARTUP:
+        logger.info("Flask app imported successfully")
+        logger.info(f"App config FLASK_ENV: {flask_app.config.get('FLASK_ENV')}")
+
+    # Report cold start cost as a metric
+    startup_timings = flask_app.config.setdefault('STARTUP_TIMINGS', {})
+    startup_timings['import_ms'] = round((time.perf_counter() - _import_started) * 1000, 2)
+    logger.info(
+        f"Cold start metrics: import_ms={startup_timings['import_ms']} "
+        f"init_ms={startup_timings.get('init_ms')} "
+        f"knowledge_base={startup_timings.get('knowledge_base_source')}"
+    )
 
 except Exception as e:
     logger.error(f"CRITICAL ERROR during import: {e}", exc_info=True)
     logger.error(f"Error type: {type(e).__name__}")
     logger.error(f"Error args: {e.args}")
-    
+
     # Create a minimal error app that shows the actual error
     from flask import Flask, jsonify
     flask_app = Flask(__name__)
-    
+
     error_details = {
         'error': 'Application failed to initialize',
         'error_type': type(e).__name__,
@@ -70,7 +96,7 @@ except Exception as e:
         'cwd': os.getcwd(),
         'sys_path': sys.path[:5],  # First 5 entries
     }
-    
+
     @flask_app.route('/')
     @flask_app.route('/<path:path>')
     def error_handler(path=''):
@@ -79,5 +105,5 @@ except Exception as e:
 
 # This is the WSGI application entry point for Vercel
 app = flask_app
-logger.info("API module initialization complete")
-
+if not LEAN_STARTUP:
+    logger.info("API module initialization complete")
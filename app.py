@@ -21,10 +21,14 @@ Version: 2.0 (Production Ready)
 
 import os
 import sys
+import hmac
+import time
 import logging
+from typing import Optional
 from pathlib import Path
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 
 # Fix imports for Vercel serverless environment
 if os.environ.get('VERCEL'):
@@ -32,52 +36,167 @@ if os.environ.get('VERCEL'):
     current_dir = Path(__file__).resolve().parent
     if str(current_dir) not in sys.path:
         sys.path.insert(0, str(current_dir))
-    logger_temp = logging.getLogger(__name__)
-    logger_temp.info(f"Vercel environment detected. Working dir: {current_dir}")
 
-from config import config, DATA_DIR
-from utils import DataLoader, DiagnosisEngine, RecommendationEngine
+from config import (
+    config, DATA_DIR, KB_SNAPSHOT, LEAN_STARTUP, USE_KB_SNAPSHOT,
+    LOG_LEVEL, LOG_FORMAT, ASYNC_LOGGING, LOG_QUEUE_SIZE, LOG_SAMPLE_RATE
+)
+from utils import (
+    AdmissionController, DataLoader, EngineHolder, KnowledgeBaseWatcher, PopulationAnalytics, RequestLogSampler,
+    SessionStore, ShardCoordinator, build_diagnosis_payload
+)
+from utils.admission import request_queue_age
+from utils.sharding import ShardsUnavailableError
+from utils.logging_setup import configure_logging, dropped_records
+from utils.response_encoder import current_timestamp
+from utils.results import DiagnosisResult
+from utils.metrics import metrics
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging(LOG_LEVEL, LOG_FORMAT, async_logging=ASYNC_LOGGING, queue_size=LOG_QUEUE_SIZE)
 logger = logging.getLogger(__name__)
 
+# Only a sample of requests write their summary line
+request_log = RequestLogSampler(LOG_SAMPLE_RATE)
+
+if os.environ.get('VERCEL') and not LEAN_STARTUP:
+    logger.info(f"Vercel environment detected. Working dir: {Path(__file__).resolve().parent}")
+
+
+class ApiJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that also serializes DiagnosisResult records"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, DiagnosisResult):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+
 # Initialize Flask app
+init_started = time.perf_counter()
 app = Flask(__name__)
+app.json = ApiJSONProvider(app)
 env = os.environ.get('FLASK_ENV', 'production' if os.environ.get('VERCEL') else 'development')
 app.config.from_object(config[env])
 
-logger.info(f"Starting initialization in {env} mode")
-logger.info(f"BASE_DIR from config: {config[env].__dict__ if hasattr(config[env], '__dict__') else 'N/A'}")
+if not LEAN_STARTUP:
+    logger.info(f"Starting initialization in {env} mode")
+    logger.info(f"BASE_DIR from config: {config[env].__dict__ if hasattr(config[env], '__dict__') else 'N/A'}")
 
 # Initialize data loader and engines
 try:
-    logger.info(f"DATA_DIR path: {DATA_DIR}")
-    logger.info(f"DATA_DIR exists: {DATA_DIR.exists()}")
-    
-    if DATA_DIR.exists():
-        logger.info(f"Files in DATA_DIR: {list(DATA_DIR.iterdir())}")
-    
-    data_loader = DataLoader(DATA_DIR)
-    logger.info("DataLoader created")
-    
-    disease_database = data_loader.get_diseases()
-    logger.info(f"Diseases loaded: {len(disease_database)} diseases")
-    
-    recommendations_config = data_loader.get_recommendations_config()
-    logger.info("Recommendations config loaded")
-
-    diagnosis_engine = DiagnosisEngine(disease_database)
-    logger.info("DiagnosisEngine initialized")
-    
-    recommendation_engine = RecommendationEngine(recommendations_config)
-    logger.info("RecommendationEngine initialized")
-
-    logger.info(f"Application initialized successfully in {env} mode")
-    logger.info(f"Loaded {len(disease_database)} diseases from database")
+    if not LEAN_STARTUP:
+        logger.info(f"DATA_DIR path: {DATA_DIR}")
+        logger.info(f"DATA_DIR exists: {DATA_DIR.exists()}")
+
+        if DATA_DIR.exists():
+            logger.info(f"Files in DATA_DIR: {list(DATA_DIR.iterdir())}")
+
+    data_loader = DataLoader(DATA_DIR, diagnostics=not LEAN_STARTUP)
+
+    if app.config['METRICS_ENABLED']:
+        metrics.enable()
+
+    # Engines live in an immutable snapshot that hot reloads swap atomically;
+    # prefer the memory-mapped knowledge base snapshot over parsing JSON
+    engine_holder = EngineHolder(
+        data_loader,
+        cache_size=app.config['RESULT_CACHE_SIZE'],
+        cache_ttl=app.config['RESULT_CACHE_TTL'],
+        snapshot_path=KB_SNAPSHOT if USE_KB_SNAPSHOT else None,
+        min_temperature=app.config['MIN_TEMPERATURE'],
+        max_temperature=app.config['MAX_TEMPERATURE'],
+        scoring_processes=app.config['SCORING_PROCESSES'],
+        scoring_chunk_size=app.config['SCORING_CHUNK_SIZE'],
+        scoring_min_diseases=app.config['SCORING_MIN_DISEASES'],
+        coordinator=bool(app.config['SHARD_ADDRESSES'])
+    )
+    engines = engine_holder.load()
+
+    if app.config['KB_WATCH_INTERVAL'] > 0:
+        KnowledgeBaseWatcher(
+            engine_holder,
+            [DATA_DIR / filename for filename in DataLoader.SOURCE_FILES] + [KB_SNAPSHOT],
+            interval=app.config['KB_WATCH_INTERVAL']
+        ).start()
+
+    # Incremental re-diagnosis sessions outlive knowledge base reloads; they
+    # rescore on the local catalog, which a shard coordinator does not hold
+    session_store = SessionStore(
+        0 if app.config['SHARD_ADDRESSES'] else app.config['DIAGNOSIS_SESSIONS'],
+        app.config['DIAGNOSIS_SESSION_TTL']
+    )
+
+    # Load shedding for /diagnose (per process)
+    admission = AdmissionController(
+        enabled=app.config['ADMISSION_CONTROL'],
+        max_in_flight=app.config['ADMISSION_MAX_IN_FLIGHT'],
+        initial_limit=app.config['ADMISSION_INITIAL_LIMIT'],
+        latency_target=app.config['ADMISSION_LATENCY_TARGET_MS'] / 1000,
+        max_queue=app.config['ADMISSION_MAX_QUEUE'],
+        queue_timeout=app.config['ADMISSION_QUEUE_TIMEOUT_MS'] / 1000,
+        rate=app.config['ADMISSION_RATE'],
+        burst=app.config['ADMISSION_BURST'],
+        max_queue_age=app.config['ADMISSION_MAX_QUEUE_AGE_MS'] / 1000
+    )
+
+    # Population statistics for /stats, folded in off the request thread
+    analytics = PopulationAnalytics(
+        enabled=app.config['ANALYTICS_ENABLED'],
+        window_seconds=app.config['ANALYTICS_WINDOW_SECONDS'],
+        buckets=app.config['ANALYTICS_BUCKETS'],
+        width=app.config['ANALYTICS_SKETCH_WIDTH'],
+        depth=app.config['ANALYTICS_SKETCH_DEPTH'],
+        max_pending=app.config['ANALYTICS_MAX_PENDING']
+    )
+    analytics.start()
+    # WSGI environ key of the client identity (raw; the analytics thread parses it)
+    analytics_client_key = (
+        'HTTP_' + app.config['ADMISSION_CLIENT_HEADER'].upper().replace('-', '_')
+        if app.config['ADMISSION_CLIENT_HEADER'] else 'REMOTE_ADDR'
+    )
+
+    # Coordinator mode: /diagnose scores on shard processes (python cli.py shard)
+    shard_coordinator = None
+    if app.config['SHARD_ADDRESSES']:
+        shard_coordinator = ShardCoordinator(app.config['SHARD_ADDRESSES'], timeout=app.config['SHARD_TIMEOUT'])
+        logger.info("Coordinating %d diagnosis shards", shard_coordinator.shard_count)
+
+    app.config['STARTUP_TIMINGS'] = {
+        'init_ms': round((time.perf_counter() - init_started) * 1000, 2),
+        'knowledge_base_source': engines.source
+    }
+
+    def collect_app_metrics(registry):
+        """Export startup timings and the current result cache size"""
+        for phase in ('init', 'import'):
+            if f'{phase}_ms' in app.config['STARTUP_TIMINGS']:
+                registry.set_gauge('startup_seconds', app.config['STARTUP_TIMINGS'][f'{phase}_ms'] / 1000, phase=phase)
+
+        registry.set_gauge('result_cache_entries', engine_holder.current.cache.stats()['size'])
+        registry.set_gauge('log_records_dropped_total', dropped_records())
+
+        session_stats = session_store.stats()
+        registry.set_gauge('diagnosis_sessions_active', session_stats['active'])
+        registry.set_gauge('diagnosis_sessions_created_total', session_stats['created'])
+
+        if admission.enabled:
+            admission_stats = admission.stats()
+            registry.set_gauge('admission_concurrency_limit', admission_stats['limit'])
+            registry.set_gauge('admission_in_flight', admission_stats['in_flight'])
+            registry.set_gauge('admission_queued', admission_stats['queued'])
+            registry.set_gauge('admission_critical_total', admission_stats['critical'])
+
+        if analytics.enabled:
+            registry.set_gauge('analytics_pending_events', analytics.pending)
+            registry.set_gauge('analytics_dropped_events_total', analytics.dropped)
+
+    metrics.add_collector(collect_app_metrics)
+
+    if not LEAN_STARTUP:
+        logger.info(f"Application initialized successfully in {env} mode")
+    logger.info(f"Initialized in {app.config['STARTUP_TIMINGS']['init_ms']} ms")
 except Exception as e:
     logger.error(f"Failed to initialize application: {e}", exc_info=True)
     logger.error(f"Current working directory: {Path.cwd()}")
@@ -85,58 +204,23 @@ except Exception as e:
     raise
 
 
-def validate_symptom_input(data: dict) -> tuple:
+def validate_symptom_input(data: dict, engines=None) -> tuple:
     """
     Validate and extract symptom data from request
 
     Args:
         data: Request JSON data
+        engines: Engine snapshot serving the request (defaults to the current one)
 
     Returns:
         Tuple of (temperature, symptoms_data) or raises ValueError
     """
-    try:
-        temperature = float(data.get('temperature', 36.6))
-
-        # Validate temperature range
-        if not (app.config['MIN_TEMPERATURE'] <= temperature <= app.config['MAX_TEMPERATURE']):
-            raise ValueError(f"Temperature must be between {app.config['MIN_TEMPERATURE']}°C and {app.config['MAX_TEMPERATURE']}°C")
-
-        # Extract all symptoms
-        symptoms_data = {
-            'fever': int(data.get('fever', 0)),
-            'body_ache': int(data.get('body_ache', 0)),
-            'headache': int(data.get('headache', 0)),
-            'stuffy_nose': int(data.get('stuffy_nose', 0)),
-            'runny_nose': int(data.get('runny_nose', 0)),
-            'cough': int(data.get('cough', 0)),
-            'fatigue': int(data.get('fatigue', 0)),
-            'sore_throat': int(data.get('sore_throat', 0)),
-            'difficulty_breathing': int(data.get('difficulty_breathing', 0)),
-            'chest_pain': int(data.get('chest_pain', 0)),
-            'loss_of_taste': int(data.get('loss_of_taste', 0)),
-            'nausea': int(data.get('nausea', 0)),
-            'chills': int(data.get('chills', 0)),
-            'sneezing': int(data.get('sneezing', 0)),
-            'watery_eyes': int(data.get('watery_eyes', 0)),
-            'itchy_eyes': int(data.get('itchy_eyes', 0)),
-            'facial_pain': int(data.get('facial_pain', 0)),
-            'difficulty_swallowing': int(data.get('difficulty_swallowing', 0)),
-            'swollen_lymph': int(data.get('swollen_lymph', 0)),
-            'sensitivity_light': int(data.get('sensitivity_light', 0)),
-            'sensitivity_sound': int(data.get('sensitivity_sound', 0)),
-            'confusion': int(data.get('confusion', 0))
-        }
-
-        # Validate symptom ranges (0-10)
-        for symptom, value in symptoms_data.items():
-            if not (0 <= value <= 10):
-                raise ValueError(f"Symptom '{symptom}' must be between 0 and 10")
-
-        return temperature, symptoms_data
-
-    except (ValueError, TypeError) as e:
-        raise ValueError(f"Invalid input data: {str(e)}")
+    return (engines or engine_holder.current).validator.parse(data)
+
+
+def json_response(body: bytes) -> Response:
+    """Wrap an already encoded JSON document"""
+    return Response(body, mimetype='application/json')
 
 
 @app.route('/')
@@ -144,6 +228,34 @@ def index():
     return render_template('index.html')
 
 
+def client_identity() -> str:
+    """Client key for per-client rate limiting"""
+    header = app.config['ADMISSION_CLIENT_HEADER']
+    if header:
+        # For X-Forwarded-For style lists, the first entry is the client
+        value = request.headers.get(header, '').split(',')[0].strip()
+        if value:
+            return value
+    return request.remote_addr or 'unknown'
+
+
+def retry_later_response(status: int, message: str, retry_after: int) -> Response:
+    """JSON error with a Retry-After header"""
+    response = jsonify({'error': message, 'retry_after': retry_after})
+    response.status_code = status
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def shed_response(admission) -> Response:
+    """Fast 429/503 for a request turned away by admission control"""
+    if admission.status == 429:
+        message = 'Too many requests. Please slow down and try again.'
+    else:
+        message = 'Server is busy. Please try again shortly.'
+    return retry_later_response(admission.status, message, admission.retry_after)
+
+
 @app.route('/diagnose', methods=['POST'])
 def get_diagnosis():
     """
@@ -152,55 +264,400 @@ def get_diagnosis():
     Returns:
         JSON response with diagnoses and recommendations
     """
+    timer = metrics.timer('/diagnose')
     try:
+        # Use one engine snapshot for the whole request
+        engines = engine_holder.current
+
+        # Resolve the request proxy once; each access through it costs ~0.5us
+        current_request = request._get_current_object()
+
         # Validate and extract input data
-        temperature, symptoms_data = validate_symptom_input(request.json)
+        temperature, symptoms_data = validate_symptom_input(current_request.json, engines)
+        timer.mark('validate')
+
+        # Raw client identity for the population statistics
+        client = None
+        if analytics.enabled:
+            environ = current_request.environ
+            client = environ.get(analytics_client_key) or environ.get('REMOTE_ADDR')
+
+        if not admission.enabled:
+            return diagnose_response(engines, temperature, symptoms_data, timer, client)
+
+        # Admission control; critical symptoms take the priority lane
+        critical = bool(engines.recommendation_engine.check_critical_symptoms(symptoms_data, temperature))
+        ticket = admission.admit(
+            client_identity(), critical, request_queue_age(current_request.headers.get('X-Request-Start'))
+        )
+        timer.mark('admission')
+        if not ticket.admitted:
+            if metrics.enabled:
+                metrics.inc('admission_rejected_total', reason=ticket.reason)
+            return shed_response(ticket)
+        try:
+            return diagnose_response(engines, temperature, symptoms_data, timer, client)
+        finally:
+            ticket.release()
 
-        # Perform diagnosis
-        diagnoses = diagnosis_engine.analyze_symptoms(
+    except ValueError as e:
+        logger.warning("Validation error: %s", e)
+        return jsonify({'error': str(e)}), 400
+    except ShardsUnavailableError as e:
+        logger.error("Diagnosis unavailable: %s", e)
+        return retry_later_response(
+            503, 'Diagnosis is temporarily unavailable. Please try again shortly.', e.retry_after
+        )
+    except Exception as e:
+        logger.error("Processing error: %s", e, exc_info=True)
+        return jsonify({'error': 'Internal server error. Please try again.'}), 500
+
+
+def diagnose_response(engines, temperature: float, symptoms_data, timer, client: Optional[str] = None) -> Response:
+    """Diagnose one validated /diagnose request and encode the response"""
+    diagnosis_cache = engines.cache
+
+    # Serve repeated symptom profiles from the cache
+    cache_key = None
+    if diagnosis_cache.enabled:
+        cache_key = diagnosis_cache.make_key(symptoms_data, temperature)
+        cached = diagnosis_cache.get(cache_key) if cache_key is not None else None
+        timer.mark('cache')
+        if cached is not None:
+            if analytics.enabled:
+                analytics.record(client, cached['diagnoses'], symptoms_data)
+            response = json_response(engines.encoder.encode_payload(cached, current_timestamp()))
+            timer.mark('serialize')
+            timer.finish()
+            return response
+
+    # Perform diagnosis (on the shards in coordinator mode)
+    missing_shards = None
+    if shard_coordinator is not None:
+        diagnoses, missing_shards = shard_coordinator.diagnose(
+            symptoms_data,
+            temperature,
+            min_confidence=app.config['MIN_CONFIDENCE_THRESHOLD'],
+            top_k=app.config['MAX_RESULTS']
+        )
+    else:
+        diagnoses = engines.diagnosis_engine.analyze_symptoms(
             symptoms_data,
             temperature,
-            min_confidence=app.config['MIN_CONFIDENCE_THRESHOLD']
+            min_confidence=app.config['MIN_CONFIDENCE_THRESHOLD'],
+            top_k=app.config['MAX_RESULTS']
         )
+    timer.mark('analyze')
+
+    # Generate recommendations
+    recommendations = engines.recommendation_engine.generate_recommendations(
+        diagnoses, symptoms_data, temperature
+    )
+    timer.mark('recommend')
+
+    if analytics.enabled:
+        analytics.record(client, diagnoses, symptoms_data)
+
+    response = build_diagnosis_payload(
+        engines.diagnosis_engine, diagnoses, symptoms_data, temperature, recommendations
+    )
+    if missing_shards:
+        # Shards that timed out or failed are left out, never cached
+        response['partial'] = True
+        response['missing_shards'] = missing_shards
+    elif cache_key is not None:
+        diagnosis_cache.put(cache_key, response)
+    timer.mark('severity')
+
+    overall_severity = response['overall_severity']
+    response = json_response(engines.encoder.encode_payload(response))
+    timer.mark('serialize')
+    timer.finish()
+
+    if request_log.sampled():
+        logger.info("Diagnosis completed: %d matches, severity: %s", len(diagnoses), overall_severity)
+    return response
+
+
+@app.route('/diagnose/batch', methods=['POST'])
+def get_batch_diagnosis():
+    """
+    Process many symptom records in one request
 
-        # Limit to max results
-        diagnoses = diagnoses[:app.config['MAX_RESULTS']]
+    Expects {"records": [...]} where each record has the same fields as a
+    /diagnose request. Invalid records are reported individually and do not
+    fail the rest of the batch.
 
-        # Assess overall severity
-        overall_severity = diagnosis_engine.assess_overall_severity(
-            diagnoses, symptoms_data, temperature
+    Returns:
+        JSON response with one result or error per record, in input order
+    """
+    timer = metrics.timer('/diagnose/batch')
+    try:
+        data = request.get_json(silent=True)
+        records = data.get('records') if isinstance(data, dict) else None
+        if not isinstance(records, list):
+            raise ValueError("Request body must be an object with a 'records' list")
+        if len(records) > app.config['MAX_BATCH_SIZE']:
+            raise ValueError(f"Batch exceeds the limit of {app.config['MAX_BATCH_SIZE']} records")
+
+        # Validate every record, keeping the valid ones for a single scoring pass
+        engines = engine_holder.current
+        results = [None] * len(records)
+        valid_indices, symptoms_batch, temperatures = [], [], []
+        for index, record in enumerate(records):
+            try:
+                if not isinstance(record, dict):
+                    raise ValueError("Invalid input data: record must be an object")
+                temperature, symptoms_data = validate_symptom_input(record, engines)
+            except ValueError as e:
+                results[index] = {'index': index, 'error': str(e)}
+                continue
+            valid_indices.append(index)
+            symptoms_batch.append(symptoms_data)
+            temperatures.append(temperature)
+        timer.mark('validate')
+
+        # Perform diagnosis for all valid records at once (one by one on the
+        # shards in coordinator mode)
+        missing_batch = [None] * len(symptoms_batch)
+        if shard_coordinator is not None:
+            scored = []
+            for index, symptoms_data, temperature in zip(valid_indices, symptoms_batch, temperatures):
+                try:
+                    diagnoses, missing_shards = shard_coordinator.diagnose(
+                        symptoms_data,
+                        temperature,
+                        min_confidence=app.config['MIN_CONFIDENCE_THRESHOLD'],
+                        top_k=app.config['MAX_RESULTS']
+                    )
+                except ShardsUnavailableError as e:
+                    # Reported as this record's error, never as an empty diagnosis
+                    results[index] = {'index': index, 'error': str(e)}
+                    continue
+                scored.append((index, symptoms_data, temperature, diagnoses, missing_shards))
+            valid_indices, symptoms_batch, temperatures, diagnoses_batch, missing_batch = (
+                [list(column) for column in zip(*scored)] if scored else ([], [], [], [], [])
+            )
+        else:
+            diagnoses_batch = engines.diagnosis_engine.analyze_batch(
+                symptoms_batch,
+                temperatures,
+                min_confidence=app.config['MIN_CONFIDENCE_THRESHOLD'],
+                top_k=app.config['MAX_RESULTS']
+            )
+        timer.mark('analyze')
+        recommendations_batch = engines.recommendation_engine.generate_batch(
+            diagnoses_batch, symptoms_batch, temperatures
         )
+        timer.mark('recommend')
+
+        for index, diagnoses, symptoms_data, temperature, recommendations, missing_shards in zip(
+            valid_indices, diagnoses_batch, symptoms_batch, temperatures, recommendations_batch, missing_batch
+        ):
+            payload = build_diagnosis_payload(
+                engines.diagnosis_engine, diagnoses, symptoms_data, temperature, recommendations
+            )
+            if missing_shards:
+                payload['partial'] = True
+                payload['missing_shards'] = missing_shards
+            results[index] = {'index': index, **payload}
+        timer.mark('severity')
+
+        if request_log.sampled():
+            logger.info(
+                "Batch diagnosis completed: %d ok, %d failed", len(valid_indices), len(records) - len(valid_indices)
+            )
+        response = jsonify({
+            'results': results,
+            'processed': len(valid_indices),
+            'failed': len(records) - len(valid_indices)
+        })
+        timer.mark('serialize')
+        timer.finish()
+        return response
 
-        # Generate recommendations
-        recommendations = recommendation_engine.generate_recommendations(
-            diagnoses, symptoms_data, temperature
-        )
+    except ValueError as e:
+        logger.warning("Validation error: %s", e)
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error("Processing error: %s", e, exc_info=True)
+        return jsonify({'error': 'Internal server error. Please try again.'}), 500
 
-        # Calculate symptom summary
-        active_symptoms = {k: v for k, v in symptoms_data.items() if v > 0}
-        symptom_avg = sum(active_symptoms.values()) / len(active_symptoms) if active_symptoms else 0
 
-        response = {
-            'diagnoses': diagnoses,
-            'overall_severity': overall_severity,
-            'symptom_average': round(symptom_avg, 1),
-            'temperature': temperature,
-            'active_symptom_count': len(active_symptoms),
-            'recommendations': recommendations,
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'critical_warning': len(recommendations.get('immediate', [])) > 0
-        }
+def session_response(session, rescored: Optional[int] = None) -> Response:
+    """Diagnose a session's current values and encode the /diagnose payload"""
+    engines = session.engines
+    timer = metrics.timer('/diagnose/session')
+    diagnoses = session.diagnose(app.config['MIN_CONFIDENCE_THRESHOLD'], app.config['MAX_RESULTS'])
+    timer.mark('analyze')
+    recommendations = engines.recommendation_engine.generate_recommendations(
+        diagnoses, session.symptoms, session.temperature
+    )
+    timer.mark('recommend')
+    payload = build_diagnosis_payload(
+        engines.diagnosis_engine, diagnoses, session.symptoms, session.temperature, recommendations
+    )
+    timer.mark('severity')
+    payload['session_id'] = session.session_id
+    if rescored is not None:
+        payload['rescored_diseases'] = rescored
+    response = json_response(engines.encoder.encode_payload(payload))
+    timer.mark('serialize')
+    timer.finish()
+    return response
+
+
+@app.route('/diagnose/session', methods=['POST'])
+def create_diagnosis_session():
+    """
+    Start an incremental re-diagnosis session
 
-        logger.info(f"Diagnosis completed: {len(diagnoses)} matches, severity: {overall_severity}")
-        return jsonify(response)
+    Takes the same body as /diagnose and returns the same response plus a
+    session_id. Later changes are sent to /diagnose/session/<session_id>.
+
+    Returns:
+        JSON response with diagnoses, recommendations and the session ID
+    """
+    if not session_store.enabled:
+        return jsonify({'error': 'Diagnosis sessions are disabled'}), 404
+    try:
+        engines = engine_holder.current
+        temperature, symptoms_data = validate_symptom_input(request.get_json(silent=True), engines)
+        session = session_store.create(engines, temperature, symptoms_data)
+        with session.lock:
+            return session_response(session)
+
+    except ValueError as e:
+        logger.warning("Validation error: %s", e)
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error("Processing error: %s", e, exc_info=True)
+        return jsonify({'error': 'Internal server error. Please try again.'}), 500
+
+
+@app.route('/diagnose/session/<session_id>', methods=['PATCH'])
+def update_diagnosis_session(session_id):
+    """
+    Re-diagnose a session after some values changed
+
+    The body holds only what changed, e.g. {"fever": 8} or
+    {"temperature": 38.9}; only the diseases listing a changed symptom are
+    rescored. Sessions live in the worker process that created them.
+
+    Returns:
+        JSON response like /diagnose, plus session_id and rescored_diseases
+    """
+    session = session_store.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown or expired session'}), 404
+    try:
+        with session.lock:
+            rescored = session.update(engine_holder.current, request.get_json(silent=True))
+            return session_response(session, rescored)
 
     except ValueError as e:
-        logger.warning(f"Validation error: {e}")
+        logger.warning("Validation error: %s", e)
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Processing error: {e}", exc_info=True)
+        logger.error("Processing error: %s", e, exc_info=True)
         return jsonify({'error': 'Internal server error. Please try again.'}), 500
 
+
+@app.route('/diagnose/session/<session_id>', methods=['DELETE'])
+def delete_diagnosis_session(session_id):
+    """End a session before it expires"""
+    if not session_store.delete(session_id):
+        return jsonify({'error': 'Unknown or expired session'}), 404
+    return jsonify({'deleted': session_id})
+
+
+@app.after_request
+def count_request(response):
+    """Count requests by route and status for /metrics"""
+    if metrics.enabled and request.url_rule is not None:
+        metrics.inc('requests_total', route=request.url_rule.rule, status=str(response.status_code))
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of the hot-path instrumentation"""
+    if not metrics.enabled:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/stats', methods=['GET'])
+def get_population_stats():
+    """Top diseases, symptoms and symptom pairs and distinct clients over the sliding window"""
+    if not analytics.enabled:
+        return jsonify({'error': 'Population statistics are disabled'}), 404
+    try:
+        top = min(max(int(request.args.get('top', 10)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'top must be an integer'}), 400
+    return jsonify(analytics.snapshot(top))
+
+
+def knowledge_base_status(engines) -> dict:
+    """Describe the knowledge base version an engine snapshot serves"""
+    return {
+        'generation': engines.generation,
+        'source': engines.source,
+        'knowledge_base_hash': engines.knowledge_base_hash,
+        'disease_count': engines.diagnosis_engine.knowledge_base.disease_count,
+        'shard_count': shard_coordinator.shard_count if shard_coordinator is not None else 0,
+        'loaded_at': datetime.fromtimestamp(engines.loaded_at).strftime('%Y-%m-%d %H:%M:%S'),
+        'cache': engines.cache.stats()
+    }
+
+
+def admin_authorized() -> bool:
+    """Check the admin token; admin routes are disabled without ADMIN_TOKEN"""
+    token = app.config['ADMIN_TOKEN']
+    return bool(token) and hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token)
+
+
+@app.route('/admin/knowledge-base', methods=['GET'])
+def get_knowledge_base_status():
+    """Report the knowledge base version this worker is serving"""
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(knowledge_base_status(engine_holder.current))
+
+
+@app.route('/admin/knowledge-base/reload', methods=['POST'])
+def reload_knowledge_base():
+    """
+    Recompile the knowledge base and hot-swap the engines
+
+    In-flight requests finish on the engines they started with. If the new
+    data fails to load or validate, the current engines stay in service.
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    try:
+        engines = engine_holder.load()
+    except Exception as e:
+        logger.error(f"Knowledge base reload failed: {e}", exc_info=True)
+        return jsonify({'error': f'Reload failed: {e}'}), 500
+    return jsonify(knowledge_base_status(engines))
+
+
+@app.route('/admin/shards', methods=['GET'])
+def get_shard_status():
+    """Report the diagnosis shards this coordinator fans out to"""
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    if shard_coordinator is None:
+        return jsonify({'error': 'Not running as a shard coordinator'}), 404
+    return jsonify({
+        'shards': shard_coordinator.status(),
+        'timeout': shard_coordinator.timeout,
+        'partial_responses': shard_coordinator.partial_responses
+    })
+
+
 if __name__ == '__main__':
     app.run(debug=True)
 
@@ -0,0 +1,7 @@
+"""
+Benchmarks Package
+==================
+
+Performance harness for the diagnosis and recommendation hot paths.
+Run with `python -m benchmarks.run --help`.
+"""
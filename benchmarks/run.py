@@ -0,0 +1,236 @@
+"""
+Benchmark Runner
+================
+
+Measures the diagnosis and recommendation hot paths:
+
+- DiagnosisEngine.analyze_symptoms over catalogs of increasing size
+- DiagnosisEngine.assess_overall_severity
+- RecommendationEngine.generate_recommendations
+- the full /diagnose route through Flask's test client
+
+Each benchmark reports ops/sec, p50/p95/p99 latency, and memory use per
+call (peak traced bytes while one call runs, and net blocks left allocated,
+which flags leaks). Results can be saved as a baseline JSON file and later
+runs compared against it.
+
+Usage:
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 9,1000,10000 --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --tolerance 0.15
+"""
+
+from pathlib import Path
+from typing import Callable, Dict, List, Any
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from benchmarks.synthetic import make_catalog, make_patients, symptom_vocabulary, to_request, BASE_SYMPTOMS
+from config import DATA_DIR, Config
+from utils import DataLoader, DiagnosisEngine, RecommendationEngine
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(name: str, call: Callable[[int], Any], iterations: int, warmup: int = 50) -> Dict[str, Any]:
+    """
+    Time a callable and sample its memory use
+
+    Args:
+        name: Benchmark name
+        call: Function taking the iteration index
+        iterations: Number of timed calls
+        warmup: Untimed calls made first
+
+    Returns:
+        Result dictionary
+    """
+    for i in range(warmup):
+        call(i)
+
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter_ns()
+        call(i)
+        latencies.append(time.perf_counter_ns() - t0)
+    elapsed = time.perf_counter() - started
+
+    # Memory sampling runs separately because tracing slows calls down
+    samples = min(iterations, 200)
+    peak_total = 0
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    for i in range(samples):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        call(i)
+        peak_total += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    blocks_after = sys.getallocatedblocks()
+
+    latencies.sort()
+    result = {
+        'name': name,
+        'iterations': iterations,
+        'ops_per_sec': round(iterations / elapsed, 1),
+        'p50_us': round(_percentile(latencies, 0.50) / 1000, 2),
+        'p95_us': round(_percentile(latencies, 0.95) / 1000, 2),
+        'p99_us': round(_percentile(latencies, 0.99) / 1000, 2),
+        'peak_alloc_bytes_per_call': round(peak_total / samples),
+        'net_blocks_per_call': round((blocks_after - blocks_before) / samples, 2),
+    }
+    print(
+        f"{name:<42} {result['ops_per_sec']:>11,.0f} ops/s  "
+        f"p50 {result['p50_us']:>9.1f}us  p95 {result['p95_us']:>9.1f}us  "
+        f"p99 {result['p99_us']:>9.1f}us  peak {result['peak_alloc_bytes_per_call']:>9,} B"
+    )
+    return result
+
+
+def run_engine_benchmarks(sizes: List[int], iterations: int, patients_count: int) -> List[Dict[str, Any]]:
+    """Benchmark the engines directly over real and synthetic catalogs"""
+    results = []
+    data_loader = DataLoader(DATA_DIR, diagnostics=False)
+    recommendation_engine = RecommendationEngine(data_loader.get_recommendations_config())
+
+    for size in sizes:
+        if size == len(data_loader.get_diseases()):
+            catalog, label = data_loader.get_diseases(), f'{size} (real)'
+        else:
+            catalog, label = make_catalog(size), str(size)
+
+        build_started = time.perf_counter()
+        engine = DiagnosisEngine(catalog)
+        print(f"\n-- catalog {label}: {len(catalog)} diseases, compiled in "
+              f"{(time.perf_counter() - build_started) * 1000:.1f} ms")
+
+        patients = make_patients(patients_count, symptom_vocabulary(size))
+        diagnoses = [
+            engine.analyze_symptoms(symptoms_data, temperature, Config.MIN_CONFIDENCE_THRESHOLD,
+                                    top_k=Config.MAX_RESULTS)
+            for symptoms_data, temperature in patients
+        ]
+
+        def analyze(i):
+            symptoms_data, temperature = patients[i % len(patients)]
+            engine.analyze_symptoms(symptoms_data, temperature, Config.MIN_CONFIDENCE_THRESHOLD,
+                                    top_k=Config.MAX_RESULTS)
+
+        def severity(i):
+            symptoms_data, temperature = patients[i % len(patients)]
+            engine.assess_overall_severity(diagnoses[i % len(patients)], symptoms_data, temperature)
+
+        def recommend(i):
+            symptoms_data, temperature = patients[i % len(patients)]
+            recommendation_engine.generate_recommendations(
+                diagnoses[i % len(patients)], symptoms_data, temperature
+            )
+
+        results.append({**measure(f'analyze_symptoms[{size}]', analyze, iterations), 'catalog_size': size})
+        results.append({**measure(f'assess_overall_severity[{size}]', severity, iterations), 'catalog_size': size})
+        results.append({**measure(f'generate_recommendations[{size}]', recommend, iterations), 'catalog_size': size})
+
+    return results
+
+
+def run_route_benchmarks(iterations: int, patients_count: int) -> List[Dict[str, Any]]:
+    """Benchmark the full /diagnose route with and without the result cache"""
+    import logging
+    logging.disable(logging.INFO)
+
+    from app import app, engine_holder
+
+    client = app.test_client()
+    bodies = [to_request(*patient) for patient in make_patients(patients_count, BASE_SYMPTOMS)]
+    print(f"\n-- /diagnose route ({engine_holder.current.diagnosis_engine.knowledge_base.disease_count} diseases)")
+
+    def diagnose(i):
+        response = client.post('/diagnose', json=bodies[i % len(bodies)])
+        if response.status_code != 200:
+            raise RuntimeError(f"/diagnose returned {response.status_code}: {response.get_data(as_text=True)}")
+
+    results = []
+    cache = engine_holder.current.cache
+    saved_size = cache.max_entries
+
+    cache.max_entries = 0
+    results.append(measure('route /diagnose (uncached)', diagnose, iterations))
+    cache.max_entries = saved_size
+    cache.clear()
+    results.append(measure('route /diagnose (cached)', diagnose, iterations))
+    logging.disable(logging.NOTSET)
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: Path, tolerance: float) -> bool:
+    """
+    Compare p50 latency with a saved baseline
+
+    Returns:
+        True if no benchmark regressed by more than the tolerance
+    """
+    baseline = {entry['name']: entry for entry in json.loads(baseline_path.read_text())['results']}
+    ok = True
+    print(f"\n-- comparison with {baseline_path} (tolerance {tolerance:.0%})")
+    for result in results:
+        previous = baseline.get(result['name'])
+        if previous is None:
+            continue
+        change = result['p50_us'] / previous['p50_us'] - 1 if previous['p50_us'] else 0.0
+        regressed = change > tolerance
+        ok = ok and not regressed
+        print(f"{result['name']:<42} p50 {previous['p50_us']:>9.1f} -> {result['p50_us']:>9.1f}us "
+              f"({change:+.1%}){'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='9,100,1000,10000',
+                        help='Comma-separated catalog sizes (9 uses the real catalog)')
+    parser.add_argument('--iterations', type=int, default=2000, help='Timed calls per benchmark')
+    parser.add_argument('--patients', type=int, default=1000, help='Synthetic patients to cycle through')
+    parser.add_argument('--skip-route', action='store_true', help='Skip the Flask route benchmarks')
+    parser.add_argument('--save-baseline', type=Path, help='Write results to this JSON file')
+    parser.add_argument('--compare', type=Path, help='Compare p50 latencies with this baseline')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Allowed p50 slowdown before --compare fails (fraction)')
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    results = run_engine_benchmarks(sizes, args.iterations, args.patients)
+    if not args.skip_route:
+        results += run_route_benchmarks(args.iterations, args.patients)
+
+    report = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(report, indent=2) + '\n')
+        print(f"\nSaved baseline to {args.save_baseline}")
+
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Synthetic Workloads
+===================
+
+Generates disease catalogs and patient populations for benchmarking.
+
+Catalogs reuse the real 22-symptom vocabulary and add synthetic symptoms
+as they grow, so large catalogs keep a realistic number of diseases per
+symptom. Patients follow the shape of real traffic: a few active
+symptoms, severities skewed towards the middle of the scale, temperatures
+on the 0.1°C grid with a fever tail, and a popular subset of profiles
+that repeats.
+"""
+
+from typing import Dict, List, Tuple, Any
+import random
+
+BASE_SYMPTOMS = [
+    'fever', 'body_ache', 'headache', 'stuffy_nose', 'runny_nose', 'cough',
+    'fatigue', 'sore_throat', 'difficulty_breathing', 'chest_pain',
+    'loss_of_taste', 'nausea', 'chills', 'sneezing', 'watery_eyes',
+    'itchy_eyes', 'facial_pain', 'difficulty_swallowing', 'swollen_lymph',
+    'sensitivity_light', 'sensitivity_sound', 'confusion'
+]
+
+URGENCIES = ['normal', 'normal', 'warning', 'urgent']
+SEVERITIES = ['low', 'medium', 'high']
+
+
+def symptom_vocabulary(disease_count: int) -> List[str]:
+    """Vocabulary for a catalog: the real symptoms plus ~1 extra per 25 diseases"""
+    extra = max(0, disease_count // 25 - len(BASE_SYMPTOMS))
+    return BASE_SYMPTOMS + [f'synthetic_symptom_{i}' for i in range(extra)]
+
+
+def make_catalog(disease_count: int, seed: int = 0) -> Dict[str, Any]:
+    """
+    Build a diseases.json style catalog
+
+    Args:
+        disease_count: Number of diseases
+        seed: Random seed
+
+    Returns:
+        Disease database dictionary
+    """
+    rng = random.Random(seed)
+    vocabulary = symptom_vocabulary(disease_count)
+    catalog = {}
+
+    for i in range(disease_count):
+        symptoms = rng.sample(vocabulary, rng.randint(4, min(9, len(vocabulary))))
+        low = round(rng.uniform(36.5, 38.5), 1)
+        catalog[f'Synthetic Disease {i}'] = {
+            'symptoms': {symptom: round(rng.randint(8, 19) * 0.05, 2) for symptom in symptoms},
+            'temp_range': [low, round(low + rng.uniform(0.5, 2.0), 1)],
+            'severity': rng.choice(SEVERITIES),
+            'urgency': rng.choice(URGENCIES),
+            'description': f'Synthetic Disease {i} (benchmark)',
+            'incubation': f'{rng.randint(1, 5)}-{rng.randint(6, 14)} days'
+        }
+    return catalog
+
+
+def make_patient(rng: random.Random, vocabulary: List[str]) -> Tuple[Dict[str, int], float]:
+    """Draw one patient profile as (symptoms_data, temperature)"""
+    symptoms_data = {symptom: 0 for symptom in BASE_SYMPTOMS}
+    active_count = min(len(vocabulary), max(1, int(rng.triangular(1, 8, 3))))
+    for symptom in rng.sample(vocabulary, active_count):
+        symptoms_data[symptom] = max(1, min(10, round(rng.triangular(1, 10, 5))))
+
+    if rng.random() < 0.35:
+        temperature = rng.uniform(37.8, 40.5)  # fever tail
+    else:
+        temperature = rng.gauss(36.8, 0.4)
+    temperature = round(min(43.0, max(35.0, temperature)), 1)
+    return symptoms_data, temperature
+
+
+def make_patients(
+    count: int,
+    vocabulary: List[str],
+    seed: int = 1,
+    repeat_fraction: float = 0.5,
+    popular_profiles: int = 50
+) -> List[Tuple[Dict[str, int], float]]:
+    """
+    Draw a patient population where some profiles recur
+
+    Args:
+        count: Number of patients
+        vocabulary: Symptoms patients can report
+        seed: Random seed
+        repeat_fraction: Share of patients drawn from the popular profiles
+        popular_profiles: Size of the popular profile pool (Zipf-like weights)
+
+    Returns:
+        List of (symptoms_data, temperature) tuples
+    """
+    rng = random.Random(seed)
+    popular = [make_patient(rng, vocabulary) for _ in range(popular_profiles)]
+    weights = [1 / (rank + 1) for rank in range(popular_profiles)]
+
+    patients = []
+    for _ in range(count):
+        if rng.random() < repeat_fraction:
+            patients.append(rng.choices(popular, weights)[0])
+        else:
+            patients.append(make_patient(rng, vocabulary))
+    return patients
+
+
+def to_request(symptoms_data: Dict[str, int], temperature: float) -> Dict[str, Any]:
+    """Turn a patient profile into a /diagnose request body"""
+    body = {symptom: value for symptom, value in symptoms_data.items() if symptom in BASE_SYMPTOMS}
+    body['temperature'] = temperature
+    return body
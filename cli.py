@@ -0,0 +1,243 @@
+"""
+Command-Line Tools
+==================
+
+Maintenance commands for the Medical Symptom Checker.
+
+Usage:
+    python cli.py build-snapshot [--data-dir DIR] [--output FILE]
+    python cli.py verify-snapshot [FILE]
+    python cli.py triage [INPUT] [--output FILE] [--format ndjson|csv] [--jobs N] [--resume]
+    python cli.py shard --index I --count N [--host HOST] [--port PORT]
+"""
+
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from pathlib import Path
+
+import click
+
+from config import DATA_DIR, KB_SNAPSHOT, USE_KB_SNAPSHOT, Config
+from utils import (
+    build_snapshot, read_snapshot, SchemaError, SnapshotError, DataLoader, EngineHolder,
+    DiagnosisEngine, ShardServer, partition_database, read_records, chunked, triage_chunk
+)
+from utils.sharding import DEFAULT_SHARD_PORT
+from utils.triage import init_worker, triage_chunk_in_worker
+
+
+@click.group()
+def cli():
+    """Medical Symptom Checker maintenance commands"""
+
+
+@cli.command('build-snapshot')
+@click.option('--data-dir', type=click.Path(exists=True, file_okay=False, path_type=Path),
+              default=DATA_DIR, show_default=True, help='Directory with the JSON knowledge base')
+@click.option('--output', type=click.Path(dir_okay=False, path_type=Path),
+              default=KB_SNAPSHOT, show_default=True, help='Snapshot file to write')
+def build_snapshot_command(data_dir: Path, output: Path):
+    """Validate the JSON knowledge base and write the binary snapshot"""
+    try:
+        content_hash = build_snapshot(data_dir, output)
+    except SchemaError as e:
+        for error in e.errors:
+            click.echo(f"  {error}", err=True)
+        click.echo(f"Validation failed with {len(e.errors)} error(s); snapshot not written", err=True)
+        sys.exit(1)
+
+    snapshot = read_snapshot(output, verify=True)
+    click.echo(f"Wrote {output} ({output.stat().st_size} bytes)")
+    click.echo(f"  diseases:     {snapshot.knowledge_base.disease_count}")
+    click.echo(f"  symptoms:     {len(snapshot.knowledge_base.symptom_names)}")
+    click.echo(f"  content hash: {content_hash}")
+    click.echo(f"  source hash:  {snapshot.source_hash}")
+
+
+@cli.command('verify-snapshot')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, path_type=Path),
+                default=KB_SNAPSHOT)
+@click.option('--data-dir', type=click.Path(file_okay=False, path_type=Path),
+              default=DATA_DIR, show_default=True, help='Directory with the JSON knowledge base')
+def verify_snapshot_command(path: Path, data_dir: Path):
+    """Check a snapshot's content hash and that it matches the JSON files"""
+    try:
+        snapshot = read_snapshot(path, verify=True)
+    except SnapshotError as e:
+        click.echo(f"Invalid snapshot: {e}", err=True)
+        sys.exit(1)
+
+    click.echo(f"content hash: {snapshot.content_hash}")
+    click.echo(f"source hash:  {snapshot.source_hash}")
+
+    source_hash = DataLoader(data_dir, diagnostics=False).source_fingerprint()
+    if source_hash is None:
+        click.echo("JSON sources not found; skipped staleness check")
+    elif source_hash != snapshot.source_hash:
+        click.echo("Snapshot is stale: rebuild it with build-snapshot", err=True)
+        sys.exit(1)
+    else:
+        click.echo("Snapshot matches the JSON sources")
+
+
+def resume_offset(path: Path) -> int:
+    """
+    Find where an interrupted triage run stopped
+
+    A trailing partial line (from a run killed mid-write) is truncated so
+    appending continues on a clean line boundary.
+
+    Returns:
+        Index of the first record not yet written
+    """
+    if not path.exists():
+        return 0
+
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        position = size
+        tail = b''
+        # Read backwards until the last complete line is in view
+        while position > 0 and tail.count(b'\n') < 2:
+            step = min(position, 1 << 16)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+
+        complete = tail[:tail.rfind(b'\n') + 1]
+        if len(complete) < len(tail):
+            f.truncate(position + len(complete))
+        lines = complete.splitlines()
+        if not lines:
+            return 0
+        return json.loads(lines[-1])['index'] + 1
+
+
+@cli.command('triage')
+@click.argument('input_file', type=click.File('r', encoding='utf-8'), default='-')
+@click.option('--output', '-o', type=click.Path(dir_okay=False, path_type=Path),
+              help='NDJSON file to write (default: stdout)')
+@click.option('--format', 'input_format', type=click.Choice(['ndjson', 'csv']), default=None,
+              help='Input format (default: from the file extension, else ndjson)')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=1000, show_default=True,
+              help='Records scored per batch')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Worker processes scoring chunks in parallel')
+@click.option('--start', type=click.IntRange(min=0), default=0, show_default=True,
+              help='Skip this many records before scoring')
+@click.option('--resume', is_flag=True,
+              help='Continue an interrupted run: append to --output after its last record')
+@click.option('--report-every', type=float, default=5.0, show_default=True,
+              help='Seconds between throughput reports on stderr (0 disables them)')
+@click.option('--data-dir', type=click.Path(exists=True, file_okay=False, path_type=Path),
+              default=DATA_DIR, show_default=True, help='Directory with the JSON knowledge base')
+def triage_command(input_file, output, input_format, chunk_size, jobs, start, resume, report_every, data_dir):
+    """Diagnose a stream of NDJSON or CSV records, writing NDJSON results"""
+    if resume:
+        if output is None:
+            raise click.UsageError('--resume needs --output')
+        start = max(start, resume_offset(output))
+
+    if input_format is None:
+        input_format = 'csv' if getattr(input_file, 'name', '').lower().endswith('.csv') else 'ndjson'
+
+    snapshot_path = KB_SNAPSHOT if USE_KB_SNAPSHOT else None
+    holder_options = {
+        'min_temperature': Config.MIN_TEMPERATURE,
+        'max_temperature': Config.MAX_TEMPERATURE,
+    }
+    scoring = (Config.MIN_CONFIDENCE_THRESHOLD, Config.MAX_RESULTS)
+
+    records = islice(read_records(input_file, input_format), start, None)
+    chunks = chunked(records, chunk_size, start)
+    out = open(output, 'a' if resume else 'w', encoding='utf-8') if output else sys.stdout
+
+    started = last_report = time.perf_counter()
+    written = errors = 0
+
+    def write(result):
+        nonlocal written, errors, last_report
+        lines, invalid = result
+        out.writelines(lines)
+        out.flush()
+        written += len(lines)
+        errors += invalid
+
+        now = time.perf_counter()
+        if report_every and now - last_report >= report_every:
+            last_report = now
+            click.echo(f"{start + written} records ({written / (now - started):,.0f}/s, {errors} invalid)", err=True)
+
+    try:
+        if jobs == 1:
+            engines = EngineHolder(
+                DataLoader(data_dir, diagnostics=False), cache_size=0,
+                snapshot_path=snapshot_path, **holder_options
+            ).load()
+            for chunk_start, chunk in chunks:
+                write(triage_chunk(engines, chunk_start, chunk, *scoring))
+        else:
+            # At most two chunks per worker are in flight, bounding memory
+            initializer = partial(init_worker, data_dir, snapshot_path, **holder_options)
+            with ProcessPoolExecutor(jobs, initializer=initializer) as pool:
+                pending = deque()
+                for chunk_start, chunk in chunks:
+                    pending.append(pool.submit(triage_chunk_in_worker, chunk_start, chunk, *scoring))
+                    if len(pending) >= 2 * jobs:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    finally:
+        if output:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    click.echo(
+        f"Triaged {written} records in {elapsed:.1f}s ({written / elapsed if elapsed else 0:,.0f}/s), "
+        f"{errors} invalid; next offset {start + written}",
+        err=True
+    )
+
+
+@cli.command('shard')
+@click.option('--index', 'shard_index', type=click.IntRange(min=0), required=True,
+              help='Position of this shard (0-based)')
+@click.option('--count', 'shard_count', type=click.IntRange(min=1), required=True,
+              help='Number of shards the catalog is split into')
+@click.option('--host', default='127.0.0.1', show_default=True, help='Interface to listen on')
+@click.option('--port', type=click.IntRange(min=0, max=65535), default=None,
+              help=f'Port to listen on (default: {DEFAULT_SHARD_PORT} + index)')
+@click.option('--data-dir', type=click.Path(exists=True, file_okay=False, path_type=Path),
+              default=DATA_DIR, show_default=True, help='Directory with the JSON knowledge base')
+def shard_command(shard_index, shard_count, host, port, data_dir):
+    """Serve one partition of the catalog to a /diagnose coordinator"""
+    if shard_index >= shard_count:
+        raise click.UsageError('--index must be lower than --count')
+    if port is None:
+        port = DEFAULT_SHARD_PORT + shard_index
+
+    diseases, row_offset = partition_database(
+        DataLoader(data_dir, diagnostics=False).get_diseases(), shard_count, shard_index
+    )
+    engine = DiagnosisEngine(diseases)
+
+    with ShardServer((host, port), engine, shard_index, shard_count, row_offset) as server:
+        click.echo(
+            f"Shard {shard_index}/{shard_count}: {len(diseases)} diseases from row {row_offset}, "
+            f"listening on {host}:{server.server_address[1]}",
+            err=True
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    cli()
@@ -22,6 +22,25 @@ DATA_DIR = BASE_DIR / 'data'
 DISEASES_JSON = DATA_DIR / 'diseases.json'
 RECOMMENDATIONS_JSON = DATA_DIR / 'recommendations.json'
 
+# Prebuilt binary snapshot of the compiled knowledge base
+KB_SNAPSHOT = Path(os.environ.get('KB_SNAPSHOT_PATH', DATA_DIR / 'knowledge_base.snapshot'))
+
+# Lean startup skips diagnostic file listings/logging and prefers the
+# snapshot; on by default for Vercel cold starts
+LEAN_STARTUP = os.environ.get('LEAN_STARTUP', '1' if os.environ.get('VERCEL') else '0') == '1'
+
+# Memory-map the snapshot instead of parsing JSON (always tried in lean mode)
+USE_KB_SNAPSHOT = LEAN_STARTUP or os.environ.get('USE_KB_SNAPSHOT', '0') == '1'
+
+# Logging (process-wide, so configured before the Flask app exists):
+# LOG_FORMAT 'text' or 'json'; ASYNC_LOGGING moves log I/O to a background
+# thread; LOG_SAMPLE_RATE is the fraction of requests that write a summary line
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+ASYNC_LOGGING = os.environ.get('ASYNC_LOGGING', '0') == '1'
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))
+
 # Flask configuration
 class Config:
     """Base configuration"""
@@ -36,6 +55,75 @@ class Config:
     # Diagnosis settings
     MIN_CONFIDENCE_THRESHOLD = 20  # Minimum confidence to include disease
     MAX_RESULTS = 5  # Maximum number of diagnoses to return
+    MAX_BATCH_SIZE = 10000  # Maximum records per /diagnose/batch request
+
+    # Result cache (repeated symptom profiles); size 0 disables it
+    RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 4096))
+    RESULT_CACHE_TTL = float(os.environ.get('RESULT_CACHE_TTL', 300))  # seconds
+
+    # Knowledge base hot reload: poll interval for data file changes
+    # (0 disables the watcher) and token for the /admin routes (unset disables them)
+    KB_WATCH_INTERVAL = float(os.environ.get('KB_WATCH_INTERVAL', 0))
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+    # ASGI entry point (api/asgi.py): /diagnose requests arriving within the
+    # window are scored as one batch, flushed early at ASGI_MAX_BATCH
+    ASGI_BATCH_WINDOW_MS = float(os.environ.get('ASGI_BATCH_WINDOW_MS', 2))
+    ASGI_MAX_BATCH = int(os.environ.get('ASGI_MAX_BATCH', 256))
+
+    # Incremental re-diagnosis sessions (/diagnose/session): at most
+    # DIAGNOSIS_SESSIONS per process (0 disables them), dropped after
+    # DIAGNOSIS_SESSION_TTL seconds without an update
+    DIAGNOSIS_SESSIONS = int(os.environ.get('DIAGNOSIS_SESSIONS', 1024))
+    DIAGNOSIS_SESSION_TTL = float(os.environ.get('DIAGNOSIS_SESSION_TTL', 900))
+
+    # Hot-path instrumentation exposed at /metrics (near zero cost when off)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '0') == '1'
+
+    # Process pool scoring (0 disables it): batches larger than
+    # SCORING_CHUNK_SIZE are split by patients, and single patients are split
+    # by disease rows once the catalog reaches SCORING_MIN_DISEASES
+    SCORING_PROCESSES = int(os.environ.get('SCORING_PROCESSES', 0))
+    SCORING_CHUNK_SIZE = int(os.environ.get('SCORING_CHUNK_SIZE', 256))
+    SCORING_MIN_DISEASES = int(os.environ.get('SCORING_MIN_DISEASES', 50000))
+
+    # Admission control for /diagnose (off by default): at most
+    # ADMISSION_MAX_IN_FLIGHT concurrent diagnoses per process, adapted to
+    # ADMISSION_LATENCY_TARGET_MS; up to ADMISSION_MAX_QUEUE requests wait
+    # ADMISSION_QUEUE_TIMEOUT_MS for a slot before a 503. ADMISSION_RATE
+    # requests/s per client (0 disables), identified by ADMISSION_CLIENT_HEADER
+    # or the remote address. Requests older than ADMISSION_MAX_QUEUE_AGE_MS
+    # per X-Request-Start are shed (0 disables). Critical symptoms always pass
+    ADMISSION_CONTROL = os.environ.get('ADMISSION_CONTROL', '0') == '1'
+    ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', 64))
+    ADMISSION_INITIAL_LIMIT = int(os.environ.get('ADMISSION_INITIAL_LIMIT', 16))
+    ADMISSION_LATENCY_TARGET_MS = float(os.environ.get('ADMISSION_LATENCY_TARGET_MS', 50))
+    ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 128))
+    ADMISSION_QUEUE_TIMEOUT_MS = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT_MS', 100))
+    ADMISSION_RATE = float(os.environ.get('ADMISSION_RATE', 0))
+    ADMISSION_BURST = float(os.environ.get('ADMISSION_BURST', 0))
+    ADMISSION_CLIENT_HEADER = os.environ.get('ADMISSION_CLIENT_HEADER', '')
+    ADMISSION_MAX_QUEUE_AGE_MS = float(os.environ.get('ADMISSION_MAX_QUEUE_AGE_MS', 0))
+
+    # Population statistics at /stats (off by default): top diseases,
+    # symptoms and symptom pairs and distinct clients over the last
+    # ANALYTICS_WINDOW_SECONDS, in ANALYTICS_BUCKETS slices. Sketches use
+    # ANALYTICS_SKETCH_WIDTH x ANALYTICS_SKETCH_DEPTH counters; at most
+    # ANALYTICS_MAX_PENDING diagnoses wait for the background thread
+    ANALYTICS_ENABLED = os.environ.get('ANALYTICS_ENABLED', '0') == '1'
+    ANALYTICS_WINDOW_SECONDS = float(os.environ.get('ANALYTICS_WINDOW_SECONDS', 3600))
+    ANALYTICS_BUCKETS = int(os.environ.get('ANALYTICS_BUCKETS', 12))
+    ANALYTICS_SKETCH_WIDTH = int(os.environ.get('ANALYTICS_SKETCH_WIDTH', 2048))
+    ANALYTICS_SKETCH_DEPTH = int(os.environ.get('ANALYTICS_SKETCH_DEPTH', 4))
+    ANALYTICS_MAX_PENDING = int(os.environ.get('ANALYTICS_MAX_PENDING', 65536))
+
+    # Sharded diagnosis: comma-separated host:port of the shard processes
+    # (python cli.py shard), in shard order; empty scores in-process. Shards
+    # not answering within SHARD_TIMEOUT seconds are left out of the result
+    SHARD_ADDRESSES = [
+        address for address in os.environ.get('SHARD_ADDRESSES', '').split(',') if address.strip()
+    ]
+    SHARD_TIMEOUT = float(os.environ.get('SHARD_TIMEOUT', 0.5))
 
     # Temperature thresholds
     MIN_TEMPERATURE = 35.0
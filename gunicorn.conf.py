@@ -0,0 +1,65 @@
+"""
+Gunicorn Configuration
+======================
+
+Runs many workers against one shared copy of the compiled knowledge base.
+
+The master process validates the JSON knowledge base and writes the binary
+snapshot once, before any worker is forked. Every worker then memory-maps
+that file (USE_KB_SNAPSHOT=1), so the disease tables and their strings are
+NumPy views over the same physical pages instead of per-worker dicts.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+
+Environment:
+    SHARED_KB_PATH: Where the master writes the snapshot (default: a file in
+        /dev/shm, or the system temp directory)
+    WEB_CONCURRENCY: Number of workers (default: 2 x CPU count + 1)
+    GUNICORN_BIND: Address to bind (default 0.0.0.0:8000)
+
+Send SIGHUP to the master after editing the JSON files: it rebuilds the
+snapshot and replaces the workers.
+"""
+
+from pathlib import Path
+import multiprocessing
+import os
+import tempfile
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+# Workers import the app themselves; the knowledge base is shared through
+# the snapshot mapping rather than copy-on-write pages of the master
+preload_app = False
+
+
+def _shared_snapshot_path() -> Path:
+    if os.environ.get('SHARED_KB_PATH'):
+        return Path(os.environ['SHARED_KB_PATH'])
+    directory = Path('/dev/shm') if Path('/dev/shm').is_dir() else Path(tempfile.gettempdir())
+    return directory / 'medical-symptom-checker-kb.snapshot'
+
+
+def _build_shared_snapshot(server):
+    path = _shared_snapshot_path()
+
+    # Set before config is first imported here, since forked workers inherit
+    # the master's already imported modules as well as its environment
+    os.environ['KB_SNAPSHOT_PATH'] = str(path)
+    os.environ['USE_KB_SNAPSHOT'] = '1'
+
+    from config import DATA_DIR
+    from utils import build_snapshot
+
+    content_hash = build_snapshot(DATA_DIR, path)
+    server.log.info(f"Shared knowledge base snapshot {path} ({content_hash[:12]})")
+
+
+def on_starting(server):
+    _build_shared_snapshot(server)
+
+
+def on_reload(server):
+    _build_shared_snapshot(server)
@@ -6,8 +6,34 @@ Helper modules for the Medical Symptom Checker application.
 """
 
 from .data_loader import DataLoader
+from .validation import SymptomValidator, SymptomVector
+from .results import DiagnosisResult
+from .knowledge_base import CompiledKnowledgeBase
 from .diagnosis_engine import DiagnosisEngine
 from .recommendation_engine import RecommendationEngine
+from .result_cache import DiagnosisCache
+from .response_encoder import ResponseEncoder
+from .schema import validate_knowledge_base, SchemaError
+from .hot_reload import EngineHolder, EngineSnapshot, KnowledgeBaseWatcher
+from .micro_batch import MicroBatcher
+from .parallel import ScoringPool
+from .metrics import MetricsRegistry
+from .logging_setup import configure_logging, RequestLogSampler
+from .sessions import SessionStore, DiagnosisSession
+from .sharding import ShardServer, ShardCoordinator, partition_database
+from .admission import AdmissionController
+from .analytics import PopulationAnalytics
+from .triage import build_diagnosis_payload, read_records, chunked, triage_chunk
+from .snapshot import build_snapshot, write_snapshot, read_snapshot, LoadedSnapshot, SnapshotError
 
-__all__ = ['DataLoader', 'DiagnosisEngine', 'RecommendationEngine']
+__all__ = ['DataLoader', 'CompiledKnowledgeBase', 'DiagnosisEngine', 'RecommendationEngine',
+           'DiagnosisCache', 'validate_knowledge_base', 'SchemaError', 'build_snapshot',
+           'write_snapshot', 'read_snapshot', 'LoadedSnapshot', 'SnapshotError',
+           'EngineHolder', 'EngineSnapshot', 'KnowledgeBaseWatcher', 'SymptomValidator',
+           'SymptomVector', 'MicroBatcher', 'ScoringPool', 'build_diagnosis_payload',
+           'read_records', 'chunked', 'triage_chunk', 'MetricsRegistry',
+           'configure_logging', 'RequestLogSampler', 'ResponseEncoder',
+           'SessionStore', 'DiagnosisSession', 'DiagnosisResult', 'ShardServer',
+           'ShardCoordinator', 'partition_database', 'AdmissionController',
+           'PopulationAnalytics']
 
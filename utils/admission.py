@@ -0,0 +1,318 @@
+"""
+Admission Control Module
+========================
+
+Load shedding for /diagnose. Under overload it is better to turn a few
+requests away at once than to let every request queue until it times
+out, so each request is admitted, briefly queued or rejected:
+
+- Per-client token buckets cap each client's request rate (429).
+- An AIMD limit adapts the number of concurrent diagnoses to a latency
+  target: it grows while requests finish in time and is cut back as soon
+  as they do not.
+- Requests over the limit wait in a small bounded queue for a short time;
+  when the queue is full or the wait runs out they get a 503 with
+  Retry-After.
+- Requests that waited too long in front of the app (X-Request-Start set
+  by the proxy) are shed before any work is done.
+
+Requests with critical symptoms take a priority lane: they skip the rate
+limit, the queue and the concurrency limit and are never rejected.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import math
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Clients whose token buckets are remembered (least recently seen are dropped)
+MAX_TRACKED_CLIENTS = 10000
+
+
+class TokenBucketTable:
+    """Per-client token buckets, refilled continuously"""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = MAX_TRACKED_CLIENTS):
+        """
+        Args:
+            rate: Tokens added per second (sustained requests per second)
+            burst: Bucket size (requests a client may send at once)
+            max_clients: Buckets kept before the least recently used is dropped
+        """
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, client: str) -> float:
+        """
+        Take one token from a client's bucket
+
+        Returns:
+            0 if the request may proceed, else seconds until a token is available
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1.0:
+                self._buckets[client] = (tokens - 1.0, now)
+                wait = 0.0
+            else:
+                self._buckets[client] = (tokens, now)
+                wait = (1.0 - tokens) / self.rate
+            self._buckets.move_to_end(client)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AIMDLimit:
+    """
+    Concurrency limit driven by request latency
+
+    Additive increase: every request finishing within the latency target
+    while the limit is in use adds 1/limit, i.e. about one slot per limit's
+    worth of requests. Multiplicative decrease: a request over the target
+    multiplies the limit by `backoff`, at most once per target interval so
+    one slow burst does not collapse it.
+    """
+
+    def __init__(
+        self,
+        initial: float,
+        min_limit: float,
+        max_limit: float,
+        latency_target: float,
+        backoff: float = 0.9
+    ):
+        self.min_limit = max(1.0, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(initial, self.min_limit), self.max_limit)
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self._last_decrease = 0.0
+
+    def record(self, latency: float, in_flight: int):
+        """Adjust the limit after a request finished (call under the controller's lock)"""
+        if latency > self.latency_target:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.latency_target:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif in_flight + 1 >= self.limit / 2:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+
+class Admission:
+    """Outcome of AdmissionController.admit; release admitted requests when done"""
+
+    __slots__ = ('controller', 'status', 'reason', 'retry_after', 'critical', 'started')
+
+    def __init__(
+        self,
+        controller: 'AdmissionController',
+        status: int = 200,
+        reason: Optional[str] = None,
+        retry_after: int = 0,
+        critical: bool = False
+    ):
+        self.controller = controller
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+        self.critical = critical
+        self.started = time.monotonic()
+
+    @property
+    def admitted(self) -> bool:
+        return self.reason is None
+
+    def release(self):
+        """Free the request's slot and feed its latency to the limiter"""
+        if self.admitted and self.controller.enabled:
+            self.controller._release(time.monotonic() - self.started)
+
+
+class AdmissionController:
+    """Decides which /diagnose requests are served, queued or shed"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_in_flight: int = 64,
+        initial_limit: int = 16,
+        latency_target: float = 0.05,
+        max_queue: int = 128,
+        queue_timeout: float = 0.1,
+        rate: float = 0,
+        burst: float = 0,
+        max_queue_age: float = 0
+    ):
+        """
+        Args:
+            enabled: Admit everything without bookkeeping when False
+            max_in_flight: Upper bound of the adaptive concurrency limit
+            initial_limit: Concurrency limit to start from
+            latency_target: Seconds a diagnosis may take before the limit shrinks
+            max_queue: Requests allowed to wait for a slot
+            queue_timeout: Seconds a request waits for a slot before a 503
+            rate: Requests per second per client (0 disables rate limiting)
+            burst: Requests a client may send at once (default: 2 x rate)
+            max_queue_age: Seconds a request may have waited in front of the
+                app, per X-Request-Start, before it is shed (0 disables)
+        """
+        self.enabled = enabled
+        self.limiter = AIMDLimit(initial_limit, 1, max_in_flight, latency_target)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_queue_age = max_queue_age
+        self.buckets = TokenBucketTable(rate, burst or 2 * rate) if rate > 0 else None
+
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted_total = 0
+        self.critical_total = 0
+        self.rejected: Dict[str, int] = {'rate_limited': 0, 'overloaded': 0, 'queue_age': 0}
+        self._condition = threading.Condition()
+
+    def _retry_after_overload(self) -> int:
+        # Roughly how long the current backlog takes to drain
+        backlog = (self.in_flight + self.queued) / max(self.limiter.limit, 1.0)
+        return max(1, math.ceil(backlog * self.limiter.latency_target))
+
+    def _reject(self, status: int, reason: str, retry_after: int) -> Admission:
+        self.rejected[reason] += 1
+        logger.debug("Shed request (%s), retry after %ds", reason, retry_after)
+        return Admission(self, status, reason, retry_after)
+
+    def admit(
+        self,
+        client: str,
+        critical: bool = False,
+        queue_age: Optional[float] = None,
+        block: bool = True
+    ) -> Optional[Admission]:
+        """
+        Admit, queue or reject one request
+
+        Args:
+            client: Client identity for rate limiting
+            critical: Request has critical symptoms (never rejected)
+            queue_age: Seconds the request already waited before reaching the app
+            block: Wait in the queue for a slot; when False, return None
+                instead of waiting, and the caller finishes with
+                wait_for_slot() (e.g. on a worker thread, off an event loop)
+
+        Returns:
+            Admission; when not admitted, status is 429 or 503 and
+            retry_after the seconds to send in Retry-After
+        """
+        if not self.enabled:
+            return Admission(self, critical=critical)
+
+        if critical:
+            with self._condition:
+                self.in_flight += 1
+                self.admitted_total += 1
+                self.critical_total += 1
+            return Admission(self, critical=True)
+
+        if self.max_queue_age and queue_age is not None and queue_age > self.max_queue_age:
+            with self._condition:
+                return self._reject(503, 'queue_age', self._retry_after_overload())
+
+        if self.buckets is not None:
+            wait = self.buckets.take(client)
+            if wait > 0:
+                with self._condition:
+                    return self._reject(429, 'rate_limited', max(1, math.ceil(wait)))
+
+        with self._condition:
+            if self.in_flight < self.limiter.limit:
+                self.in_flight += 1
+                self.admitted_total += 1
+                return Admission(self)
+            if not block:
+                return None
+        return self.wait_for_slot()
+
+    def wait_for_slot(self) -> Admission:
+        """
+        Queue for a concurrency slot, for up to queue_timeout (blocking)
+
+        Returns:
+            Admission, rejected with 503 when the queue is full or the wait
+            runs out
+        """
+        with self._condition:
+            if self.in_flight >= self.limiter.limit:
+                if self.queued >= self.max_queue:
+                    return self._reject(503, 'overloaded', self._retry_after_overload())
+                self.queued += 1
+                try:
+                    deadline = time.monotonic() + self.queue_timeout
+                    while self.in_flight >= self.limiter.limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return self._reject(503, 'overloaded', self._retry_after_overload())
+                        self._condition.wait(remaining)
+                finally:
+                    self.queued -= 1
+            self.in_flight += 1
+            self.admitted_total += 1
+        return Admission(self)
+
+    def _release(self, latency: float):
+        with self._condition:
+            self.in_flight -= 1
+            self.limiter.record(latency, self.in_flight)
+            self._condition.notify()
+
+    def stats(self) -> Dict[str, float]:
+        """Current limit, load and counters"""
+        with self._condition:
+            return {
+                'enabled': self.enabled,
+                'limit': round(self.limiter.limit, 2),
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'admitted': self.admitted_total,
+                'critical': self.critical_total,
+                'rejected': dict(self.rejected),
+                'tracked_clients': len(self.buckets) if self.buckets is not None else 0
+            }
+
+
+def request_queue_age(header: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds since a proxy received the request, from X-Request-Start
+
+    Accepts 't=1697551234.123' (seconds, nginx) and plain epoch values in
+    seconds, milliseconds (Heroku) or microseconds.
+
+    Returns:
+        Age in seconds, or None if the header is missing or unreadable
+    """
+    if not header:
+        return None
+    header = header.strip()
+    if header.startswith('t='):
+        header = header[2:]
+    try:
+        value = float(header)
+    except ValueError:
+        return None
+    if value > 1e14:
+        value /= 1e6
+    elif value > 1e11:
+        value /= 1e3
+    return max(0.0, (time.time() if now is None else now) - value)
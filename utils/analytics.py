@@ -0,0 +1,380 @@
+"""
+Population Analytics Module
+===========================
+
+Live outbreak statistics from the diagnoses /diagnose already produces,
+in fixed memory and without storing requests.
+
+The route only appends (client, diagnoses, symptoms) references to a
+deque, an atomic operation that takes no lock; a background thread drains
+it every fraction of a second into sketches covering a sliding window
+split into buckets:
+
+- Count-Min sketches estimate how often each top disease, symptom and
+  symptom pair was seen (never under-counting);
+- Space-Saving summaries track the candidates for the most frequent ones;
+- HyperLogLog registers estimate distinct clients.
+
+A window is the element-wise sum (or maximum, for HyperLogLog) of its
+bucket sketches, and the oldest bucket is cleared when time moves on, so
+memory does not grow with traffic.
+"""
+
+from collections import Counter, deque
+from itertools import combinations
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import math
+import threading
+import time
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MASK_64 = (1 << 64) - 1
+
+# Symptoms per request used for co-occurrence pairs (the most severe are kept)
+MAX_PAIR_SYMPTOMS = 16
+
+
+def _hash64(key: str) -> int:
+    """64-bit hash of a key (stable within the process)"""
+    return hash(key) & MASK_64
+
+
+class CountMinSketch:
+    """Frequency estimates with a depth x width counter table"""
+
+    __slots__ = ('width', 'depth', 'table')
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+
+    def _columns(self, key_hash: int) -> List[int]:
+        # Double hashing: column i is (h1 + i * h2) mod width
+        h1, h2 = key_hash & 0xFFFFFFFF, (key_hash >> 32) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, counts: Dict[str, int]):
+        """
+        Add a batch of (key -> count) occurrences
+
+        Conservative update: each key's counters are only raised to its
+        current estimate plus its count, which keeps estimates from ever
+        being too low while collisions inflate them much less.
+        """
+        if not counts:
+            return
+        columns = np.array([self._columns(_hash64(key)) for key in counts], dtype=np.intp)
+        amounts = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        rows = np.arange(self.depth)
+        targets = self.table[rows, columns].min(axis=1) + amounts
+        for row in range(self.depth):
+            np.maximum.at(self.table[row], columns[:, row], targets)
+
+    def estimate(self, key: str, table: Optional[np.ndarray] = None) -> int:
+        """Estimated count of a key (in this sketch, or a merged table of the same shape)"""
+        table = self.table if table is None else table
+        return int(min(table[row, column] for row, column in enumerate(self._columns(_hash64(key)))))
+
+    def clear(self):
+        self.table.fill(0)
+
+
+class SpaceSaving:
+    """Heavy-hitter candidates with at most `capacity` counters"""
+
+    __slots__ = ('capacity', 'counts')
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+
+    def add(self, counts: Dict[str, int]):
+        for key, count in counts.items():
+            if key in self.counts:
+                self.counts[key] += count
+            elif len(self.counts) < self.capacity:
+                self.counts[key] = count
+            else:
+                # Replace the smallest counter, inheriting its count
+                smallest = min(self.counts, key=self.counts.__getitem__)
+                self.counts[key] = self.counts.pop(smallest) + count
+
+    def clear(self):
+        self.counts.clear()
+
+
+class HyperLogLog:
+    """Distinct-count estimate in 2**precision one-byte registers"""
+
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_many(self, keys: Iterable[str]):
+        precision = self.precision
+        rest_bits = 64 - precision
+        registers = self.registers
+        for key in keys:
+            key_hash = _hash64(key)
+            index = key_hash >> rest_bits
+            rank = rest_bits - (key_hash & ((1 << rest_bits) - 1)).bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+
+    @staticmethod
+    def estimate(registers: np.ndarray) -> int:
+        """Distinct count of (possibly merged) registers"""
+        m = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / float(np.sum(np.ldexp(1.0, -registers.astype(np.int64))))
+        empty = int(np.count_nonzero(registers == 0))
+        if raw <= 2.5 * m and empty:
+            # Small-range correction (linear counting)
+            raw = m * math.log(m / empty)
+        return int(round(raw))
+
+    def clear(self):
+        self.registers.fill(0)
+
+
+class _Bucket:
+    """Sketches of one time slice of the window"""
+
+    __slots__ = ('bucket_id', 'diagnoses', 'disease_counts', 'disease_top',
+                 'symptom_counts', 'symptom_top', 'pair_counts', 'pair_top', 'clients')
+
+    def __init__(self, width: int, depth: int, capacity: int, precision: int):
+        self.bucket_id = -1
+        self.diagnoses = 0
+        self.disease_counts = CountMinSketch(width, depth)
+        self.disease_top = SpaceSaving(capacity)
+        self.symptom_counts = CountMinSketch(width, depth)
+        self.symptom_top = SpaceSaving(capacity)
+        self.pair_counts = CountMinSketch(width, depth)
+        self.pair_top = SpaceSaving(capacity)
+        self.clients = HyperLogLog(precision)
+
+    def reset(self, bucket_id: int):
+        self.bucket_id = bucket_id
+        self.diagnoses = 0
+        for sketch in (self.disease_counts, self.disease_top, self.symptom_counts,
+                       self.symptom_top, self.pair_counts, self.pair_top, self.clients):
+            sketch.clear()
+
+
+class PopulationAnalytics:
+    """Sliding-window diagnosis statistics fed from the request path"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        window_seconds: float = 3600,
+        buckets: int = 12,
+        width: int = 2048,
+        depth: int = 4,
+        capacity: int = 128,
+        precision: int = 12,
+        max_pending: int = 65536,
+        drain_interval: float = 0.25
+    ):
+        """
+        Args:
+            enabled: When False, record() does nothing and no thread runs
+            window_seconds: Length of the sliding window
+            buckets: Time slices per window (the window slides by one slice)
+            width: Count-Min sketch columns (error about 2.7 / width of the total)
+            depth: Count-Min sketch rows (confidence 1 - e**-depth)
+            capacity: Heavy-hitter candidates kept per slice and statistic
+            precision: HyperLogLog precision (error about 1.04 / sqrt(2**precision))
+            max_pending: Events buffered for the background thread before
+                new ones are dropped
+            drain_interval: Seconds between drains of the buffer
+        """
+        self.enabled = enabled
+        self.bucket_count = max(1, buckets)
+        self.bucket_seconds = window_seconds / self.bucket_count
+        self.width = width
+        self.depth = depth
+        self.precision = precision
+        self.max_pending = max_pending
+        self.drain_interval = drain_interval
+        self.dropped = 0
+
+        self._pending: deque = deque()
+        self._buckets = [_Bucket(width, depth, capacity, precision) for _ in range(self.bucket_count)]
+        self._lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # (SymptomVector index, its names by position) of the last vector seen
+        self._symptom_names: Tuple[Any, List[str]] = (None, [])
+
+    def record(self, client: Optional[str], diagnoses: list, symptoms_data):
+        """
+        Queue one diagnosis for the statistics (request thread)
+
+        Only stores references: the caller must not mutate diagnoses or
+        symptoms_data afterwards.
+        """
+        if len(self._pending) < self.max_pending:
+            self._pending.append((client, diagnoses, symptoms_data))
+        else:
+            # Request threads drop concurrently; an unlocked += loses increments
+            with self._counter_lock:
+                self.dropped += 1
+
+    @property
+    def pending(self) -> int:
+        """Diagnoses waiting for the background thread"""
+        return len(self._pending)
+
+    def start(self):
+        """Start the background drain thread"""
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='analytics', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.drain()
+
+    def _run(self):
+        while not self._stop.wait(self.drain_interval):
+            try:
+                self.drain()
+            except Exception as e:
+                logger.error("Analytics drain failed: %s", e, exc_info=True)
+
+    def _active_symptoms(self, symptoms_data) -> List[str]:
+        """Active symptom names, most severe first"""
+        as_numpy = getattr(symptoms_data, 'as_numpy', None)
+        if as_numpy is None:
+            active = [(value, symptom) for symptom, value in symptoms_data.items() if value > 0]
+        else:
+            index, names = self._symptom_names
+            if index is not symptoms_data.index:
+                index, names = symptoms_data.index, list(symptoms_data.index)
+                self._symptom_names = (index, names)
+            values = as_numpy()
+            active = [(values[position].item(), names[position]) for position in np.flatnonzero(values > 0).tolist()]
+        active.sort(key=lambda entry: (-entry[0], entry[1]))
+        return [symptom for _, symptom in active]
+
+    def drain(self) -> int:
+        """Fold every queued event into the current bucket; returns the number folded"""
+        events = []
+        pending = self._pending
+        while True:
+            try:
+                events.append(pending.popleft())
+            except IndexError:
+                break
+        if not events:
+            return 0
+
+        diseases, symptoms, pairs, clients = Counter(), Counter(), Counter(), set()
+        for client, diagnoses, symptoms_data in events:
+            if diagnoses:
+                diseases[diagnoses[0]['disease']] += 1
+            active = self._active_symptoms(symptoms_data)
+            symptoms.update(active)
+            pairs.update(
+                '|'.join(pair) for pair in combinations(sorted(active[:MAX_PAIR_SYMPTOMS]), 2)
+            )
+            if client:
+                clients.add(client.split(',')[0].strip())
+
+        bucket_id = int(time.time() // self.bucket_seconds)
+        with self._lock:
+            bucket = self._buckets[bucket_id % self.bucket_count]
+            if bucket.bucket_id != bucket_id:
+                bucket.reset(bucket_id)
+            bucket.diagnoses += len(events)
+            bucket.disease_counts.add(diseases)
+            bucket.disease_top.add(diseases)
+            bucket.symptom_counts.add(symptoms)
+            bucket.symptom_top.add(symptoms)
+            bucket.pair_counts.add(pairs)
+            bucket.pair_top.add(pairs)
+            bucket.clients.add_many(clients)
+        return len(events)
+
+    @staticmethod
+    def _top(
+        sketches: List[CountMinSketch],
+        summaries: List[SpaceSaving],
+        top: int
+    ) -> List[Tuple[str, int]]:
+        """Most frequent keys of the window, counted with the merged sketch"""
+        if not sketches:
+            return []
+        merged = sketches[0].table.copy()
+        for sketch in sketches[1:]:
+            merged += sketch.table
+        candidates = set()
+        for summary in summaries:
+            candidates.update(summary.counts)
+        estimates = [(key, sketches[0].estimate(key, merged)) for key in candidates]
+        estimates.sort(key=lambda entry: (-entry[1], entry[0]))
+        return estimates[:top]
+
+    def snapshot(self, top: int = 10) -> Dict[str, Any]:
+        """
+        Statistics of the current window
+
+        Args:
+            top: Entries per ranking
+
+        Returns:
+            Dictionary for the /stats response
+        """
+        now = time.time()
+        current_id = int(now // self.bucket_seconds)
+        with self._lock:
+            live = sorted(
+                (bucket for bucket in self._buckets if current_id - self.bucket_count < bucket.bucket_id <= current_id),
+                key=lambda bucket: bucket.bucket_id
+            )
+            diseases = self._top([b.disease_counts for b in live], [b.disease_top for b in live], top)
+            symptoms = self._top([b.symptom_counts for b in live], [b.symptom_top for b in live], top)
+            pairs = self._top([b.pair_counts for b in live], [b.pair_top for b in live], top)
+            clients = np.zeros(1 << self.precision, dtype=np.uint8)
+            for bucket in live:
+                np.maximum(clients, bucket.clients.registers, out=clients)
+            timeline = [
+                {
+                    'start': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(bucket.bucket_id * self.bucket_seconds)),
+                    'diagnoses': bucket.diagnoses
+                }
+                for bucket in live
+            ]
+            total = sum(bucket.diagnoses for bucket in live)
+
+        return {
+            'window_seconds': self.bucket_seconds * self.bucket_count,
+            'bucket_seconds': self.bucket_seconds,
+            'diagnoses': total,
+            'distinct_clients': HyperLogLog.estimate(clients) if total else 0,
+            'top_diseases': [{'disease': key, 'count': count} for key, count in diseases],
+            'top_symptoms': [{'symptom': key, 'count': count} for key, count in symptoms],
+            'top_symptom_pairs': [{'symptoms': key.split('|'), 'count': count} for key, count in pairs],
+            'timeline': timeline,
+            'pending': self.pending,
+            'dropped': self.dropped,
+            'accuracy': {
+                # Over-count bound, as a fraction of the statistic's total
+                'count_error': round(math.e / self.width, 5),
+                'count_confidence': round(1 - math.exp(-self.depth), 4),
+                'distinct_error': round(1.04 / math.sqrt(1 << self.precision), 4)
+            }
+        }
@@ -7,17 +7,26 @@ Handles loading and caching of JSON data files.
 
 import json
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Callable, List, Optional, Tuple
 import logging
 
+from .schema import validate_knowledge_base
+from .snapshot import (
+    read_snapshot, read_snapshot_header, fingerprint_sources, stat_sources, LoadedSnapshot, SnapshotError
+)
+
 logger = logging.getLogger(__name__)
 
 class DataLoader:
     """Loads and caches JSON data files"""
 
-    def __init__(self, data_dir: Path):
+    SOURCE_FILES = ('diseases.json', 'recommendations.json')
+
+    def __init__(self, data_dir: Path, diagnostics: bool = True):
         self.data_dir = data_dir
+        self.diagnostics = diagnostics
         self._cache = {}
+        self._reload_listeners: List[Callable[[], None]] = []
 
     def load_json(self, filename: str, use_cache: bool = True) -> Dict[str, Any]:
         """
@@ -37,21 +46,23 @@ class DataLoader:
         file_path = self.data_dir / filename
 
         try:
-            # Log the paths for debugging
-            logger.info(f"Attempting to load: {file_path}")
-            logger.info(f"File exists: {file_path.exists()}")
-            logger.info(f"Data dir exists: {self.data_dir.exists()}")
-            
-            if self.data_dir.exists():
-                logger.info(f"Files in data dir: {list(self.data_dir.iterdir())}")
-            
+            if self.diagnostics:
+                # Log the paths for debugging
+                logger.info(f"Attempting to load: {file_path}")
+                logger.info(f"File exists: {file_path.exists()}")
+                logger.info(f"Data dir exists: {self.data_dir.exists()}")
+
+                if self.data_dir.exists():
+                    logger.info(f"Files in data dir: {list(self.data_dir.iterdir())}")
+
             with open(file_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
 
             if use_cache:
                 self._cache[filename] = data
 
-            logger.info(f"Loaded {filename} successfully ({len(str(data))} bytes)")
+            if self.diagnostics:
+                logger.info(f"Loaded {filename} successfully ({len(str(data))} bytes)")
             return data
 
         except FileNotFoundError:
@@ -75,11 +86,127 @@ class DataLoader:
         """Load recommendations configuration"""
         return self.load_json('recommendations.json')
 
+    def source_fingerprint(self) -> Optional[str]:
+        """Hash of the JSON source files, or None if they are not present"""
+        try:
+            return fingerprint_sources(self.data_dir / filename for filename in self.SOURCE_FILES)
+        except OSError:
+            return None
+
+    def sources_match(
+        self,
+        source_hash: Optional[str],
+        source_stats: Optional[Dict[str, List[int]]] = None
+    ) -> bool:
+        """
+        Check whether the JSON sources are the ones a snapshot was built from
+
+        Files whose size and modification time still equal the recorded
+        stats are taken as unchanged without reading them; otherwise (e.g.
+        after a fresh checkout) their contents are hashed and compared.
+
+        Args:
+            source_hash: Source hash recorded in the snapshot
+            source_stats: Source file stats recorded in the snapshot, if any
+
+        Returns:
+            True if the snapshot may be used (also when the JSON is absent)
+        """
+        if source_stats:
+            try:
+                if stat_sources(self.data_dir / filename for filename in self.SOURCE_FILES) == source_stats:
+                    return True
+            except OSError:
+                pass
+
+        current_hash = self.source_fingerprint()
+        return current_hash is None or current_hash == source_hash
+
+    def load_snapshot(self, snapshot_path: Path, verify: bool = False) -> Optional[LoadedSnapshot]:
+        """
+        Memory-map the prebuilt knowledge base snapshot if it is usable
+
+        The snapshot is ignored when it is missing or unreadable, or when
+        the JSON sources are present and no longer match the source hash
+        recorded at build time, so a stale build never shadows edits.
+
+        Args:
+            snapshot_path: Snapshot file written by build_snapshot
+            verify: Also recompute the snapshot's content hash
+
+        Returns:
+            LoadedSnapshot, or None if the JSON files should be loaded instead
+        """
+        if not snapshot_path.exists():
+            return None
+
+        try:
+            snapshot = read_snapshot(snapshot_path, verify=verify)
+        except SnapshotError as e:
+            logger.warning(f"Cannot use snapshot {snapshot_path.name}: {e}")
+            return None
+
+        if not self.sources_match(snapshot.source_hash, snapshot.source_stats):
+            logger.warning(f"Snapshot {snapshot_path.name} does not match the JSON files; ignoring it")
+            return None
+
+        return snapshot
+
+    def load_vocabulary(
+        self,
+        snapshot_path: Optional[Path] = None
+    ) -> Tuple[List[str], Dict[str, Any], Optional[str], str]:
+        """
+        Load what request validation needs without compiling the catalog
+
+        Used by shard coordinators, which never score locally. The symptom
+        names and recommendations config come from the snapshot header when
+        the snapshot is usable (same rules as load_snapshot); otherwise
+        diseases.json is parsed once, validated and dropped.
+
+        Args:
+            snapshot_path: Snapshot file written by build_snapshot, if any
+
+        Returns:
+            Tuple of (symptom names in catalog order, recommendations config,
+            source hash, source name)
+        """
+        if snapshot_path is not None and snapshot_path.exists():
+            try:
+                header = read_snapshot_header(snapshot_path)
+            except SnapshotError as e:
+                logger.warning(f"Cannot use snapshot {snapshot_path.name}: {e}")
+            else:
+                if self.sources_match(header.get('source_hash'), header.get('source_stats')):
+                    return (
+                        header['strings']['symptom_names'],
+                        header['recommendations'],
+                        header.get('source_hash'),
+                        'snapshot'
+                    )
+                logger.warning(f"Snapshot {snapshot_path.name} does not match the JSON files; ignoring it")
+
+        diseases_data = self.load_json('diseases.json', use_cache=False)
+        recommendations_config = self.get_recommendations_config()
+        validate_knowledge_base(diseases_data, recommendations_config)
+
+        # Symptom vocabulary in first-seen order, as CompiledKnowledgeBase builds it
+        symptom_names = list(dict.fromkeys(
+            symptom
+            for disease_info in diseases_data.get('diseases', {}).values()
+            for symptom in disease_info.get('symptoms', {})
+        ))
+        return symptom_names, recommendations_config, self.source_fingerprint(), 'json'
+
     def clear_cache(self):
         """Clear the data cache"""
         self._cache.clear()
         logger.info("Data cache cleared")
 
+    def add_reload_listener(self, callback: Callable[[], None]):
+        """Register a callback to run after reload_data swaps in new data"""
+        self._reload_listeners.append(callback)
+
     def reload_data(self):
         """Reload all data from files"""
         self.clear_cache()
@@ -87,3 +214,6 @@ class DataLoader:
         self.get_recommendations_config()
         logger.info("All data reloaded")
 
+        for callback in self._reload_listeners:
+            callback()
+
@@ -5,16 +5,79 @@ Diagnosis Engine Module
 Core logic for symptom analysis and disease probability calculation.
 """
 
-from typing import Dict, List, Tuple, Any
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Tuple, Any, Optional
+import heapq
 import logging
 
+import numpy as np
+
+from .knowledge_base import CompiledKnowledgeBase
+from .metrics import metrics
+from .results import DiagnosisResult
+from .validation import SymptomVector
+
 logger = logging.getLogger(__name__)
 
+# Upper bound on patients x diseases cells scored at once by analyze_batch
+BATCH_CHUNK_CELLS = 1 << 21
+
+# Any probability that rounds (to 0.1) up to a value lies at most this far below it
+ROUNDING_SLACK = 0.051
+
+# Catalog size from which analyze_symptoms prunes candidates by score bounds
+# (on smaller catalogs the bound computation costs more than it saves)
+PRUNING_MIN_DISEASES = 2000
+
 class DiagnosisEngine:
     """Handles disease probability calculations and diagnosis"""
 
+    # Symptoms that raise the overall severity on their own
+    HIGH_SEVERITY_SYMPTOMS = ('difficulty_breathing', 'chest_pain', 'confusion')
+
     def __init__(self, disease_database: Dict[str, Any]):
-        self.disease_database = disease_database
+        self._disease_database = disease_database
+        self.knowledge_base = CompiledKnowledgeBase(disease_database)
+        self.scoring_pool = None
+
+    @classmethod
+    def from_knowledge_base(cls, knowledge_base: CompiledKnowledgeBase) -> 'DiagnosisEngine':
+        """
+        Create an engine around an already compiled knowledge base
+
+        The disease_database dictionary is only rebuilt if something asks
+        for it.
+        """
+        engine = cls.__new__(cls)
+        engine._disease_database = None
+        engine.knowledge_base = knowledge_base
+        engine.scoring_pool = None
+        return engine
+
+    def attach_scoring_pool(self, scoring_pool):
+        """
+        Score large batches and catalogs on a process pool
+
+        Args:
+            scoring_pool: ScoringPool built from this engine's knowledge base
+                (None scores in-process again)
+        """
+        self.scoring_pool = scoring_pool
+
+    def _run_on_pool(self, method, *args):
+        """Call a ScoringPool method, or return None if the pool is unavailable"""
+        try:
+            return method(*args)
+        except (BrokenProcessPool, RuntimeError) as e:
+            # Shut down by a hot reload or a crashed worker: score in-process
+            logger.warning("Scoring pool unavailable, scoring in-process: %s", e)
+            return None
+
+    @property
+    def disease_database(self) -> Dict[str, Any]:
+        if self._disease_database is None:
+            self._disease_database = self.knowledge_base.to_disease_database()
+        return self._disease_database
 
     def calculate_disease_probability(
         self,
@@ -75,12 +138,115 @@ class DiagnosisEngine:
 
         return min(probability, 100)
 
+    def symptom_vector(self, symptoms_data) -> np.ndarray:
+        """
+        Get the scoring-ordered severity vector for one patient
+
+        A SymptomVector from the validator is already in scoring order and
+        is used without copying; plain dictionaries are encoded.
+        """
+        if isinstance(symptoms_data, SymptomVector):
+            return symptoms_data.as_numpy()[:len(self.knowledge_base.symptom_names)]
+        return self.knowledge_base.encode_symptoms(symptoms_data)
+
+    def symptom_matrix(self, symptoms_batch: List[Any]) -> np.ndarray:
+        """Stack many patients into a scoring-ordered patients x symptoms matrix"""
+        kb = self.knowledge_base
+        if symptoms_batch and all(isinstance(s, SymptomVector) for s in symptoms_batch):
+            width = len(symptoms_batch[0])
+            matrix = np.frombuffer(
+                b''.join(s.array.tobytes() for s in symptoms_batch), dtype=np.int8
+            ).reshape(len(symptoms_batch), width)
+            return matrix[:, :len(kb.symptom_names)]
+        return kb.encode_batch(symptoms_batch)
+
+    @staticmethod
+    def select_top(
+        probabilities: np.ndarray,
+        min_confidence: float,
+        top_k: Optional[int] = None,
+        rows: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Pick the diseases to report, in ranking order
+
+        Diseases are ranked by rounded confidence (highest first), ties
+        keeping catalog order. With top_k, a partial selection narrows the
+        pool to diseases that could still round into the top K before the
+        exact ranking is taken with a bounded heap.
+
+        Args:
+            probabilities: Adjusted probability of every disease
+            min_confidence: Minimum confidence threshold
+            top_k: Number of diseases to keep (default: all above threshold)
+            rows: Disease rows of the probabilities when only a subset was
+                scored, in ascending order (default: every row)
+
+        Returns:
+            List of (disease row, unrounded probability) tuples
+        """
+        selected = np.flatnonzero(probabilities >= min_confidence)
+
+        if top_k is not None and len(selected) > top_k:
+            if top_k <= 0:
+                return []
+            pool = probabilities[selected]
+            kth_best = np.partition(pool, len(pool) - top_k)[len(pool) - top_k].item()
+            selected = selected[pool >= round(kth_best, 1) - ROUNDING_SLACK]
+
+        selected_rows = selected if rows is None else rows[selected]
+        ranked = [
+            (-round(probability, 1), row, probability)
+            for row, probability in zip(selected_rows.tolist(), probabilities[selected].tolist())
+        ]
+        if top_k is not None and len(ranked) > top_k:
+            ranked = heapq.nsmallest(top_k, ranked)
+        else:
+            ranked.sort()
+
+        return [(row, probability) for _, row, probability in ranked]
+
+    @staticmethod
+    def _prune_candidates(
+        rows: np.ndarray,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        min_confidence: float,
+        top_k: Optional[int]
+    ) -> np.ndarray:
+        """
+        Drop candidates that cannot be selected, given bounds on their scores
+
+        A disease is skipped when its upper bound is below min_confidence,
+        or (with top_k) below the rounded K-th best lower bound minus the
+        rounding slack: at least K diseases are certain to score that
+        well, so select_top would never reach it. The survivors always
+        include every disease select_top would return.
+
+        Args:
+            rows: Candidate disease rows, ascending
+            lower: Lower bound of each candidate's adjusted probability
+            upper: Upper bound of each candidate's adjusted probability
+            min_confidence: Minimum confidence threshold
+            top_k: Number of diseases to keep (default: all above threshold)
+
+        Returns:
+            Rows still to be scored exactly, ascending
+        """
+        floor = min_confidence
+        if top_k is not None and 0 < top_k < len(rows):
+            kth_lower = np.partition(lower, len(lower) - top_k)[len(lower) - top_k].item()
+            if kth_lower >= min_confidence:
+                floor = max(floor, round(kth_lower, 1) - ROUNDING_SLACK)
+        return rows[upper >= floor]
+
     def analyze_symptoms(
         self,
         symptoms_data: Dict[str, int],
         temperature: float,
-        min_confidence: float = 20
-    ) -> List[Dict[str, Any]]:
+        min_confidence: float = 20,
+        top_k: Optional[int] = None
+    ) -> List[DiagnosisResult]:
         """
         Analyze symptoms and return potential diagnoses
 
@@ -88,40 +254,133 @@ class DiagnosisEngine:
             symptoms_data: Dictionary of symptom severities
             temperature: Patient's temperature
             min_confidence: Minimum confidence threshold
+            top_k: Return only the K most confident diagnoses (default: all)
 
         Returns:
-            List of potential diagnoses sorted by confidence
+            List of potential diagnoses sorted by confidence, as DiagnosisResult
+            records (which read like the API dictionaries)
         """
-        disease_matches = []
-
-        for disease_name, disease_info in self.disease_database.items():
-            # Calculate base probability
-            probability, matched_symptoms = self.calculate_disease_probability(
-                symptoms_data, disease_info
+        kb = self.knowledge_base
+        symptom_vector = self.symptom_vector(symptoms_data)
+        pool = self.scoring_pool
+
+        selection = None
+        if pool is not None and kb.disease_count >= pool.min_diseases:
+            selection = self._run_on_pool(
+                pool.select_rows, symptom_vector, temperature, min_confidence, top_k
             )
 
-            # Adjust for temperature
-            probability = self.adjust_probability_by_temperature(
-                probability, temperature, disease_info
+        if selection is None:
+            bounds = None
+            if min_confidence > 0 and kb.disease_count >= PRUNING_MIN_DISEASES:
+                bounds = kb.candidate_bounds(symptom_vector, temperature, min_confidence)
+
+            if bounds is not None:
+                rows = self._prune_candidates(*bounds, min_confidence, top_k)
+                probabilities = kb.adjust_by_temperature(
+                    kb.row_probabilities(symptom_vector, rows), temperature, rows
+                )
+                if metrics.enabled:
+                    metrics.inc('candidates_pruned_total', len(bounds[0]) - len(rows))
+            elif min_confidence > 0:
+                # Diseases without an active symptom score 0 and cannot qualify
+                rows, probabilities = kb.score_sparse(symptom_vector, temperature)
+            else:
+                rows, probabilities = None, kb.score(symptom_vector, temperature)
+            selection = self.select_top(probabilities, min_confidence, top_k, rows)
+
+            if metrics.enabled:
+                qualifying = int(np.count_nonzero(probabilities >= min_confidence))
+                metrics.inc('candidates_scored_total', len(probabilities))
+                metrics.inc('results_below_threshold_total', len(probabilities) - qualifying)
+                metrics.inc('results_truncated_total', qualifying - len(selection))
+
+        disease_matches = kb.build_results(selection, symptom_vector)
+
+        logger.debug("Found %d potential diagnoses", len(disease_matches))
+        return disease_matches
+
+    def diagnose_scores(
+        self,
+        probabilities: np.ndarray,
+        symptom_vector: np.ndarray,
+        min_confidence: float = 20,
+        top_k: Optional[int] = None
+    ) -> List[DiagnosisResult]:
+        """
+        Build diagnoses from already computed probabilities
+
+        Used by incremental sessions, which keep every disease's adjusted
+        probability up to date themselves.
+
+        Args:
+            probabilities: Adjusted probability of every disease
+            symptom_vector: Scoring-ordered severity vector of the patient
+            min_confidence: Minimum confidence threshold
+            top_k: Return only the K most confident diagnoses (default: all)
+
+        Returns:
+            List of potential diagnoses, as from analyze_symptoms
+        """
+        return self.knowledge_base.build_results(
+            self.select_top(probabilities, min_confidence, top_k), symptom_vector
+        )
+
+    def analyze_batch(
+        self,
+        symptoms_batch: List[Dict[str, int]],
+        temperatures: List[float],
+        min_confidence: float = 20,
+        top_k: Optional[int] = None
+    ) -> List[List[DiagnosisResult]]:
+        """
+        Analyze many patients at once
+
+        Patients are scored together as a patients x symptoms matrix, in
+        chunks sized to keep the intermediate score matrix bounded.
+
+        Args:
+            symptoms_batch: List of symptom severity dictionaries
+            temperatures: Temperature of each patient
+            min_confidence: Minimum confidence threshold
+            top_k: Keep only the K most confident diagnoses per patient
+
+        Returns:
+            One list of diagnoses (as from analyze_symptoms) per patient
+        """
+        kb = self.knowledge_base
+        pool = self.scoring_pool
+
+        if pool is not None and len(symptoms_batch) > pool.chunk_size:
+            symptom_matrix = self.symptom_matrix(symptoms_batch)
+            selections = self._run_on_pool(
+                pool.select_patients, symptom_matrix,
+                np.asarray(temperatures, dtype=np.float64), min_confidence, top_k
+            )
+            if selections is not None:
+                results = [
+                    kb.build_results(selection, symptom_matrix[patient])
+                    for patient, selection in enumerate(selections)
+                ]
+                logger.debug("Analyzed batch of %d patients on %d processes", len(results), pool.processes)
+                return results
+
+        chunk_size = max(1, BATCH_CHUNK_CELLS // max(kb.disease_count, 1))
+        results: List[List[DiagnosisResult]] = []
+
+        for start in range(0, len(symptoms_batch), chunk_size):
+            symptom_matrix = self.symptom_matrix(symptoms_batch[start:start + chunk_size])
+            probabilities = kb.score_batch(
+                symptom_matrix, np.asarray(temperatures[start:start + chunk_size], dtype=np.float64)
             )
 
-            # Only include if above threshold
-            if probability >= min_confidence:
-                disease_matches.append({
-                    'disease': disease_name,
-                    'description': disease_info.get('description', disease_name),
-                    'confidence': round(probability, 1),
-                    'urgency': disease_info.get('urgency', 'normal'),
-                    'severity': disease_info.get('severity', 'medium'),
-                    'matched_symptoms': matched_symptoms,
-                    'incubation': disease_info.get('incubation', 'unknown')
-                })
-
-        # Sort by confidence (highest first)
-        disease_matches.sort(key=lambda x: x['confidence'], reverse=True)
-
-        logger.info(f"Found {len(disease_matches)} potential diagnoses")
-        return disease_matches
+            for patient in range(symptom_matrix.shape[0]):
+                results.append(kb.build_results(
+                    self.select_top(probabilities[patient], min_confidence, top_k), symptom_matrix[patient]
+                ))
+
+        logger.debug("Analyzed batch of %d patients", len(results))
+        return results
 
     def assess_overall_severity(
         self,
@@ -153,8 +412,7 @@ class DiagnosisEngine:
             severity_score += 1
 
         # Critical symptoms
-        high_severity_symptoms = ['difficulty_breathing', 'chest_pain', 'confusion']
-        for symptom in high_severity_symptoms:
+        for symptom in self.HIGH_SEVERITY_SYMPTOMS:
             symptom_value = symptoms_data.get(symptom, 0)
             if symptom_value >= 7:
                 severity_score += 3
@@ -0,0 +1,269 @@
+"""
+Hot Reload Module
+=================
+
+Atomic hot-swapping of the diagnosis and recommendation engines when the
+knowledge base changes, without restarting worker processes.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+import os
+import threading
+import time
+import logging
+
+from .data_loader import DataLoader
+from .diagnosis_engine import DiagnosisEngine
+from .metrics import metrics
+from .parallel import ScoringPool
+from .recommendation_engine import RecommendationEngine
+from .response_encoder import ResponseEncoder
+from .result_cache import DiagnosisCache
+from .schema import validate_knowledge_base
+from .validation import SymptomValidator
+
+logger = logging.getLogger(__name__)
+
+
+class EngineSnapshot(NamedTuple):
+    """Immutable set of engines serving one knowledge base version"""
+    diagnosis_engine: DiagnosisEngine
+    recommendation_engine: RecommendationEngine
+    cache: DiagnosisCache
+    validator: SymptomValidator
+    encoder: ResponseEncoder
+    knowledge_base_hash: Optional[str]
+    source: str
+    generation: int
+    loaded_at: float
+
+
+class EngineHolder:
+    """
+    Holds the current EngineSnapshot and swaps in new ones
+
+    Requests read `holder.current` once and use that snapshot throughout,
+    so a swap (a single reference assignment) never exposes a half-loaded
+    state. Each snapshot carries its own result cache, which makes cached
+    payloads from the previous knowledge base unreachable after a swap.
+    """
+
+    def __init__(
+        self,
+        data_loader: DataLoader,
+        cache_size: int = 4096,
+        cache_ttl: float = 300,
+        snapshot_path: Optional[Path] = None,
+        min_temperature: float = 35.0,
+        max_temperature: float = 43.0,
+        scoring_processes: int = 0,
+        scoring_chunk_size: int = 256,
+        scoring_min_diseases: int = 50000,
+        coordinator: bool = False
+    ):
+        """
+        Args:
+            coordinator: Shard coordinator mode: load only the symptom
+                vocabulary and recommendations config, never the compiled
+                catalog or a scoring pool (diagnoses come from the shards)
+        """
+        self.data_loader = data_loader
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.snapshot_path = snapshot_path
+        self.min_temperature = min_temperature
+        self.max_temperature = max_temperature
+        self.scoring_processes = scoring_processes
+        self.scoring_chunk_size = scoring_chunk_size
+        self.scoring_min_diseases = scoring_min_diseases
+        self.coordinator = coordinator
+        self.current: Optional[EngineSnapshot] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        # DataLoader.reload_data() parses fresh data; rebuild engines from it
+        data_loader.add_reload_listener(self._rebuild_from_loader)
+
+    def load(self) -> EngineSnapshot:
+        """
+        Build engines from the snapshot (if configured and usable) or the
+        JSON files, and swap them in
+
+        Returns:
+            The newly installed EngineSnapshot
+
+        Raises:
+            Exception: If loading or validation fails; the engines already
+                being served are left in place
+        """
+        with self._lock:
+            started = time.perf_counter()
+            if self.coordinator:
+                engines = self._install_coordinator()
+                self._record_load(engines, started)
+                return engines
+
+            snapshot = (
+                self.data_loader.load_snapshot(self.snapshot_path)
+                if self.snapshot_path is not None else None
+            )
+            if snapshot is not None:
+                engines = self._install(
+                    DiagnosisEngine.from_knowledge_base(snapshot.knowledge_base),
+                    snapshot.recommendations_config,
+                    snapshot.source_hash,
+                    'snapshot'
+                )
+            else:
+                self.data_loader.clear_cache()
+                engines = self._install_from_loader()
+
+            self._record_load(engines, started)
+            return engines
+
+    def _rebuild_from_loader(self):
+        with self._lock:
+            started = time.perf_counter()
+            if self.coordinator:
+                engines = self._install_coordinator()
+            else:
+                engines = self._install_from_loader()
+            self._record_load(engines, started)
+
+    @staticmethod
+    def _record_load(engines: EngineSnapshot, started: float):
+        """Export how long a (re)load took and what it installed"""
+        metrics.observe_seconds('knowledge_base_load_seconds', time.perf_counter() - started, source=engines.source)
+        metrics.set_gauge('knowledge_base_generation', engines.generation)
+        metrics.set_gauge('knowledge_base_diseases', engines.diagnosis_engine.knowledge_base.disease_count)
+
+    def _install_from_loader(self) -> EngineSnapshot:
+        diseases_data = self.data_loader.load_json('diseases.json')
+        recommendations_config = self.data_loader.get_recommendations_config()
+        validate_knowledge_base(diseases_data, recommendations_config)
+
+        return self._install(
+            DiagnosisEngine(diseases_data.get('diseases', {})),
+            recommendations_config,
+            self.data_loader.source_fingerprint(),
+            'json'
+        )
+
+    def _install_coordinator(self) -> EngineSnapshot:
+        """Publish engines that validate and recommend but hold no diseases"""
+        symptom_names, recommendations_config, source_hash, source = self.data_loader.load_vocabulary(
+            self.snapshot_path
+        )
+        return self._install(DiagnosisEngine({}), recommendations_config, source_hash, source, symptom_names)
+
+    def _install(
+        self,
+        diagnosis_engine: DiagnosisEngine,
+        recommendations_config: Dict[str, Any],
+        knowledge_base_hash: Optional[str],
+        source: str,
+        symptom_names: Optional[List[str]] = None
+    ) -> EngineSnapshot:
+        """Compile the remaining parts and publish the new snapshot"""
+        recommendation_engine = RecommendationEngine(recommendations_config)
+        if symptom_names is None:
+            symptom_names = diagnosis_engine.knowledge_base.symptom_names
+
+        # Scored symptoms come first so validated vectors feed the scorer
+        # directly; the rest are only looked up by name
+        validator = SymptomValidator(
+            list(symptom_names)
+            + list(DiagnosisEngine.HIGH_SEVERITY_SYMPTOMS)
+            + recommendation_engine.referenced_symptoms(),
+            self.min_temperature,
+            self.max_temperature
+        )
+
+        # Optional process pool over a shared-memory copy of this version
+        if self.scoring_processes > 0 and not self.coordinator:
+            diagnosis_engine.attach_scoring_pool(ScoringPool(
+                diagnosis_engine.knowledge_base,
+                self.scoring_processes,
+                self.scoring_chunk_size,
+                self.scoring_min_diseases
+            ))
+
+        self._generation += 1
+        previous = self.current
+        engines = EngineSnapshot(
+            diagnosis_engine=diagnosis_engine,
+            recommendation_engine=recommendation_engine,
+            cache=DiagnosisCache(self.cache_size, self.cache_ttl),
+            validator=validator,
+            encoder=ResponseEncoder(recommendation_engine),
+            knowledge_base_hash=knowledge_base_hash,
+            source=source,
+            generation=self._generation,
+            loaded_at=time.time()
+        )
+
+        # The swap itself: one reference assignment
+        self.current = engines
+
+        # Requests still holding the old snapshot fall back to in-process
+        # scoring once its pool has shut down
+        if previous is not None and previous.diagnosis_engine.scoring_pool is not None:
+            threading.Thread(
+                target=previous.diagnosis_engine.scoring_pool.close, name='scoring-pool-close', daemon=True
+            ).start()
+
+        if self.coordinator:
+            catalog = f"{len(symptom_names)} symptoms for shard coordination"
+        else:
+            catalog = f"{diagnosis_engine.knowledge_base.disease_count} diseases"
+        logger.info(
+            f"Knowledge base generation {engines.generation} active: "
+            f"{catalog} from {source} ({str(knowledge_base_hash)[:12]})"
+        )
+        return engines
+
+
+class KnowledgeBaseWatcher:
+    """Background thread that reloads the engines when data files change"""
+
+    def __init__(self, holder: EngineHolder, paths: List[Path], interval: float = 2.0):
+        self.holder = holder
+        self.paths = [Path(path) for path in paths]
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='kb-watcher', daemon=True)
+
+    def _signature(self) -> tuple:
+        signature = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def start(self):
+        self._thread.start()
+        logger.info(f"Watching {len(self.paths)} knowledge base files every {self.interval}s")
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        last_seen = self._signature()
+        while not self._stop.wait(self.interval):
+            signature = self._signature()
+            if signature == last_seen:
+                continue
+
+            # Wait until the files stop changing before compiling
+            if self._stop.wait(self.interval) or self._signature() != signature:
+                continue
+            last_seen = signature
+
+            try:
+                self.holder.load()
+            except Exception as e:
+                logger.error(f"Knowledge base reload failed, keeping current engines: {e}")
@@ -0,0 +1,607 @@
+"""
+Knowledge Base Compiler Module
+==============================
+
+Compiles the disease database into NumPy tables for vectorized scoring.
+"""
+
+from typing import Dict, List, Sequence, Tuple, Any, Optional, Union
+import logging
+
+import numpy as np
+
+from .results import DiagnosisResult
+from .temperature import GRID_ARRAY, temperature_bucket, temperature_buckets
+
+logger = logging.getLogger(__name__)
+
+# Temperature multiplier of each code in the temperature bucket table:
+# outside the disease's range, within 1°C of its upper bound, in range
+TEMPERATURE_MULTIPLIERS = np.array([1.0, 1.1, 1.2], dtype=np.float64)
+MAX_TEMPERATURE_MULTIPLIER = 1.2
+
+# Relative slack added to score bounds, far above the rounding error of
+# summing a disease's weighted symptoms in a different order
+BOUND_TOLERANCE = 1e-9
+
+class CompiledKnowledgeBase:
+    """
+    Disease database compiled into fixed-shape NumPy arrays
+
+    Each disease row stores its symptoms in the same order as the source
+    JSON (padded with zero weights), so the vectorized column sweep adds the
+    weighted scores in exactly the order the per-disease loop does and
+    produces bit-identical probabilities.
+    """
+
+    def __init__(self, disease_database: Dict[str, Any]):
+        self.disease_names: List[str] = list(disease_database.keys())
+
+        # Symptom vocabulary in first-seen order
+        self.symptom_names: List[str] = []
+        self.symptom_index: Dict[str, int] = {}
+        for disease_info in disease_database.values():
+            for symptom in disease_info.get('symptoms', {}):
+                if symptom not in self.symptom_index:
+                    self.symptom_index[symptom] = len(self.symptom_names)
+                    self.symptom_names.append(symptom)
+
+        self.symptom_display_names: List[str] = [
+            symptom.replace('_', ' ').title() for symptom in self.symptom_names
+        ]
+
+        disease_count = len(self.disease_names)
+        row_width = max(
+            (len(info.get('symptoms', {})) for info in disease_database.values()),
+            default=0
+        )
+
+        self.row_symptoms = np.zeros((disease_count, row_width), dtype=np.intp)
+        self.row_weights = np.zeros((disease_count, row_width), dtype=np.float64)
+        self.row_lengths = np.zeros(disease_count, dtype=np.intp)
+        self.total_possible = np.zeros(disease_count, dtype=np.float64)
+        self.temp_low = np.zeros(disease_count, dtype=np.float64)
+        self.temp_high = np.zeros(disease_count, dtype=np.float64)
+
+        self.descriptions: List[str] = []
+        self.urgencies: List[str] = []
+        self.severities: List[str] = []
+        self.incubations: List[str] = []
+
+        for row, (disease_name, disease_info) in enumerate(disease_database.items()):
+            disease_symptoms = disease_info.get('symptoms', {})
+
+            # Accumulate the denominator in source order, as the loop does
+            total_possible = 0
+            for col, (symptom, weight) in enumerate(disease_symptoms.items()):
+                self.row_symptoms[row, col] = self.symptom_index[symptom]
+                self.row_weights[row, col] = weight
+                total_possible += weight * 10
+
+            self.row_lengths[row] = len(disease_symptoms)
+            self.total_possible[row] = total_possible
+
+            temp_range = disease_info.get('temp_range', [0, 100])
+            self.temp_low[row] = temp_range[0]
+            self.temp_high[row] = temp_range[1]
+
+            self.descriptions.append(disease_info.get('description', disease_name))
+            self.urgencies.append(disease_info.get('urgency', 'normal'))
+            self.severities.append(disease_info.get('severity', 'medium'))
+            self.incubations.append(disease_info.get('incubation', 'unknown'))
+
+        self._build_inverted_index()
+        self._finalize()
+
+        logger.debug(
+            "Compiled %d diseases over %d symptoms", disease_count, len(self.symptom_names)
+        )
+
+    # Arrays and string tables that fully describe a compiled knowledge base
+    ARRAY_FIELDS = (
+        'row_symptoms', 'row_weights', 'row_lengths', 'total_possible',
+        'temp_low', 'temp_high', 'posting_rows', 'posting_weights', 'posting_offsets'
+    )
+    STRING_FIELDS = (
+        'disease_names', 'symptom_names', 'descriptions', 'urgencies', 'severities', 'incubations'
+    )
+    # String tables with one entry per disease row
+    DISEASE_STRING_FIELDS = ('disease_names', 'descriptions', 'urgencies', 'severities', 'incubations')
+
+    @classmethod
+    def from_tables(
+        cls,
+        arrays: Dict[str, np.ndarray],
+        strings: Dict[str, Sequence[str]]
+    ) -> 'CompiledKnowledgeBase':
+        """
+        Rebuild a compiled knowledge base from previously exported tables
+
+        Arrays and string sequences are used as given (no copy), so they
+        may be read-only views over a snapshot file.
+
+        Args:
+            arrays: One array per name in ARRAY_FIELDS
+            strings: One string sequence per name in STRING_FIELDS
+
+        Returns:
+            CompiledKnowledgeBase instance
+        """
+        kb = cls.__new__(cls)
+        for name in cls.ARRAY_FIELDS:
+            setattr(kb, name, arrays[name])
+        for name in cls.STRING_FIELDS:
+            setattr(kb, name, strings[name])
+
+        kb.symptom_index = {symptom: index for index, symptom in enumerate(kb.symptom_names)}
+        kb.symptom_display_names = [
+            symptom.replace('_', ' ').title() for symptom in kb.symptom_names
+        ]
+        kb._finalize()
+        return kb
+
+    def export_tables(self) -> Tuple[Dict[str, np.ndarray], Dict[str, List[str]]]:
+        """Return the (arrays, strings) tables accepted by from_tables"""
+        arrays = {name: getattr(self, name) for name in self.ARRAY_FIELDS}
+        strings = {name: getattr(self, name) for name in self.STRING_FIELDS}
+        return arrays, strings
+
+    def _finalize(self):
+        """Derive the helper arrays used while scoring"""
+        self._has_denominator = self.total_possible > 0
+        self._safe_denominator = np.where(self._has_denominator, self.total_possible, 1.0)
+
+        # Most probability points one unit of each symptom's severity adds to
+        # any disease (0 for symptoms without postings)
+        contributions = np.where(
+            self._has_denominator[self.posting_rows],
+            self.posting_weights / self._safe_denominator[self.posting_rows] * 100,
+            0.0
+        )
+        self.symptom_impacts = np.zeros(len(self.symptom_names), dtype=np.float64)
+        present = np.flatnonzero(np.diff(self.posting_offsets))
+        if len(present):
+            self.symptom_impacts[present] = np.maximum.reduceat(contributions, self.posting_offsets[present])
+        # Bounds assume no weight lowers a score
+        self._bounded = bool((self.posting_weights >= 0).all())
+
+        # Multiplier code of every disease at every grid temperature (one
+        # byte per cell, computed with the same comparisons as
+        # adjust_by_temperature)
+        grid = GRID_ARRAY[:, np.newaxis]
+        in_range = (self.temp_low <= grid) & (grid <= self.temp_high)
+        near_upper = np.abs(grid - self.temp_high) <= 1.0
+        self._temperature_codes = np.where(in_range, 2, np.where(near_upper, 1, 0)).astype(np.uint8)
+
+        # Symptom indices of the rows that have been reported, as tuples
+        self._reported_rows: Dict[int, Tuple[int, ...]] = {}
+
+    def _build_inverted_index(self):
+        """
+        Build symptom -> (disease rows, weights) postings in CSR layout
+
+        Postings for symptom i are posting_rows/posting_weights sliced by
+        posting_offsets[i]:posting_offsets[i + 1], with rows ascending.
+        """
+        present = np.arange(self.row_symptoms.shape[1]) < self.row_lengths[:, np.newaxis]
+        rows, cols = np.nonzero(present)
+        symptoms = self.row_symptoms[rows, cols]
+
+        order = np.argsort(symptoms, kind='stable')
+        self.posting_rows = rows[order]
+        self.posting_weights = self.row_weights[rows, cols][order]
+        self.posting_offsets = np.zeros(len(self.symptom_names) + 1, dtype=np.intp)
+        np.cumsum(np.bincount(symptoms, minlength=len(self.symptom_names)), out=self.posting_offsets[1:])
+
+    @property
+    def disease_count(self) -> int:
+        return len(self.disease_names)
+
+    def to_disease_database(self) -> Dict[str, Any]:
+        """Rebuild the diseases.json style dictionary from the compiled tables"""
+        disease_database = {}
+        for row, disease_name in enumerate(self.disease_names):
+            length = int(self.row_lengths[row])
+            disease_database[disease_name] = {
+                'symptoms': {
+                    self.symptom_names[symptom]: weight
+                    for symptom, weight in zip(
+                        self.row_symptoms[row, :length].tolist(),
+                        self.row_weights[row, :length].tolist()
+                    )
+                },
+                'temp_range': [self.temp_low[row].item(), self.temp_high[row].item()],
+                'severity': self.severities[row],
+                'urgency': self.urgencies[row],
+                'description': self.descriptions[row],
+                'incubation': self.incubations[row]
+            }
+        return disease_database
+
+    def postings(self, symptom: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the (disease rows, weights) postings of one symptom"""
+        start, end = self.posting_offsets[symptom], self.posting_offsets[symptom + 1]
+        return self.posting_rows[start:end], self.posting_weights[start:end]
+
+    def candidate_rows(self, symptom_vector: np.ndarray) -> np.ndarray:
+        """
+        Find the diseases sharing at least one active symptom
+
+        Args:
+            symptom_vector: Vector produced by encode_symptoms
+
+        Returns:
+            Sorted array of disease rows
+        """
+        active = np.flatnonzero(symptom_vector)
+        if len(active) == 0:
+            return np.empty(0, dtype=np.intp)
+        if len(active) == 1:
+            return self.postings(active[0])[0]
+        return np.unique(np.concatenate([self.postings(symptom)[0] for symptom in active.tolist()]))
+
+    def candidate_bounds(
+        self,
+        symptom_vector: np.ndarray,
+        temperature: float,
+        min_confidence: float
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Bound the adjusted probabilities of the diseases that could qualify
+
+        MaxScore-style: active symptoms are ordered by the most they can add
+        to any disease, and the weakest ones whose combined best case stays
+        below min_confidence (even with the largest temperature boost) are
+        optional. A disease listing only optional symptoms cannot qualify,
+        so only the postings of the other (essential) symptoms are read.
+        Their weighted sum per disease is a lower bound of its score;
+        adding the optional symptoms' best case gives an upper bound.
+
+        Args:
+            symptom_vector: Vector produced by encode_symptoms
+            temperature: Patient's temperature
+            min_confidence: Minimum confidence threshold (above 0)
+
+        Returns:
+            Tuple of (sorted disease rows, lower bounds, upper bounds) of
+            the adjusted probabilities, or None when negative weights or
+            severities do not allow bounds
+        """
+        if not self._bounded:
+            return None
+
+        active = np.flatnonzero(symptom_vector)
+        values = symptom_vector[active].astype(np.float64)
+        if len(values) and values.min() < 0:
+            return None
+        best_cases = values * self.symptom_impacts[active]
+        order = np.argsort(best_cases, kind='stable')
+        cumulative = np.cumsum(best_cases[order])
+
+        optional_count = int(np.searchsorted(
+            cumulative * (MAX_TEMPERATURE_MULTIPLIER * (1 + BOUND_TOLERANCE)), min_confidence, side='left'
+        ))
+        optional_best = cumulative[optional_count - 1] if optional_count else 0.0
+        essential = order[optional_count:].tolist()
+        if not essential:
+            empty = np.empty(0, dtype=np.float64)
+            return np.empty(0, dtype=np.intp), empty, empty
+
+        posting_rows, posting_scores = [], []
+        for position in essential:
+            rows, weights = self.postings(active[position])
+            posting_rows.append(rows)
+            posting_scores.append(weights * values[position])
+        rows, inverse = np.unique(np.concatenate(posting_rows), return_inverse=True)
+        essential_scores = np.bincount(inverse, weights=np.concatenate(posting_scores), minlength=len(rows))
+
+        essential_probability = np.where(
+            self._has_denominator[rows],
+            (essential_scores / self._safe_denominator[rows]) * 100,
+            0.0
+        )
+        lower = essential_probability * (1 - BOUND_TOLERANCE)
+        upper = (essential_probability + optional_best) * (1 + BOUND_TOLERANCE) + BOUND_TOLERANCE
+        return (
+            rows,
+            self.adjust_by_temperature(lower, temperature, rows),
+            self.adjust_by_temperature(upper, temperature, rows)
+        )
+
+    def encode_symptoms(self, symptoms_data: Dict[str, int]) -> np.ndarray:
+        """
+        Convert a symptom dictionary into a vocabulary-ordered vector
+
+        Args:
+            symptoms_data: Dictionary of symptom names to severity (0-10)
+
+        Returns:
+            Float vector indexed like the compiled symptom vocabulary
+        """
+        vector = np.zeros(len(self.symptom_names), dtype=np.float64)
+        for symptom, value in symptoms_data.items():
+            index = self.symptom_index.get(symptom)
+            if index is not None and value > 0:
+                vector[index] = value
+        return vector
+
+    def encode_batch(self, symptoms_batch: List[Dict[str, int]]) -> np.ndarray:
+        """
+        Convert many symptom dictionaries into a patients x symptoms matrix
+
+        Args:
+            symptoms_batch: List of symptom dictionaries
+
+        Returns:
+            Float matrix with one vocabulary-ordered row per patient
+        """
+        matrix = np.zeros((len(symptoms_batch), len(self.symptom_names)), dtype=np.float64)
+        symptom_index = self.symptom_index
+        for patient, symptoms_data in enumerate(symptoms_batch):
+            for symptom, value in symptoms_data.items():
+                index = symptom_index.get(symptom)
+                if index is not None and value > 0:
+                    matrix[patient, index] = value
+        return matrix
+
+    def score(self, symptom_vector: np.ndarray, temperature: float) -> np.ndarray:
+        """
+        Score every disease for one patient
+
+        Args:
+            symptom_vector: Vector produced by encode_symptoms
+            temperature: Patient's temperature
+
+        Returns:
+            Temperature-adjusted probability for each disease (unrounded)
+        """
+        return self.score_batch(symptom_vector[np.newaxis, :], np.array([temperature]))[0]
+
+    def score_sparse(
+        self,
+        symptom_vector: np.ndarray,
+        temperature: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score only the diseases that share an active symptom
+
+        Every other disease has a matched score of zero, so its probability
+        is 0 whatever the temperature multiplier; callers treat those rows
+        as a constant floor of 0.0 instead of scoring them.
+
+        Args:
+            symptom_vector: Vector produced by encode_symptoms
+            temperature: Patient's temperature
+
+        Returns:
+            Tuple of (candidate disease rows, their adjusted probabilities)
+        """
+        rows = self.candidate_rows(symptom_vector)
+        return rows, self.adjust_by_temperature(self.row_probabilities(symptom_vector, rows), temperature, rows)
+
+    def row_probabilities(self, symptom_vector: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """
+        Unadjusted probabilities of some disease rows for one patient
+
+        Each row is computed exactly as in score_batch (same column order),
+        so scores of individual rows can be refreshed without rescoring the
+        rest of the catalog.
+
+        Args:
+            symptom_vector: Vector produced by encode_symptoms
+            rows: Disease rows to score
+
+        Returns:
+            Probability of each row before the temperature adjustment
+        """
+        row_symptoms = self.row_symptoms[rows]
+        row_weights = self.row_weights[rows]
+
+        matched_score = np.zeros(len(rows), dtype=np.float64)
+        for col in range(row_symptoms.shape[1]):
+            matched_score += symptom_vector[row_symptoms[:, col]] * row_weights[:, col]
+
+        return np.where(
+            self._has_denominator[rows],
+            (matched_score / self._safe_denominator[rows]) * 100,
+            0.0
+        )
+
+    def score_batch(self, symptom_matrix: np.ndarray, temperatures: np.ndarray) -> np.ndarray:
+        """
+        Score every disease for many patients in one pass
+
+        Args:
+            symptom_matrix: Matrix produced by encode_batch
+            temperatures: Temperature of each patient
+
+        Returns:
+            Patients x diseases matrix of adjusted probabilities (unrounded)
+        """
+        return self.score_rows(symptom_matrix, temperatures, 0, self.disease_count)
+
+    def score_rows(
+        self,
+        symptom_matrix: np.ndarray,
+        temperatures: np.ndarray,
+        start: int,
+        stop: int
+    ) -> np.ndarray:
+        """
+        Score the disease rows [start, stop) for many patients
+
+        Each probability is computed exactly as in score_batch, so a
+        catalog can be split into row ranges without changing results.
+
+        Args:
+            symptom_matrix: Matrix produced by encode_batch
+            temperatures: Temperature of each patient
+            start: First disease row
+            stop: Row after the last disease row
+
+        Returns:
+            Patients x (stop - start) matrix of adjusted probabilities (unrounded)
+        """
+        rows = slice(start, stop)
+        row_symptoms = self.row_symptoms[rows]
+        row_weights = self.row_weights[rows]
+
+        matched_score = np.zeros((symptom_matrix.shape[0], row_symptoms.shape[0]), dtype=np.float64)
+        for col in range(row_symptoms.shape[1]):
+            matched_score += symptom_matrix[:, row_symptoms[:, col]] * row_weights[:, col]
+
+        probability = np.where(
+            self._has_denominator[rows],
+            (matched_score / self._safe_denominator[rows]) * 100,
+            0.0
+        )
+        return self.adjust_by_temperature(probability, np.asarray(temperatures)[:, np.newaxis], rows)
+
+    def adjust_by_temperature(
+        self,
+        probability: np.ndarray,
+        temperature,
+        rows: Optional[Union[np.ndarray, slice]] = None
+    ) -> np.ndarray:
+        """
+        Apply the temperature range multipliers to probabilities
+
+        Args:
+            probability: Unadjusted probabilities (diseases last)
+            temperature: Patient temperature, or a column vector of them
+            rows: Disease rows (index array or slice) the last axis refers to
+                (default: all)
+
+        Returns:
+            Adjusted probabilities capped at 100
+        """
+        multipliers = self.temperature_multipliers(temperature, rows)
+        if multipliers is not None:
+            # Multiplying by 1.0 leaves a probability unchanged, so this is
+            # bit-identical to the branches below
+            return np.minimum(probability * multipliers, 100)
+
+        temp_low = self.temp_low if rows is None else self.temp_low[rows]
+        temp_high = self.temp_high if rows is None else self.temp_high[rows]
+
+        in_range = (temp_low <= temperature) & (temperature <= temp_high)
+        near_upper = np.abs(temperature - temp_high) <= 1.0
+
+        adjusted = np.where(
+            in_range,
+            probability * 1.2,
+            np.where(near_upper, probability * 1.1, probability)
+        )
+        return np.minimum(adjusted, 100)
+
+    def temperature_multipliers(
+        self,
+        temperature,
+        rows: Optional[Union[np.ndarray, slice]] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Look up temperature multipliers in the grid bucket table
+
+        Args:
+            temperature: Patient temperature, or a column vector of them
+            rows: Disease rows (index array or slice) to return (default: all)
+
+        Returns:
+            Multipliers shaped like the adjusted probabilities, or None when
+            a temperature is not exactly on the 0.1°C grid
+        """
+        table = self._temperature_codes
+        if isinstance(rows, slice):
+            table, rows = table[:, rows], None
+
+        if np.ndim(temperature) == 0:
+            bucket = temperature_bucket(temperature)
+            if bucket is None:
+                return None
+            codes = table[bucket] if rows is None else table[bucket, rows]
+        else:
+            buckets = temperature_buckets(np.ravel(temperature))
+            if buckets is None:
+                return None
+            codes = table[buckets] if rows is None else table[buckets[:, np.newaxis], rows]
+        return TEMPERATURE_MULTIPLIERS[codes]
+
+    def row_symptom_indices(self, row: int) -> Tuple[int, ...]:
+        """Symptom indices of a disease in its source order (cached per reported row)"""
+        symptoms = self._reported_rows.get(row)
+        if symptoms is None:
+            symptoms = tuple(self.row_symptoms[row, :self.row_lengths[row]].tolist())
+            self._reported_rows[row] = symptoms
+        return symptoms
+
+    def matched_mask(self, row: int, symptom_values: Sequence[float]) -> int:
+        """
+        Bitmask of a disease's symptoms rated 5 or higher
+
+        Args:
+            row: Disease row index
+            symptom_values: Vector produced by encode_symptoms (a list of its
+                values is fastest)
+
+        Returns:
+            Mask whose bit i is set for the disease's i-th symptom
+        """
+        mask = 0
+        for bit, symptom in enumerate(self.row_symptom_indices(row)):
+            if symptom_values[symptom] >= 5:
+                mask |= 1 << bit
+        return mask
+
+    def matched_symptom_names(self, row: int, mask: int) -> List[str]:
+        """Display names of the symptoms selected by a matched_mask, in the disease's order"""
+        display_names = self.symptom_display_names
+        return [
+            display_names[symptom]
+            for bit, symptom in enumerate(self.row_symptom_indices(row))
+            if mask >> bit & 1
+        ]
+
+    def matched_symptoms(self, row: int, symptom_vector: np.ndarray) -> List[str]:
+        """
+        List display names of a disease's symptoms rated 5 or higher
+
+        Args:
+            row: Disease row index
+            symptom_vector: Vector produced by encode_symptoms
+
+        Returns:
+            Display names in the disease's symptom order
+        """
+        return self.matched_symptom_names(row, self.matched_mask(row, symptom_vector))
+
+    def build_result(
+        self,
+        row: int,
+        probability: float,
+        symptom_vector: np.ndarray
+    ) -> DiagnosisResult:
+        """Build the result record for one disease"""
+        return DiagnosisResult(self, row, round(probability, 1), self.matched_mask(row, symptom_vector.tolist()))
+
+    def build_results(
+        self,
+        selection: List[Tuple[int, float]],
+        symptom_vector: np.ndarray
+    ) -> List[DiagnosisResult]:
+        """
+        Build result records for selected diseases of one patient
+
+        Args:
+            selection: (disease row, unrounded probability) pairs
+            symptom_vector: Vector produced by encode_symptoms
+
+        Returns:
+            One DiagnosisResult per selected disease, in order
+        """
+        if not selection:
+            return []
+        symptom_values = symptom_vector.tolist()
+        return [
+            DiagnosisResult(self, row, round(probability, 1), self.matched_mask(row, symptom_values))
+            for row, probability in selection
+        ]
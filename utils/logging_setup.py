@@ -0,0 +1,165 @@
+"""
+Logging Setup Module
+====================
+
+Process-wide logging configuration with an asynchronous mode for serving.
+
+In async mode request threads only put records on a bounded in-memory
+queue; a background QueueListener thread formats them and does the I/O.
+When the queue is full records are dropped (and counted) rather than
+blocking the request. Per-request summary lines are additionally sampled
+with RequestLogSampler, and all hot-path messages use %-style arguments
+so nothing is formatted for records that are filtered out.
+"""
+
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else came from `extra=`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks or formats in the logging thread
+
+    The stock handler formats the message before queueing it so records
+    can be pickled; the listener here runs in the same process, so the
+    record is queued as-is and formatted on the listener thread. Records
+    are dropped when the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RequestLogSampler:
+    """Decides which requests write their per-request summary line"""
+
+    __slots__ = ('rate',)
+
+    def __init__(self, rate: float = 1.0):
+        """
+        Args:
+            rate: Fraction of requests to log, from 0 (none) to 1 (all)
+        """
+        self.rate = min(max(rate, 0.0), 1.0)
+
+    def sampled(self) -> bool:
+        """Whether the current request should be logged"""
+        return self.rate >= 1.0 or (self.rate > 0.0 and random.random() < self.rate)
+
+
+# Handler and listener installed by configure_logging in async mode
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+_listener: Optional[QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging(
+    level: str = 'INFO',
+    log_format: str = 'text',
+    async_logging: bool = False,
+    queue_size: int = 10000,
+    force: bool = False
+):
+    """
+    Configure the root logger unless it already has handlers
+
+    Args:
+        level: Root log level name
+        log_format: 'text' for the classic line format or 'json' for one
+            JSON object per line
+        async_logging: Write through a background thread instead of in the
+            calling thread
+        queue_size: Records buffered in async mode before new ones are dropped
+        force: Replace handlers already on the root logger (e.g. installed
+            by a serverless runtime) instead of leaving it alone
+    """
+    global _queue_handler, _listener
+
+    with _configure_lock:
+        # Like logging.basicConfig, leave an already configured root alone
+        root = logging.getLogger()
+        if root.handlers and not force:
+            return
+
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+            handler.close()
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            atexit.unregister(stop_logging)
+
+        output = logging.StreamHandler(sys.stderr)
+        output.setFormatter(JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT))
+
+        if async_logging:
+            _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=max(1, queue_size)))
+            _listener = QueueListener(_queue_handler.queue, output, respect_handler_level=True)
+            _listener.start()
+            atexit.register(stop_logging)
+            handler = _queue_handler
+        else:
+            handler = output
+
+        root.addHandler(handler)
+        root.setLevel(level.upper())
+
+    if async_logging:
+        logger.debug("Asynchronous logging started (queue size %d)", queue_size)
+
+
+def dropped_records() -> int:
+    """Records dropped because the async logging queue was full"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def stop_logging():
+    """Flush queued records and stop the background writer"""
+    global _listener
+    with _configure_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        atexit.unregister(stop_logging)
+        listener.stop()
@@ -0,0 +1,279 @@
+"""
+Metrics Module
+==============
+
+Low-overhead instrumentation for the diagnosis hot path: per-stage
+latency histograms, counters and gauges, rendered in the Prometheus text
+exposition format for the /metrics route.
+
+Everything is recorded through the module-level `metrics` registry. It
+starts disabled; while disabled, timers are a shared no-op object and the
+hot path only pays for `if metrics.enabled` checks.
+"""
+
+from typing import Callable, Dict, Iterable, List, Tuple
+import math
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Prefix of every exported metric name
+NAMESPACE = 'symptom_checker'
+
+# Upper bounds (seconds) of the exported Prometheus histogram buckets
+EXPORT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Quantiles exported alongside each latency histogram
+EXPORT_QUANTILES = (0.5, 0.95, 0.99)
+
+# (type, help) of each metric family, by name without the namespace
+FAMILIES = {
+    'stage_seconds': ('histogram', 'Time spent in each request stage'),
+    'requests_total': ('counter', 'Requests by route and status code'),
+    'candidates_scored_total': ('counter', 'Diseases scored for single-patient diagnoses'),
+    'candidates_pruned_total': ('counter', 'Candidate diseases skipped by score upper bounds'),
+    'results_below_threshold_total': ('counter', 'Scored diseases dropped by the minimum confidence'),
+    'results_truncated_total': ('counter', 'Qualifying diseases dropped by the result limit'),
+    'knowledge_base_load_seconds': ('histogram', 'Knowledge base load and reload durations'),
+    'knowledge_base_generation': ('gauge', 'Generation of the knowledge base being served'),
+    'knowledge_base_diseases': ('gauge', 'Diseases in the knowledge base being served'),
+    'startup_seconds': ('gauge', 'Process startup timings'),
+    'result_cache_hits_total': ('counter', 'Result cache hits'),
+    'result_cache_misses_total': ('counter', 'Result cache misses'),
+    'result_cache_evictions_total': ('counter', 'Result cache evictions'),
+    'result_cache_entries': ('gauge', 'Entries in the result cache'),
+    'diagnosis_sessions_active': ('gauge', 'Incremental re-diagnosis sessions held by this process'),
+    'diagnosis_sessions_created_total': ('counter', 'Incremental re-diagnosis sessions started'),
+    'shard_partial_responses_total': ('counter', 'Sharded diagnoses returned without every shard'),
+    'admission_rejected_total': ('counter', '/diagnose requests shed by admission control, by reason'),
+    'admission_concurrency_limit': ('gauge', 'Adaptive concurrency limit for /diagnose'),
+    'admission_in_flight': ('gauge', '/diagnose requests being served'),
+    'admission_queued': ('gauge', '/diagnose requests waiting for a slot'),
+    'admission_critical_total': ('counter', 'Critical-symptom requests admitted through the priority lane'),
+    'analytics_pending_events': ('gauge', 'Diagnoses waiting to be folded into the population statistics'),
+    'analytics_dropped_events_total': ('counter', 'Diagnoses left out of the population statistics (buffer full)'),
+    'log_records_dropped_total': ('counter', 'Log records dropped because the async logging queue was full'),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of nanosecond durations
+
+    Each power of two is split into 2**SUB_BUCKET_BITS linear buckets, so
+    a recorded value is known to within 1/16 of itself over the whole
+    range, with a fixed-size count array and no allocation per record.
+    """
+
+    SUB_BUCKET_BITS = 4
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+    BUCKET_COUNT = 1024
+
+    __slots__ = ('counts', 'count', 'total', '_lock')
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def bucket_index(cls, value: int) -> int:
+        shift = max(0, value.bit_length() - cls.SUB_BUCKET_BITS - 1)
+        return min(shift * cls.SUB_BUCKETS + (value >> shift), cls.BUCKET_COUNT - 1)
+
+    @classmethod
+    def bucket_upper(cls, index: int) -> int:
+        """Largest value (ns) that falls into bucket index"""
+        if index < 2 * cls.SUB_BUCKETS:
+            return index
+        shift, mantissa = divmod(index, cls.SUB_BUCKETS)
+        shift -= 1
+        return ((mantissa + cls.SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, nanoseconds: int):
+        index = self.bucket_index(max(0, nanoseconds))
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += nanoseconds
+
+    def snapshot(self) -> Tuple[List[int], int, int]:
+        with self._lock:
+            return list(self.counts), self.count, self.total
+
+    @classmethod
+    def quantile(cls, counts: List[int], count: int, fraction: float) -> float:
+        """Upper bound (ns) of the bucket holding the given quantile"""
+        if count == 0:
+            return math.nan
+        rank = max(1, math.ceil(fraction * count))
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                return cls.bucket_upper(index)
+        return cls.bucket_upper(len(counts) - 1)
+
+
+class StageTimer:
+    """Times consecutive stages of one request"""
+
+    __slots__ = ('_registry', '_route', '_started', '_last')
+
+    def __init__(self, registry: 'MetricsRegistry', route: str):
+        self._registry = registry
+        self._route = route
+        self._started = self._last = time.perf_counter_ns()
+
+    def mark(self, stage: str):
+        """Record the time since the previous mark as `stage`"""
+        now = time.perf_counter_ns()
+        self._registry.histogram('stage_seconds', route=self._route, stage=stage).record(now - self._last)
+        self._last = now
+
+    def finish(self):
+        """Record the whole request as stage 'total'"""
+        self._registry.histogram('stage_seconds', route=self._route, stage='total').record(
+            time.perf_counter_ns() - self._started
+        )
+
+
+class _NullTimer:
+    """Timer used while metrics are disabled"""
+
+    __slots__ = ()
+
+    def mark(self, stage: str):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """Counters, gauges and latency histograms keyed by name and labels"""
+
+    def __init__(self):
+        self.enabled = False
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], LatencyHistogram] = {}
+        self._collectors: List[Callable[['MetricsRegistry'], None]] = []
+        self._lock = threading.Lock()
+
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+        logger.info(f"Metrics {'enabled' if enabled else 'disabled'}")
+
+    def timer(self, route: str):
+        """StageTimer for one request, or a no-op timer while disabled"""
+        return StageTimer(self, route) if self.enabled else NULL_TIMER
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def histogram(self, name: str, **labels) -> LatencyHistogram:
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def observe_seconds(self, name: str, seconds: float, **labels):
+        self.histogram(name, **labels).record(int(seconds * 1e9))
+
+    def add_collector(self, collector: Callable[['MetricsRegistry'], None]):
+        """Register a callback that sets gauges/counters right before rendering"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        for collector in self._collectors:
+            try:
+                collector(self)
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}")
+
+        samples: Dict[str, List[str]] = {}
+
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = list(self._histograms.items())
+        gauges = list(self._gauges.items())
+
+        for (name, labels), value in counters + gauges:
+            samples.setdefault(name, []).append(f"{_name(name)}{_labels(labels)} {_number(value)}")
+
+        for (name, labels), histogram in histograms:
+            counts, count, total = histogram.snapshot()
+            lines = samples.setdefault(name, [])
+            cumulative, index = 0, 0
+            for bound in EXPORT_BUCKETS:
+                limit = bound * 1e9
+                while index < len(counts) and LatencyHistogram.bucket_upper(index) <= limit:
+                    cumulative += counts[index]
+                    index += 1
+                lines.append(f"{_name(name)}_bucket{_labels(labels, le=_number(bound))} {cumulative}")
+            lines.append(f"{_name(name)}_bucket{_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{_name(name)}_sum{_labels(labels)} {_number(total / 1e9)}")
+            lines.append(f"{_name(name)}_count{_labels(labels)} {count}")
+
+            quantiles = samples.setdefault(f'{name}_quantile', [])
+            for fraction in EXPORT_QUANTILES:
+                value = LatencyHistogram.quantile(counts, count, fraction) / 1e9
+                quantiles.append(
+                    f"{_name(name)}_quantile{_labels(labels, quantile=_number(fraction))} {_number(value)}"
+                )
+
+        output = []
+        for name in sorted(samples):
+            if name.endswith('_quantile') and name[:-len('_quantile')] in FAMILIES:
+                metric_type, description = 'gauge', FAMILIES[name[:-len('_quantile')]][1] + ' (HDR quantiles)'
+            else:
+                metric_type, description = FAMILIES.get(name, ('untyped', name))
+            output.append(f"# HELP {_name(name)} {description}")
+            output.append(f"# TYPE {_name(name)} {metric_type}")
+            output.extend(samples[name])
+        return '\n'.join(output) + '\n'
+
+
+def _name(name: str) -> str:
+    return f'{NAMESPACE}_{name}'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels: Iterable[Tuple[str, str]], **extra) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and math.isnan(value):
+        return 'NaN'
+    return repr(value)
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
@@ -0,0 +1,121 @@
+"""
+Micro-Batching Module
+=====================
+
+Collects work items submitted from an asyncio event loop during a short
+window and processes them together in one call on a worker thread.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Fan-in of concurrent requests into batched calls
+
+    The first item to arrive opens a window; everything submitted until it
+    closes (or until max_batch items are waiting) is handed to
+    process_batch as one list. Batches run one at a time on a dedicated
+    thread, so while one batch is being scored the next one fills up and
+    the event loop keeps accepting connections.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        window: float = 0.002,
+        max_batch: int = 256
+    ):
+        """
+        Args:
+            process_batch: Function mapping a list of items to a list of
+                results in the same order. A result that is an Exception
+                is raised to that item's caller only.
+            window: Seconds to wait for more items after the first one
+            max_batch: Flush immediately once this many items are waiting
+        """
+        self.process_batch = process_batch
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='micro-batch')
+        self._tasks = set()
+
+        # Counters for monitoring batch efficiency
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue an item for the next batch and wait for its result
+
+        Args:
+            item: Work item passed to process_batch
+
+        Returns:
+            The item's result
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        items = [item for item, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.process_batch, items
+            )
+        except Exception as e:
+            logger.error(f"Batch of {len(items)} failed: {e}", exc_info=True)
+            results = [e] * len(items)
+
+        self.batches += 1
+        self.items += len(items)
+
+        for (_, future), result in zip(batch, results):
+            # The client may have disconnected and cancelled its future
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        """Batch counters for monitoring"""
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'average_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'pending': len(self._pending),
+        }
+
+    def close(self):
+        """Stop the worker thread once queued batches finish"""
+        self._executor.shutdown(wait=True)
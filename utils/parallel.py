@@ -0,0 +1,251 @@
+"""
+Parallel Scoring Module
+=======================
+
+Optional process pool for scoring large batches and very large catalogs
+on several cores. The compiled knowledge base arrays are copied once into
+a shared memory segment; workers map them when they start, so tasks only
+carry the patients being scored.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import multiprocessing
+from typing import Any, Dict, List, Optional, Tuple
+import atexit
+import os
+import logging
+
+import numpy as np
+
+from .diagnosis_engine import DiagnosisEngine
+from .knowledge_base import CompiledKnowledgeBase
+from .snapshot import StringTable
+
+logger = logging.getLogger(__name__)
+
+# Array offsets inside the shared segment are aligned for vectorized reads
+SHARED_ALIGNMENT = 64
+
+# Workers never fork the serving process: it runs threads (knowledge base
+# watcher, log listener, analytics drain, pool shutdown) that may hold locks
+# a forked child would inherit held. Workers only need the segment name.
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def _worker_context():
+    """Multiprocessing context the pool workers start from"""
+    context = multiprocessing.get_context(START_METHOD)
+    if START_METHOD == 'forkserver':
+        # The fork server imports this module (and NumPy) once; not the
+        # serving script, which would start the app's threads in it
+        context.set_forkserver_preload([__name__])
+    return context
+
+# Knowledge base attached by each worker process
+_worker_knowledge_base: Optional[CompiledKnowledgeBase] = None
+_worker_memory: Optional[shared_memory.SharedMemory] = None
+
+
+def _attach_worker(segment_name: str, layout: Dict[str, Tuple[int, str, tuple]], symptom_names: List[str]):
+    """Process pool initializer: map the shared knowledge base tables"""
+    global _worker_knowledge_base, _worker_memory
+
+    # Pool workers share the parent's resource tracker, so attaching here
+    # does not hand ownership of the segment to the worker
+    _worker_memory = shared_memory.SharedMemory(name=segment_name)
+
+    arrays = {}
+    for name, (offset, dtype, shape) in layout.items():
+        count = int(np.prod(shape, dtype=np.int64))
+        array = np.frombuffer(_worker_memory.buf, dtype=np.dtype(dtype), count=count, offset=offset)
+        array = array.reshape(shape)
+        array.flags.writeable = False
+        arrays[name] = array
+
+    strings = {'symptom_names': symptom_names}
+    for name in CompiledKnowledgeBase.DISEASE_STRING_FIELDS:
+        strings[name] = StringTable(arrays.pop(f'{name}.data'), arrays.pop(f'{name}.offsets'))
+
+    _worker_knowledge_base = CompiledKnowledgeBase.from_tables(arrays, strings)
+
+
+def _select_patients(
+    symptom_matrix: np.ndarray,
+    temperatures: np.ndarray,
+    min_confidence: float,
+    top_k: Optional[int]
+) -> List[List[Tuple[int, float]]]:
+    """Worker task: rank the diseases of a chunk of patients"""
+    probabilities = _worker_knowledge_base.score_batch(symptom_matrix, temperatures)
+    return [
+        DiagnosisEngine.select_top(probabilities[patient], min_confidence, top_k)
+        for patient in range(probabilities.shape[0])
+    ]
+
+
+def _select_rows(
+    symptom_vector: np.ndarray,
+    temperature: float,
+    start: int,
+    stop: int,
+    min_confidence: float,
+    top_k: Optional[int]
+) -> List[Tuple[int, float]]:
+    """Worker task: rank one patient's diseases within the rows [start, stop)"""
+    probabilities = _worker_knowledge_base.score_rows(
+        symptom_vector[np.newaxis], np.array([temperature]), start, stop
+    )[0]
+    return [
+        (start + row, probability)
+        for row, probability in DiagnosisEngine.select_top(probabilities, min_confidence, top_k)
+    ]
+
+
+class ScoringPool:
+    """
+    Process pool scoring against a shared-memory knowledge base
+
+    Results are the same (row, probability) selections DiagnosisEngine
+    computes in-process: patients are split across tasks by rows of the
+    symptom matrix, and a single patient over a very large catalog by
+    ranges of disease rows whose per-range selections are merged.
+    """
+
+    def __init__(
+        self,
+        knowledge_base: CompiledKnowledgeBase,
+        processes: Optional[int] = None,
+        chunk_size: int = 256,
+        min_diseases: int = 50000
+    ):
+        """
+        Args:
+            knowledge_base: Compiled knowledge base to share
+            processes: Worker processes (default: CPU count)
+            chunk_size: Patients per task when splitting a batch
+            min_diseases: Catalog size from which single patients are split
+                across workers by disease rows
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.min_diseases = min_diseases
+        self.disease_count = knowledge_base.disease_count
+
+        arrays, strings = knowledge_base.export_tables()
+        for name in CompiledKnowledgeBase.DISEASE_STRING_FIELDS:
+            arrays[f'{name}.data'], arrays[f'{name}.offsets'] = StringTable.encode(strings.pop(name))
+
+        layout, size = {}, 0
+        for name, array in arrays.items():
+            size = -(-size // SHARED_ALIGNMENT) * SHARED_ALIGNMENT
+            layout[name] = (size, array.dtype.str, array.shape)
+            size += array.nbytes
+
+        self._memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for name, array in arrays.items():
+            offset, dtype, shape = layout[name]
+            target = np.ndarray(shape, dtype=np.dtype(dtype), buffer=self._memory.buf, offset=offset)
+            target[...] = array
+            del target
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=_worker_context(),
+            initializer=_attach_worker,
+            initargs=(self._memory.name, layout, list(strings['symptom_names']))
+        )
+        atexit.register(self.close)
+        logger.info(
+            f"Scoring pool started: {self.processes} processes, "
+            f"{size / 1024:.0f} KB shared knowledge base"
+        )
+
+    def select_patients(
+        self,
+        symptom_matrix: np.ndarray,
+        temperatures: np.ndarray,
+        min_confidence: float,
+        top_k: Optional[int]
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Rank diseases for every patient of a batch across the pool
+
+        Args:
+            symptom_matrix: Patients x symptoms matrix in scoring order
+            temperatures: Temperature of each patient
+            min_confidence: Minimum confidence threshold
+            top_k: Diagnoses to keep per patient
+
+        Returns:
+            One DiagnosisEngine.select_top result per patient, in order
+        """
+        futures = [
+            self._executor.submit(
+                _select_patients,
+                np.ascontiguousarray(symptom_matrix[start:start + self.chunk_size]),
+                np.ascontiguousarray(temperatures[start:start + self.chunk_size], dtype=np.float64),
+                min_confidence,
+                top_k
+            )
+            for start in range(0, symptom_matrix.shape[0], self.chunk_size)
+        ]
+
+        selections: List[List[Tuple[int, float]]] = []
+        for future in futures:
+            selections.extend(future.result())
+        return selections
+
+    def select_rows(
+        self,
+        symptom_vector: np.ndarray,
+        temperature: float,
+        min_confidence: float,
+        top_k: Optional[int]
+    ) -> List[Tuple[int, float]]:
+        """
+        Rank one patient's diseases with the catalog split across the pool
+
+        Each range keeps its own top K; the global top K is always among
+        them, so merging the candidates gives the in-process result.
+
+        Returns:
+            DiagnosisEngine.select_top result for the whole catalog
+        """
+        if self.disease_count == 0:
+            return []
+
+        symptom_vector = np.ascontiguousarray(symptom_vector)
+        step = -(-self.disease_count // self.processes)
+        futures = [
+            self._executor.submit(
+                _select_rows, symptom_vector, float(temperature),
+                start, min(start + step, self.disease_count), min_confidence, top_k
+            )
+            for start in range(0, self.disease_count, step)
+        ]
+
+        candidates = sorted(pair for future in futures for pair in future.result())
+        if not candidates:
+            return []
+        rows = np.array([row for row, _ in candidates], dtype=np.intp)
+        probabilities = np.array([probability for _, probability in candidates], dtype=np.float64)
+        return DiagnosisEngine.select_top(probabilities, min_confidence, top_k, rows)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'processes': self.processes,
+            'chunk_size': self.chunk_size,
+            'min_diseases': self.min_diseases,
+            'shared_bytes': self._memory.size,
+        }
+
+    def close(self):
+        """Stop the workers once queued tasks finish and free the segment"""
+        atexit.unregister(self.close)
+        self._executor.shutdown(wait=True)
+        self._memory.close()
+        try:
+            self._memory.unlink()
+        except FileNotFoundError:
+            pass
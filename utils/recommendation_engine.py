@@ -5,16 +5,130 @@ Recommendation Engine Module
 Generates personalized medical recommendations based on diagnosis and symptoms.
 """
 
-from typing import Dict, List, Any
+from typing import Dict, List, Tuple, Any, Optional
+from bisect import bisect_right
 import logging
 
+from .temperature import GRID, temperature_bucket
+
 logger = logging.getLogger(__name__)
 
 class RecommendationEngine:
     """Generates personalized recommendations"""
 
+    # First immediate recommendation whenever a critical symptom is present
+    EMERGENCY_MESSAGE = "🚨 SEEK EMERGENCY MEDICAL CARE IMMEDIATELY"
+
     def __init__(self, recommendations_config: Dict[str, Any]):
         self.config = recommendations_config
+        self._compile_rules()
+
+    def _compile_rules(self):
+        """
+        Compile the configuration into a flat, ordered rule plan
+
+        The plan keeps the configuration's rule order, so generated
+        recommendations are identical to reading the config on every call.
+        """
+        config = self.config
+
+        # Critical symptoms: high fever first, then (symptom, threshold,
+        # optional temperature threshold, message) in config order
+        critical_config = config.get('critical_symptoms', {})
+        self._high_fever: Optional[Tuple[float, str]] = None
+        if 'high_fever' in critical_config:
+            high_fever = critical_config['high_fever']
+            self._high_fever = (high_fever.get('threshold', 40.0), high_fever['message'])
+
+        self._critical_rules: List[Tuple[str, float, Optional[float], str]] = []
+        for key, rule in critical_config.items():
+            if key == 'high_fever' or 'symptom' not in rule:
+                continue
+            if key == 'fever_with_headache':
+                self._critical_rules.append((
+                    rule['symptom'],
+                    rule.get('symptom_threshold', 8),
+                    rule.get('temp_threshold', 39.4),
+                    rule['message']
+                ))
+            else:
+                self._critical_rules.append(
+                    (rule['symptom'], rule.get('threshold', 7), None, rule['message'])
+                )
+
+        # Urgency and disease-specific medical messages
+        self._urgency_messages: Dict[str, List[str]] = {}
+        for urgency, urgency_info in config.get('urgency_levels', {}).items():
+            if 'message' in urgency_info:
+                self._urgency_messages[urgency] = [urgency_info['message']]
+            elif 'messages' in urgency_info:
+                self._urgency_messages[urgency] = list(urgency_info['messages'])
+        self._disease_messages: Dict[str, List[str]] = {
+            disease: list(disease_config.get('medical', []))
+            for disease, disease_config in config.get('disease_specific', {}).items()
+        }
+
+        # Temperature care: the first config entry whose threshold is met
+        # wins, so resolve the winner for every interval between sorted
+        # thresholds and look the interval up with bisect
+        temp_levels = [
+            (level.get('threshold', 100), [rec.split('{temp}') for rec in level.get('recommendations', [])])
+            for level in config.get('temperature_care', {}).values()
+        ]
+        self._temp_thresholds: List[float] = sorted({threshold for threshold, _ in temp_levels})
+        self._temp_templates: List[Optional[List[List[str]]]] = [None]
+        for bound in self._temp_thresholds:
+            self._temp_templates.append(next(
+                templates for threshold, templates in temp_levels if threshold <= bound
+            ))
+
+        # Temperature care texts with {temp} filled in, per grid temperature
+        self._temp_care_by_bucket: List[List[str]] = [
+            self._format_temperature_care(temperature) for temperature in GRID
+        ]
+
+        # Symptom care as (symptom, threshold, recommendations) in config order
+        self._symptom_rules: List[Tuple[str, float, List[str]]] = [
+            (symptom, rule.get('threshold', 6), list(rule.get('recommendations', [])))
+            for symptom, rule in config.get('symptom_care', {}).items()
+        ]
+
+        general_config = config.get('general_care', {})
+        self._general_threshold = general_config.get('threshold', 5)
+        self._general_symptoms: Tuple[str, ...] = tuple(general_config.get('symptoms', []))
+        self._general_recommendations: List[str] = list(general_config.get('recommendations', []))
+
+        self._prevention: List[str] = config.get('prevention', [])
+
+    def referenced_symptoms(self) -> List[str]:
+        """Symptoms named by the critical, symptom care and general care rules"""
+        symptoms = [rule[0] for rule in self._critical_rules]
+        symptoms += [rule[0] for rule in self._symptom_rules]
+        symptoms += self._general_symptoms
+        return list(dict.fromkeys(symptoms))
+
+    @property
+    def prevention(self) -> List[str]:
+        """Prevention list shared by every generated recommendation set"""
+        return self._prevention
+
+    def static_messages(self) -> List[str]:
+        """Every recommendation this engine can emit, except temperature care for off-grid temperatures"""
+        messages = [self.EMERGENCY_MESSAGE]
+        if self._high_fever is not None:
+            messages.append(self._high_fever[1])
+        messages += [rule[3] for rule in self._critical_rules]
+        for urgency_messages in self._urgency_messages.values():
+            messages += urgency_messages
+        for disease_messages in self._disease_messages.values():
+            messages += disease_messages
+        for rule in self._symptom_rules:
+            messages += rule[2]
+        messages += self._general_recommendations
+        messages += self._prevention
+        for temperature_care in self._temp_care_by_bucket:
+            messages += temperature_care
+        return list(dict.fromkeys(messages))
 
     def check_critical_symptoms(
         self,
@@ -32,33 +146,16 @@ class RecommendationEngine:
             List of critical warning messages
         """
         critical_flags = []
-        critical_config = self.config.get('critical_symptoms', {})
 
         # Check high fever
-        if 'high_fever' in critical_config:
-            threshold = critical_config['high_fever'].get('threshold', 40.0)
-            if temperature >= threshold:
-                critical_flags.append(critical_config['high_fever']['message'])
+        if self._high_fever is not None and temperature >= self._high_fever[0]:
+            critical_flags.append(self._high_fever[1])
 
-        # Check other critical symptoms
-        for key, config in critical_config.items():
-            if key == 'high_fever':
-                continue
-
-            if 'symptom' in config:
-                symptom = config['symptom']
-                threshold = config.get('threshold', 7)
-
-                # Special case for fever with headache
-                if key == 'fever_with_headache':
-                    temp_threshold = config.get('temp_threshold', 39.4)
-                    symptom_threshold = config.get('symptom_threshold', 8)
-                    if (temperature >= temp_threshold and
-                        symptoms_data.get(symptom, 0) >= symptom_threshold):
-                        critical_flags.append(config['message'])
-                else:
-                    if symptoms_data.get(symptom, 0) >= threshold:
-                        critical_flags.append(config['message'])
+        # Check other critical symptoms (fever with headache also needs a temperature)
+        for symptom, threshold, temp_threshold, message in self._critical_rules:
+            if (symptoms_data.get(symptom, 0) >= threshold and
+                    (temp_threshold is None or temperature >= temp_threshold)):
+                critical_flags.append(message)
 
         return critical_flags
 
@@ -89,7 +186,7 @@ class RecommendationEngine:
         # Check for critical symptoms first
         critical = self.check_critical_symptoms(symptoms_data, temperature)
         if critical:
-            recommendations['immediate'].append("🚨 SEEK EMERGENCY MEDICAL CARE IMMEDIATELY")
+            recommendations['immediate'].append(self.EMERGENCY_MESSAGE)
             recommendations['immediate'].extend(critical)
             return recommendations
 
@@ -106,11 +203,34 @@ class RecommendationEngine:
         self._add_general_care(recommendations, symptoms_data)
 
         # Prevention measures
-        recommendations['prevention'] = self.config.get('prevention', [])
+        recommendations['prevention'] = self._prevention
 
-        logger.info(f"Generated {sum(len(v) for v in recommendations.values())} recommendations")
+        logger.debug("Generated recommendations for %d diagnoses", len(diagnoses))
         return recommendations
 
+    def generate_batch(
+        self,
+        diagnoses_batch: List[List[Dict[str, Any]]],
+        symptoms_batch: List[Dict[str, int]],
+        temperatures: List[float]
+    ) -> List[Dict[str, List[str]]]:
+        """
+        Generate recommendations for many patients
+
+        Args:
+            diagnoses_batch: Diagnoses of each patient
+            symptoms_batch: Symptom severity data of each patient
+            temperatures: Temperature of each patient
+
+        Returns:
+            One recommendations dictionary per patient
+        """
+        return [
+            self.generate_recommendations(diagnoses, symptoms_data, temperature)
+            for diagnoses, symptoms_data, temperature
+            in zip(diagnoses_batch, symptoms_batch, temperatures)
+        ]
+
     def _add_medical_recommendations(
         self,
         recommendations: Dict[str, List[str]],
@@ -121,24 +241,16 @@ class RecommendationEngine:
             return
 
         top_disease = diagnoses[0]
-        urgency_config = self.config.get('urgency_levels', {})
 
         # Add urgency-based recommendations
-        if top_disease['urgency'] in urgency_config:
-            urgency_info = urgency_config[top_disease['urgency']]
-            if 'message' in urgency_info:
-                recommendations['medical'].append(urgency_info['message'])
-            elif 'messages' in urgency_info:
-                recommendations['medical'].extend(urgency_info['messages'])
+        urgency_messages = self._urgency_messages.get(top_disease['urgency'])
+        if urgency_messages:
+            recommendations['medical'].extend(urgency_messages)
 
         # Add disease-specific recommendations
-        disease_specific = self.config.get('disease_specific', {})
-        disease_name = top_disease['disease']
-
-        if disease_name in disease_specific:
-            recommendations['medical'].extend(
-                disease_specific[disease_name].get('medical', [])
-            )
+        disease_messages = self._disease_messages.get(top_disease['disease'])
+        if disease_messages:
+            recommendations['medical'].extend(disease_messages)
 
     def _add_temperature_care(
         self,
@@ -146,16 +258,19 @@ class RecommendationEngine:
         temperature: float
     ):
         """Add temperature-based care recommendations"""
-        temp_care = self.config.get('temperature_care', {})
-
-        for level, config in temp_care.items():
-            threshold = config.get('threshold', 100)
-            if temperature >= threshold:
-                for rec in config.get('recommendations', []):
-                    # Replace temperature placeholder
-                    rec = rec.replace('{temp}', str(temperature))
-                    recommendations['home_care'].append(rec)
-                break
+        bucket = temperature_bucket(temperature)
+        if bucket is not None:
+            recommendations['home_care'].extend(self._temp_care_by_bucket[bucket])
+        else:
+            recommendations['home_care'].extend(self._format_temperature_care(temperature))
+
+    def _format_temperature_care(self, temperature: float) -> List[str]:
+        """Temperature care texts for a temperature, with the placeholder filled in"""
+        templates = self._temp_templates[bisect_right(self._temp_thresholds, temperature)]
+        if not templates:
+            return []
+        temp_text = str(temperature)
+        return [temp_text.join(parts) for parts in templates]
 
     def _add_symptom_care(
         self,
@@ -163,14 +278,9 @@ class RecommendationEngine:
         symptoms_data: Dict[str, int]
     ):
         """Add symptom-specific care recommendations"""
-        symptom_care = self.config.get('symptom_care', {})
-
-        for symptom, config in symptom_care.items():
-            threshold = config.get('threshold', 6)
+        for symptom, threshold, symptom_recommendations in self._symptom_rules:
             if symptoms_data.get(symptom, 0) >= threshold:
-                recommendations['home_care'].extend(
-                    config.get('recommendations', [])
-                )
+                recommendations['home_care'].extend(symptom_recommendations)
 
     def _add_general_care(
         self,
@@ -178,13 +288,8 @@ class RecommendationEngine:
         symptoms_data: Dict[str, int]
     ):
         """Add general care recommendations"""
-        general_config = self.config.get('general_care', {})
-        threshold = general_config.get('threshold', 5)
-        check_symptoms = general_config.get('symptoms', [])
+        threshold = self._general_threshold
 
         # Check if any general symptoms are above threshold
-        if any(symptoms_data.get(s, 0) >= threshold for s in check_symptoms):
-            recommendations['home_care'].extend(
-                general_config.get('recommendations', [])
-            )
-
+        if any(symptoms_data.get(s, 0) >= threshold for s in self._general_symptoms):
+            recommendations['home_care'].extend(self._general_recommendations)
@@ -0,0 +1,215 @@
+"""
+Response Encoder Module
+=======================
+
+Fast JSON encoding of /diagnose responses.
+
+Most of a diagnosis response is static text (disease descriptions,
+urgency, severity and incubation strings, recommendation messages copied
+from the configuration), so ResponseEncoder encodes those once per
+knowledge base version and splices the cached fragments together with the
+few per-request values (confidence, matched symptoms, temperature,
+timestamp). Diagnoses are DiagnosisResult records, so the dictionary form
+of a result is never built on this path. Anything else is encoded with
+orjson when it is installed, or the json module otherwise.
+
+Both produce the same bytes: compact JSON with sorted keys (the key
+order Flask's jsonify uses) and UTF-8 text rather than \\u escapes.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import time
+
+try:
+    import orjson
+except ImportError:  # optional faster backend
+    orjson = None
+
+from .results import DiagnosisResult, json_default
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Bound on the encoded strings each encoder remembers
+MAX_CACHED_STRINGS = 4096
+
+# Keys of a /diagnose payload, in sorted order
+PAYLOAD_KEYS = (
+    'active_symptom_count', 'critical_warning', 'diagnoses', 'overall_severity',
+    'recommendations', 'symptom_average', 'temperature', 'timestamp'
+)
+
+
+def dumps(value: Any, newline: bool = False) -> bytes:
+    """Encode any JSON value compactly, with sorted keys, as UTF-8"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                value,
+                default=json_default,
+                option=orjson.OPT_SORT_KEYS | (orjson.OPT_APPEND_NEWLINE if newline else 0)
+            )
+        except TypeError:
+            pass  # types orjson does not handle (e.g. non-string keys)
+    encoded = json.dumps(
+        value, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=json_default
+    ).encode('utf-8')
+    return encoded + b'\n' if newline else encoded
+
+
+def _scalar(value: Any) -> bytes:
+    """Encode a number or boolean, matching json.dumps"""
+    value_type = type(value)
+    if value_type is bool:
+        return b'true' if value else b'false'
+    if value_type is int or (value_type is float and value - value == 0):
+        return repr(value).encode('ascii')
+    return dumps(value)
+
+
+# (second, text) of the last timestamp formatted
+_timestamp_cache: Tuple[int, str] = (-1, '')
+
+
+def current_timestamp() -> str:
+    """Local time as 'YYYY-MM-DD HH:MM:SS', formatted at most once per second"""
+    global _timestamp_cache
+    second = int(time.time())
+    cached = _timestamp_cache
+    if cached[0] != second:
+        cached = (second, time.strftime(TIMESTAMP_FORMAT, time.localtime(second)))
+        _timestamp_cache = cached
+    return cached[1]
+
+
+class ResponseEncoder:
+    """
+    Encodes /diagnose payloads from pre-encoded fragments
+
+    One encoder belongs to one engine snapshot; payloads must come from
+    that snapshot's engines. Recommendation fragments are encoded when the
+    encoder is built; disease fragments the first time each disease is
+    returned, so very large catalogs add nothing to load time.
+    """
+
+    def __init__(self, recommendation_engine):
+        """
+        Args:
+            recommendation_engine: RecommendationEngine of the same snapshot
+        """
+        self._strings: Dict[str, bytes] = {
+            text: dumps(text) for text in recommendation_engine.static_messages()
+        }
+        self._prevention = recommendation_engine.prevention
+        self._prevention_fragment = self._encode_strings(self._prevention)
+
+        # disease row -> (fragment before matched_symptoms, fragment after)
+        self._diseases: Dict[int, Tuple[bytes, bytes]] = {}
+        # (disease row, matched mask) -> encoded matched_symptoms list
+        self._matched: Dict[Tuple[int, int], bytes] = {}
+        self._timestamp: Tuple[Optional[str], bytes] = (None, b'')
+
+    def _string(self, text: str) -> bytes:
+        """
+        Encoded JSON string, remembered for reuse
+
+        Besides the static messages this picks up symptom and category names
+        and templated texts (temperature care), up to MAX_CACHED_STRINGS.
+        """
+        fragment = self._strings.get(text)
+        if fragment is None:
+            fragment = dumps(text)
+            if len(self._strings) < MAX_CACHED_STRINGS:
+                self._strings[text] = fragment
+        return fragment
+
+    def _encode_strings(self, texts: List[str]) -> bytes:
+        return b'[' + b','.join([self._string(text) for text in texts]) + b']'
+
+    def _disease_fragments(self, diagnosis: DiagnosisResult) -> Tuple[bytes, bytes]:
+        row = diagnosis.row
+        fragments = self._diseases.get(row)
+        if fragments is None:
+            fragments = (
+                b',"description":' + dumps(diagnosis.description)
+                + b',"disease":' + dumps(diagnosis.disease)
+                + b',"incubation":' + dumps(diagnosis.incubation)
+                + b',"matched_symptoms":',
+                b',"severity":' + dumps(diagnosis.severity)
+                + b',"urgency":' + dumps(diagnosis.urgency) + b'}'
+            )
+            self._diseases[row] = fragments
+        return fragments
+
+    def _matched_fragment(self, diagnosis: DiagnosisResult) -> bytes:
+        key = (diagnosis.row, diagnosis.matched_mask)
+        fragment = self._matched.get(key)
+        if fragment is None:
+            fragment = self._encode_strings(diagnosis.matched_symptoms)
+            if len(self._matched) < MAX_CACHED_STRINGS:
+                self._matched[key] = fragment
+        return fragment
+
+    def encode_diagnosis(self, diagnosis: DiagnosisResult) -> bytes:
+        """Encode one diagnosis result from its disease's fragments"""
+        if type(diagnosis) is not DiagnosisResult:
+            return dumps(diagnosis)
+
+        head, tail = self._disease_fragments(diagnosis)
+        return b'{"confidence":%s%s%s%s' % (
+            _scalar(diagnosis.confidence), head, self._matched_fragment(diagnosis), tail
+        )
+
+    def encode_recommendations(self, recommendations: Dict[str, List[str]]) -> bytes:
+        """Encode a recommendations dictionary"""
+        parts = []
+        for category in sorted(recommendations):
+            texts = recommendations[category]
+            if texts is self._prevention:
+                encoded = self._prevention_fragment
+            elif isinstance(texts, list):
+                encoded = self._encode_strings(texts)
+            else:
+                encoded = dumps(texts)
+            parts.append(self._string(category) + b':' + encoded)
+        return b'{' + b','.join(parts) + b'}'
+
+    def _encode_timestamp(self, timestamp: str) -> bytes:
+        cached_text, fragment = self._timestamp
+        if cached_text != timestamp:
+            fragment = dumps(timestamp)
+            self._timestamp = (timestamp, fragment)
+        return fragment
+
+    def encode_payload(self, payload: Dict[str, Any], timestamp: Optional[str] = None) -> bytes:
+        """
+        Encode a /diagnose response payload
+
+        Args:
+            payload: Dictionary from build_diagnosis_payload (or the cache)
+            timestamp: Timestamp to send instead of the payload's own
+
+        Returns:
+            JSON document followed by a newline, like Flask's jsonify
+        """
+        complete = len(payload) == len(PAYLOAD_KEYS) and all(key in payload for key in PAYLOAD_KEYS)
+        if not complete:
+            if timestamp is not None:
+                payload = {**payload, 'timestamp': timestamp}
+            return dumps(payload, newline=True)
+
+        return b''.join((
+            b'{"active_symptom_count":', _scalar(payload['active_symptom_count']),
+            b',"critical_warning":', _scalar(payload['critical_warning']),
+            b',"diagnoses":[',
+            b','.join([self.encode_diagnosis(diagnosis) for diagnosis in payload['diagnoses']]),
+            b'],"overall_severity":', _scalar(payload['overall_severity']),
+            b',"recommendations":', self.encode_recommendations(payload['recommendations']),
+            b',"symptom_average":', _scalar(payload['symptom_average']),
+            b',"temperature":', _scalar(payload['temperature']),
+            b',"timestamp":', self._encode_timestamp(timestamp if timestamp is not None else payload['timestamp']),
+            b'}\n'
+        ))
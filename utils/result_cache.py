@@ -0,0 +1,110 @@
+"""
+Result Cache Module
+===================
+
+LRU/TTL cache of complete diagnosis payloads keyed on the symptom profile.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+import threading
+import time
+import logging
+
+from .metrics import metrics
+from .validation import SymptomVector
+
+logger = logging.getLogger(__name__)
+
+class DiagnosisCache:
+    """Size-bounded LRU cache with per-entry time-to-live"""
+
+    def __init__(self, max_entries: int = 4096, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(symptoms_data: Dict[str, int], temperature: float) -> Optional[bytes]:
+        """
+        Build the canonical cache key for a validated symptom profile
+
+        Symptom values (0-10) are packed one byte each in symptom-name
+        order (or taken straight from a SymptomVector's buffer, whose order
+        is fixed per knowledge base), followed by the temperature in
+        tenths of a degree.
+        Temperatures that are not on the 0.1°C grid can change the
+        temperature multipliers between grid points, so they are not cached.
+
+        Args:
+            symptoms_data: Validated symptom severities
+            temperature: Validated temperature
+
+        Returns:
+            Key bytes, or None if the profile should bypass the cache
+        """
+        tenths = round(temperature * 10)
+        if tenths / 10 != temperature:
+            return None
+        if isinstance(symptoms_data, SymptomVector):
+            return symptoms_data.array.tobytes() + tenths.to_bytes(2, 'big')
+        return bytes(symptoms_data[name] for name in sorted(symptoms_data)) + tenths.to_bytes(2, 'big')
+
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """Return the cached payload for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        # The per-cache counts restart with each knowledge base; the
+        # exported counters carry on across reloads
+        if metrics.enabled:
+            metrics.inc('result_cache_misses_total' if entry is None else 'result_cache_hits_total')
+        return None if entry is None else entry[0]
+
+    def put(self, key: bytes, payload: Dict[str, Any]):
+        """Store a payload, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = (payload, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            self.evictions += evicted
+
+        if evicted and metrics.enabled:
+            metrics.inc('result_cache_evictions_total', evicted)
+
+    def clear(self):
+        """Drop every cached payload"""
+        with self._lock:
+            self._entries.clear()
+        logger.info("Diagnosis cache cleared")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_entries': self.max_entries
+            }
@@ -0,0 +1,120 @@
+"""
+Diagnosis Results Module
+========================
+
+Compact records for reported diseases. A DiagnosisResult holds only the
+disease row, its rounded confidence and a bitmask of matched symptoms;
+names and descriptions are read from the knowledge base tables, and the
+JSON dictionary form is only built at the API boundary.
+"""
+
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+class DiagnosisResult:
+    """
+    One diagnosis, readable like the result dictionaries it replaces
+
+    result['confidence'], result.get('urgency'), dict(result) and
+    comparisons with dictionaries keep working, so rule code and callers
+    need not change. Bit i of matched_mask is set when the disease's i-th
+    symptom (in knowledge base order) was rated 5 or higher.
+    """
+
+    __slots__ = ('knowledge_base', 'row', 'confidence', 'matched_mask')
+
+    # Keys of the JSON form, in the order the API has always used
+    KEYS: Tuple[str, ...] = (
+        'disease', 'description', 'confidence', 'urgency', 'severity', 'matched_symptoms', 'incubation'
+    )
+    _KEY_SET = frozenset(KEYS)
+
+    def __init__(self, knowledge_base, row: int, confidence: float, matched_mask: int):
+        self.knowledge_base = knowledge_base
+        self.row = row
+        self.confidence = confidence
+        self.matched_mask = matched_mask
+
+    @property
+    def disease(self) -> str:
+        return self.knowledge_base.disease_names[self.row]
+
+    @property
+    def description(self) -> str:
+        return self.knowledge_base.descriptions[self.row]
+
+    @property
+    def urgency(self) -> str:
+        return self.knowledge_base.urgencies[self.row]
+
+    @property
+    def severity(self) -> str:
+        return self.knowledge_base.severities[self.row]
+
+    @property
+    def incubation(self) -> str:
+        return self.knowledge_base.incubations[self.row]
+
+    @property
+    def matched_symptoms(self) -> List[str]:
+        return self.knowledge_base.matched_symptom_names(self.row, self.matched_mask)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            getter = _GETTERS[key]
+        except KeyError:
+            raise KeyError(key) from None
+        return getter(self)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        getter = _GETTERS.get(key)
+        return getter(self) if getter is not None else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.KEYS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._KEY_SET
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The API dictionary form"""
+        return {key: getattr(self, key) for key in self.KEYS}
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, DiagnosisResult):
+            if other.knowledge_base is self.knowledge_base:
+                return (self.row, self.confidence, self.matched_mask) == (other.row, other.confidence, other.matched_mask)
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"DiagnosisResult({self.disease!r}, confidence={self.confidence!r})"
+
+
+# Key -> function reading that field of a record
+_GETTERS = {
+    'disease': DiagnosisResult.disease.fget,
+    'description': DiagnosisResult.description.fget,
+    'confidence': DiagnosisResult.confidence.__get__,
+    'urgency': DiagnosisResult.urgency.fget,
+    'severity': DiagnosisResult.severity.fget,
+    'matched_symptoms': DiagnosisResult.matched_symptoms.fget,
+    'incubation': DiagnosisResult.incubation.fget,
+}
+
+
+def json_default(value: Any) -> Any:
+    """json/orjson `default` hook: encode DiagnosisResult records as dictionaries"""
+    if isinstance(value, DiagnosisResult):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,158 @@
+"""
+Knowledge Base Schema Module
+============================
+
+Structural validation of diseases.json and recommendations.json.
+"""
+
+from numbers import Real
+from typing import Dict, List, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_LEVELS = ('low', 'medium', 'high')
+URGENCY_LEVELS = ('normal', 'warning', 'urgent')
+
+
+class SchemaError(ValueError):
+    """Raised when the knowledge base files do not match the expected schema"""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__(f"{len(errors)} schema error(s): " + '; '.join(errors[:10]))
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, Real) and not isinstance(value, bool)
+
+
+def _check_string_list(errors: List[str], value: Any, where: str):
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        errors.append(f"{where} must be a list of strings")
+
+
+def validate_diseases(diseases_data: Dict[str, Any]) -> List[str]:
+    """
+    Validate the contents of diseases.json
+
+    Args:
+        diseases_data: Parsed diseases.json
+
+    Returns:
+        List of error messages (empty when valid)
+    """
+    errors: List[str] = []
+    diseases = diseases_data.get('diseases') if isinstance(diseases_data, dict) else None
+    if not isinstance(diseases, dict) or not diseases:
+        return ["diseases.json must contain a non-empty 'diseases' object"]
+
+    for name, info in diseases.items():
+        where = f"diseases['{name}']"
+        if not isinstance(info, dict):
+            errors.append(f"{where} must be an object")
+            continue
+
+        symptoms = info.get('symptoms')
+        if not isinstance(symptoms, dict) or not symptoms:
+            errors.append(f"{where}.symptoms must be a non-empty object")
+        else:
+            for symptom, weight in symptoms.items():
+                if not _is_number(weight) or not 0 < weight <= 1:
+                    errors.append(f"{where}.symptoms['{symptom}'] must be a number in (0, 1]")
+
+        temp_range = info.get('temp_range')
+        if temp_range is not None:
+            if (not isinstance(temp_range, list) or len(temp_range) != 2
+                    or not all(_is_number(t) for t in temp_range)):
+                errors.append(f"{where}.temp_range must be [low, high]")
+            elif temp_range[0] > temp_range[1]:
+                errors.append(f"{where}.temp_range low must not exceed high")
+
+        if info.get('severity', 'medium') not in SEVERITY_LEVELS:
+            errors.append(f"{where}.severity must be one of {', '.join(SEVERITY_LEVELS)}")
+        if info.get('urgency', 'normal') not in URGENCY_LEVELS:
+            errors.append(f"{where}.urgency must be one of {', '.join(URGENCY_LEVELS)}")
+        for field in ('description', 'incubation'):
+            if field in info and not isinstance(info[field], str):
+                errors.append(f"{where}.{field} must be a string")
+
+    return errors
+
+
+def validate_recommendations(config: Dict[str, Any]) -> List[str]:
+    """
+    Validate the contents of recommendations.json
+
+    Args:
+        config: Parsed recommendations.json
+
+    Returns:
+        List of error messages (empty when valid)
+    """
+    if not isinstance(config, dict):
+        return ["recommendations.json must be an object"]
+
+    errors: List[str] = []
+
+    for key, rule in config.get('critical_symptoms', {}).items():
+        where = f"critical_symptoms['{key}']"
+        if not isinstance(rule, dict) or not isinstance(rule.get('message'), str):
+            errors.append(f"{where} must be an object with a 'message' string")
+            continue
+        for field in ('threshold', 'temp_threshold', 'symptom_threshold'):
+            if field in rule and not _is_number(rule[field]):
+                errors.append(f"{where}.{field} must be a number")
+        if 'symptom' in rule and not isinstance(rule['symptom'], str):
+            errors.append(f"{where}.symptom must be a string")
+
+    for disease, rule in config.get('disease_specific', {}).items():
+        _check_string_list(errors, rule.get('medical', []) if isinstance(rule, dict) else None,
+                           f"disease_specific['{disease}'].medical")
+
+    for level, rule in config.get('urgency_levels', {}).items():
+        where = f"urgency_levels['{level}']"
+        if not isinstance(rule, dict):
+            errors.append(f"{where} must be an object")
+        elif 'message' in rule and not isinstance(rule['message'], str):
+            errors.append(f"{where}.message must be a string")
+        elif 'messages' in rule:
+            _check_string_list(errors, rule['messages'], f"{where}.messages")
+
+    for section in ('temperature_care', 'symptom_care'):
+        for key, rule in config.get(section, {}).items():
+            where = f"{section}['{key}']"
+            if not isinstance(rule, dict):
+                errors.append(f"{where} must be an object")
+                continue
+            if 'threshold' in rule and not _is_number(rule['threshold']):
+                errors.append(f"{where}.threshold must be a number")
+            _check_string_list(errors, rule.get('recommendations', []), f"{where}.recommendations")
+
+    general_care = config.get('general_care', {})
+    if not isinstance(general_care, dict):
+        errors.append("general_care must be an object")
+    else:
+        if 'threshold' in general_care and not _is_number(general_care['threshold']):
+            errors.append("general_care.threshold must be a number")
+        _check_string_list(errors, general_care.get('symptoms', []), "general_care.symptoms")
+        _check_string_list(errors, general_care.get('recommendations', []), "general_care.recommendations")
+
+    _check_string_list(errors, config.get('prevention', []), "prevention")
+    return errors
+
+
+def validate_knowledge_base(diseases_data: Dict[str, Any], recommendations_config: Dict[str, Any]):
+    """
+    Validate both knowledge base files
+
+    Args:
+        diseases_data: Parsed diseases.json
+        recommendations_config: Parsed recommendations.json
+
+    Raises:
+        SchemaError: If either file is invalid
+    """
+    errors = validate_diseases(diseases_data) + validate_recommendations(recommendations_config)
+    if errors:
+        raise SchemaError(errors)
@@ -0,0 +1,214 @@
+"""
+Diagnosis Sessions Module
+=========================
+
+Incremental re-diagnosis for clients that re-run the diagnosis as each
+slider moves. A session keeps one patient's symptom vector and every
+disease's probability; an update sends only the changed values, and only
+the diseases listing a changed symptom (found through the inverted index)
+are rescored. Results are identical to a full /diagnose request.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import secrets
+import threading
+import time
+import logging
+
+import numpy as np
+
+from .knowledge_base import CompiledKnowledgeBase
+from .results import DiagnosisResult
+from .validation import SymptomVector
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalScores:
+    """
+    Probabilities of every disease for one patient, kept up to date
+
+    Each rescored row is recomputed from its symptoms (rather than by
+    adding (new - old) * weight to a running sum), so the floating-point
+    result is exactly what a full scoring pass would produce; the cost per
+    update is still proportional to the diseases listing the symptom.
+    """
+
+    __slots__ = ('knowledge_base', 'symptom_vector', 'temperature', 'base', 'probabilities')
+
+    def __init__(self, knowledge_base: CompiledKnowledgeBase, symptom_vector: np.ndarray, temperature: float):
+        """
+        Args:
+            knowledge_base: Compiled knowledge base to score against
+            symptom_vector: Scoring-ordered severity vector; updates are read
+                from it, so it must be a live view of the session's values
+            temperature: Patient's temperature
+        """
+        kb = knowledge_base
+        self.knowledge_base = kb
+        self.symptom_vector = symptom_vector
+        self.temperature = temperature
+
+        # Diseases without an active symptom have probability 0
+        self.base = np.zeros(kb.disease_count, dtype=np.float64)
+        rows = kb.candidate_rows(symptom_vector)
+        self.base[rows] = kb.row_probabilities(symptom_vector, rows)
+        self.probabilities = kb.adjust_by_temperature(self.base, temperature)
+
+    def refresh_symptoms(self, symptoms: List[int]) -> int:
+        """
+        Rescore the diseases listing any of the given symptoms
+
+        Args:
+            symptoms: Scoring-order indices of symptoms whose value changed
+
+        Returns:
+            Number of disease rows rescored
+        """
+        kb = self.knowledge_base
+        if not symptoms:
+            return 0
+        if len(symptoms) == 1:
+            rows = kb.postings(symptoms[0])[0]
+        else:
+            rows = np.unique(np.concatenate([kb.postings(symptom)[0] for symptom in symptoms]))
+
+        base = kb.row_probabilities(self.symptom_vector, rows)
+        self.base[rows] = base
+        self.probabilities[rows] = kb.adjust_by_temperature(base, self.temperature, rows)
+        return len(rows)
+
+    def set_temperature(self, temperature: float):
+        """Re-apply the temperature multipliers (symptom scores are unchanged)"""
+        self.temperature = temperature
+        self.probabilities = self.knowledge_base.adjust_by_temperature(self.base, temperature)
+
+
+class DiagnosisSession:
+    """One client's symptom values and incremental scores"""
+
+    __slots__ = ('session_id', 'engines', 'symptoms', 'temperature', 'scores', 'lock', 'expires_at')
+
+    def __init__(self, session_id: str, engines, temperature: float, symptoms: SymptomVector, ttl_seconds: float):
+        self.session_id = session_id
+        self.lock = threading.Lock()
+        self.expires_at = time.monotonic() + ttl_seconds
+        self._bind(engines, temperature, symptoms)
+
+    def _bind(self, engines, temperature: float, symptoms: SymptomVector):
+        self.engines = engines
+        self.temperature = temperature
+        self.symptoms = symptoms
+        self.scores = IncrementalScores(
+            engines.diagnosis_engine.knowledge_base,
+            engines.diagnosis_engine.symptom_vector(symptoms),
+            temperature
+        )
+
+    def update(self, engines, data: Dict[str, Any]) -> int:
+        """
+        Apply an incremental update (call with the session lock held)
+
+        A session created before a knowledge base reload is first moved to
+        the new engines by re-validating its current values.
+
+        Args:
+            engines: EngineSnapshot serving the request
+            data: Changed values, as accepted by SymptomValidator.parse_changes
+
+        Returns:
+            Number of disease rows rescored
+
+        Raises:
+            ValueError: If the update is invalid
+        """
+        if engines is not self.engines:
+            temperature, symptoms = engines.validator.parse(
+                {'temperature': self.temperature, **self.symptoms.to_dict()}
+            )
+            self._bind(engines, temperature, symptoms)
+            logger.debug("Session %s moved to knowledge base generation %d", self.session_id, engines.generation)
+
+        temperature, changes = engines.validator.parse_changes(data)
+
+        values = self.symptoms.array
+        scored = len(self.scores.symptom_vector)
+        changed = []
+        for position, value in changes.items():
+            if values[position] != value:
+                values[position] = value
+                if position < scored:
+                    changed.append(position)
+
+        rescored = self.scores.refresh_symptoms(changed)
+        if temperature is not None and temperature != self.temperature:
+            self.temperature = temperature
+            self.scores.set_temperature(temperature)
+            rescored = len(self.scores.probabilities)
+        return rescored
+
+    def diagnose(self, min_confidence: float, top_k: Optional[int]) -> List[DiagnosisResult]:
+        """Diagnoses for the current values, as analyze_symptoms would return them"""
+        return self.engines.diagnosis_engine.diagnose_scores(
+            self.scores.probabilities, self.scores.symptom_vector, min_confidence, top_k
+        )
+
+
+class SessionStore:
+    """Size-bounded LRU store of diagnosis sessions with an idle timeout"""
+
+    def __init__(self, max_sessions: int = 1024, ttl_seconds: float = 900):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, DiagnosisSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.updates = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_sessions > 0
+
+    def create(self, engines, temperature: float, symptoms: SymptomVector) -> DiagnosisSession:
+        """Start a session from a validated /diagnose request"""
+        session = DiagnosisSession(secrets.token_urlsafe(16), engines, temperature, symptoms, self.ttl_seconds)
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self.created += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[DiagnosisSession]:
+        """Return a live session (extending its timeout), or None"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if session.expires_at <= now:
+                del self._sessions[session_id]
+                return None
+            session.expires_at = now + self.ttl_seconds
+            self._sessions.move_to_end(session_id)
+            self.updates += 1
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        """End a session; returns False if it did not exist"""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> Dict[str, int]:
+        """Return session counters and current size"""
+        with self._lock:
+            return {
+                'active': len(self._sessions),
+                'created': self.created,
+                'updates': self.updates,
+                'evictions': self.evictions,
+                'max_sessions': self.max_sessions
+            }
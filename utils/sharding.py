@@ -0,0 +1,364 @@
+"""
+Sharding Module
+===============
+
+Scatter-gather diagnosis for catalogs split across several processes or
+machines.
+
+Each shard serves a contiguous range of the catalog's disease rows from
+its own DiagnosisEngine and answers with its local top results over a
+TCP socket (one JSON document per line). The coordinator sends every
+shard the patient's active symptoms, then merges the replies by the same
+ranking select_top uses (rounded confidence, then catalog row), so a
+complete answer is identical to scoring the whole catalog in one process.
+Shards that do not answer within the timeout are left out and the merged
+answer is flagged as partial.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import socket
+import socketserver
+import threading
+import time
+
+from .diagnosis_engine import DiagnosisEngine
+from .metrics import metrics
+from .response_encoder import dumps
+
+logger = logging.getLogger(__name__)
+
+# Default port of shard 0; shard i listens on DEFAULT_SHARD_PORT + i
+DEFAULT_SHARD_PORT = 9100
+
+# Concurrent requests the coordinator keeps open to each shard
+MAX_REQUESTS_PER_SHARD = 16
+
+# Retry-After (seconds) sent when no shard answers
+UNAVAILABLE_RETRY_AFTER = 5
+
+
+class ShardsUnavailableError(Exception):
+    """Raised when no shard answered; an empty result would look like a healthy patient"""
+
+    def __init__(self, message: str, retry_after: int = UNAVAILABLE_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def shard_bounds(disease_count: int, shard_count: int, shard_index: int) -> Tuple[int, int]:
+    """
+    Disease rows [start, stop) served by one shard
+
+    Args:
+        disease_count: Diseases in the whole catalog
+        shard_count: Number of shards
+        shard_index: Shard position (0-based)
+
+    Returns:
+        Tuple of (first row, row after the last)
+    """
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"Shard index {shard_index} is outside 0..{shard_count - 1}")
+    return (
+        disease_count * shard_index // shard_count,
+        disease_count * (shard_index + 1) // shard_count
+    )
+
+
+def partition_database(
+    disease_database: Dict[str, Any],
+    shard_count: int,
+    shard_index: int
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Cut one shard's diseases out of the catalog, keeping catalog order
+
+    Returns:
+        Tuple of (the shard's disease database, catalog row of its first disease)
+    """
+    start, stop = shard_bounds(len(disease_database), shard_count, shard_index)
+    return dict(islice(disease_database.items(), start, stop)), start
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """Split 'host:port' (or a bare port, meaning localhost)"""
+    host, _, port = address.strip().rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+class _ShardRequestHandler(socketserver.StreamRequestHandler):
+    """Answers JSON requests, one per line, on one connection"""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = self.server.respond(json.loads(line))
+            except Exception as e:
+                logger.warning("Shard request failed: %s", e)
+                response = {'error': str(e)}
+            self.wfile.write(dumps(response, newline=True))
+            self.wfile.flush()
+
+
+class ShardServer(socketserver.ThreadingTCPServer):
+    """Serves one shard's diagnoses over TCP"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        diagnosis_engine: DiagnosisEngine,
+        shard_index: int,
+        shard_count: int,
+        row_offset: int
+    ):
+        """
+        Args:
+            address: (host, port) to listen on
+            diagnosis_engine: Engine over this shard's diseases only
+            shard_index: Position of this shard
+            shard_count: Number of shards the catalog was split into
+            row_offset: Catalog row of the shard's first disease
+        """
+        self.diagnosis_engine = diagnosis_engine
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.row_offset = row_offset
+        super().__init__(address, _ShardRequestHandler)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'shard_index': self.shard_index,
+            'shard_count': self.shard_count,
+            'row_offset': self.row_offset,
+            'diseases': self.diagnosis_engine.knowledge_base.disease_count
+        }
+
+    def respond(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Handle one request
+
+        {"op": "diagnose", "symptoms": {...}, "temperature": t,
+        "min_confidence": c, "top_k": k} returns the shard's top results
+        with their catalog rows; {"op": "info"} describes the shard.
+        """
+        op = message.get('op')
+        if op == 'info':
+            return self.info()
+        if op != 'diagnose':
+            raise ValueError(f"Unknown operation {op!r}")
+
+        diagnoses = self.diagnosis_engine.analyze_symptoms(
+            message['symptoms'],
+            message['temperature'],
+            min_confidence=message['min_confidence'],
+            top_k=message.get('top_k')
+        )
+        return {
+            'shard_index': self.shard_index,
+            'rows': [self.row_offset + diagnosis.row for diagnosis in diagnoses],
+            'diagnoses': [diagnosis.to_dict() for diagnosis in diagnoses]
+        }
+
+
+def _remaining(deadline: float) -> float:
+    """Seconds left until a monotonic deadline"""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise socket.timeout("shard request deadline passed")
+    return remaining
+
+
+class ShardClient:
+    """Reusable connections to one shard, with its own bounded set of request threads"""
+
+    def __init__(self, address: Tuple[str, int], max_requests: int = MAX_REQUESTS_PER_SHARD):
+        self.address = address
+        self._idle: List[Tuple[socket.socket, Any]] = []
+        self._lock = threading.Lock()
+        # Per shard, so a slow shard only ties up its own threads
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_requests, thread_name_prefix='shard-%s:%d' % address
+        )
+
+    def submit(self, message: Dict[str, Any], deadline: float) -> Future:
+        """Send a request from this shard's threads; the future holds the reply"""
+        return self._executor.submit(self.request, message, deadline)
+
+    def request(self, message: Dict[str, Any], deadline: float) -> Dict[str, Any]:
+        """
+        Send one request and wait for its reply
+
+        A pooled connection the shard has since closed (e.g. it restarted)
+        fails before any reply arrives; the request is then sent once more
+        on a fresh connection if the deadline allows. Requests only read
+        shard state, so sending one twice is harmless.
+
+        Args:
+            message: Request document
+            deadline: time.monotonic() by which the reply must have arrived;
+                connecting, sending and reading share what is left of it
+
+        Raises:
+            OSError: On connection failures and timeouts
+            ValueError: If the shard reports an error
+        """
+        payload = dumps(message, newline=True)
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+
+        if connection is None:
+            line = self._exchange(self._connect(deadline), payload, deadline)
+        else:
+            try:
+                line = self._exchange(connection, payload, deadline)
+            except ConnectionError:
+                logger.debug(f"Stale connection to shard {self.address[0]}:{self.address[1]}; reconnecting")
+                line = self._exchange(self._connect(deadline), payload, deadline)
+
+        response = json.loads(line)
+        if 'error' in response:
+            raise ValueError(f"Shard {self.address[0]}:{self.address[1]} failed: {response['error']}")
+        return response
+
+    def _connect(self, deadline: float) -> Tuple[socket.socket, Any]:
+        sock = socket.create_connection(self.address, timeout=_remaining(deadline))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock, sock.makefile('rb')
+
+    def _exchange(self, connection: Tuple[socket.socket, Any], payload: bytes, deadline: float) -> bytes:
+        """Write one request line and read the reply line, pooling the connection afterwards"""
+        sock, reader = connection
+        try:
+            sock.settimeout(_remaining(deadline))
+            sock.sendall(payload)
+            sock.settimeout(_remaining(deadline))
+            line = reader.readline()
+            if not line:
+                raise ConnectionError(f"Shard {self.address[0]}:{self.address[1]} closed the connection")
+        except BaseException:
+            reader.close()
+            sock.close()
+            raise
+
+        with self._lock:
+            self._idle.append(connection)
+        return line
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for sock, reader in idle:
+            reader.close()
+            sock.close()
+
+
+class ShardCoordinator:
+    """Fans /diagnose out to shards and merges their answers"""
+
+    def __init__(self, addresses: List[str], timeout: float = 0.5):
+        """
+        Args:
+            addresses: 'host:port' of each shard, in shard index order
+            timeout: Seconds to wait for the shards of one request
+        """
+        self.addresses = [parse_address(address) for address in addresses]
+        self.clients = [ShardClient(address) for address in self.addresses]
+        self.timeout = timeout
+        self.partial_responses = 0
+        self._counter_lock = threading.Lock()
+
+    @property
+    def shard_count(self) -> int:
+        return len(self.clients)
+
+    def diagnose(
+        self,
+        symptoms_data,
+        temperature: float,
+        min_confidence: float,
+        top_k: Optional[int]
+    ) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """
+        Diagnose one patient on every shard
+
+        Args:
+            symptoms_data: Validated symptom severities (mapping of name to value)
+            temperature: Validated temperature
+            min_confidence: Minimum confidence threshold
+            top_k: Number of diagnoses to return (default: all above threshold)
+
+        Returns:
+            Tuple of (merged diagnoses as result dictionaries, indices of the
+            shards that did not answer)
+
+        Raises:
+            ShardsUnavailableError: If no shard answered
+        """
+        message = {
+            'op': 'diagnose',
+            'symptoms': {symptom: value for symptom, value in symptoms_data.items() if value > 0},
+            'temperature': temperature,
+            'min_confidence': min_confidence,
+            'top_k': top_k
+        }
+        deadline = time.monotonic() + self.timeout
+        futures = [client.submit(message, deadline) for client in self.clients]
+        wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+
+        ranked, missing = [], []
+        for shard_index, future in enumerate(futures):
+            if not future.done() or future.exception() is not None:
+                missing.append(shard_index)
+                # Still queued behind a slow shard's requests: drop it (a
+                # running request gives up at the deadline by itself)
+                future.cancel()
+                if future.done() and not future.cancelled():
+                    logger.warning("Shard %d failed: %s", shard_index, future.exception())
+                else:
+                    logger.warning("Shard %d timed out after %.3fs", shard_index, self.timeout)
+                continue
+            response = future.result()
+            for row, diagnosis in zip(response['rows'], response['diagnoses']):
+                ranked.append((-diagnosis['confidence'], row, diagnosis))
+
+        if len(missing) == self.shard_count:
+            raise ShardsUnavailableError(f"None of the {self.shard_count} diagnosis shards answered")
+
+        # Same order as select_top: rounded confidence, ties in catalog order
+        ranked.sort(key=lambda entry: entry[:2])
+        if top_k is not None:
+            ranked = ranked[:max(top_k, 0)]
+        if missing:
+            # Requests run on many threads; an unlocked += loses increments
+            with self._counter_lock:
+                self.partial_responses += 1
+            if metrics.enabled:
+                metrics.inc('shard_partial_responses_total')
+        return [diagnosis for _, _, diagnosis in ranked], missing
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Ask every shard to describe itself (errors are reported per shard)"""
+        statuses = []
+        for shard_index, client in enumerate(self.clients):
+            try:
+                info = client.request({'op': 'info'}, time.monotonic() + self.timeout)
+                info['healthy'] = info.get('shard_index') == shard_index and info.get('shard_count') == self.shard_count
+            except (OSError, ValueError) as e:
+                info = {'healthy': False, 'error': str(e)}
+            info['address'] = '%s:%d' % client.address
+            statuses.append(info)
+        return statuses
+
+    def close(self):
+        for client in self.clients:
+            client.close()
@@ -0,0 +1,364 @@
+"""
+Knowledge Base Snapshot Module
+==============================
+
+Versioned binary snapshot of the compiled knowledge base, built once from
+the JSON files and memory-mapped by every worker.
+
+Layout (little-endian):
+    magic (6 bytes) | format version (uint16) | header length (uint32)
+    content SHA-256 of everything after the preamble (32 bytes)
+    JSON header (source hash and file stats, symptom names,
+                 recommendations config, array directory)
+    array data, each array aligned to 64 bytes
+
+Per-disease strings (names, descriptions, ...) are stored as a UTF-8 blob
+plus an offsets array each and decoded on access, so a worker does not
+hold one Python string per disease.
+"""
+
+from pathlib import Path
+from collections.abc import Sequence
+from typing import Dict, Any, Iterable, List, NamedTuple, Optional, Tuple
+import hashlib
+import json
+import mmap
+import struct
+import logging
+
+import numpy as np
+
+from .knowledge_base import CompiledKnowledgeBase
+from .schema import validate_knowledge_base
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'MSCKB\x00'
+SNAPSHOT_VERSION = 3
+ARRAY_ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct('<6sHI32s')
+
+# On-disk dtype of every exported array
+_ARRAY_DTYPES = {
+    'row_symptoms': '<i8',
+    'row_weights': '<f8',
+    'row_lengths': '<i8',
+    'total_possible': '<f8',
+    'temp_low': '<f8',
+    'temp_high': '<f8',
+    'posting_rows': '<i8',
+    'posting_weights': '<f8',
+    'posting_offsets': '<i8',
+}
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is missing, corrupt or incompatible"""
+
+
+class LoadedSnapshot(NamedTuple):
+    """A decoded snapshot and its identifying hashes"""
+    knowledge_base: CompiledKnowledgeBase
+    recommendations_config: Dict[str, Any]
+    content_hash: str
+    source_hash: Optional[str]
+    source_stats: Optional[Dict[str, List[int]]] = None
+
+
+class StringTable(Sequence):
+    """
+    Read-only list of strings decoded on access from a UTF-8 blob
+
+    String i is data[offsets[i]:offsets[i + 1]]. Both arrays may be views
+    over a memory-mapped snapshot, shared by every worker process.
+    """
+
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    @staticmethod
+    def encode(strings: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Pack strings into (uint8 blob, int64 offsets) arrays"""
+        encoded = [string.encode('utf-8') for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+        np.cumsum([len(blob) for blob in encoded], out=offsets[1:])
+        return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('string table index out of range')
+        start, stop = self.offsets[index:index + 2].tolist()
+        return self.data[start:stop].tobytes().decode('utf-8')
+
+    def tolist(self) -> List[str]:
+        return [self[i] for i in range(len(self))]
+
+
+def _align(offset: int) -> int:
+    return (offset + ARRAY_ALIGNMENT - 1) // ARRAY_ALIGNMENT * ARRAY_ALIGNMENT
+
+
+def fingerprint_sources(paths: Iterable[Path]) -> str:
+    """
+    Hash the raw bytes of the knowledge base source files
+
+    The fingerprint identifies a knowledge base version without parsing
+    the JSON, whichever form (JSON or snapshot) a worker loaded it from.
+
+    Args:
+        paths: Source files, in a fixed order
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        path = Path(path)
+        digest.update(path.name.encode('utf-8') + b'\x00')
+        digest.update(path.read_bytes())
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def stat_sources(paths: Iterable[Path]) -> Dict[str, List[int]]:
+    """
+    Size and modification time of each knowledge base source file
+
+    Recorded next to the source hash so a loader can tell the files are
+    unchanged from a stat() call instead of re-hashing them.
+
+    Args:
+        paths: Source files
+
+    Returns:
+        Dictionary mapping file name to [size, mtime in nanoseconds]
+    """
+    stats = {}
+    for path in paths:
+        stat = Path(path).stat()
+        stats[Path(path).name] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def write_snapshot(
+    path: Path,
+    knowledge_base: CompiledKnowledgeBase,
+    recommendations_config: Dict[str, Any],
+    source_hash: Optional[str] = None,
+    source_stats: Optional[Dict[str, List[int]]] = None
+) -> str:
+    """
+    Write a compiled knowledge base and recommendations config to disk
+
+    Args:
+        path: Destination file
+        knowledge_base: Compiled disease tables
+        recommendations_config: Recommendations configuration
+        source_hash: fingerprint_sources() of the JSON files it came from
+        source_stats: stat_sources() of the same files, taken before hashing
+
+    Returns:
+        Hex content hash of the written snapshot
+    """
+    arrays, strings = knowledge_base.export_tables()
+
+    tables = [(name, arrays[name], _ARRAY_DTYPES[name]) for name in CompiledKnowledgeBase.ARRAY_FIELDS]
+    for name in CompiledKnowledgeBase.DISEASE_STRING_FIELDS:
+        data, offsets = StringTable.encode(strings[name])
+        tables.append((f'{name}.data', data, '|u1'))
+        tables.append((f'{name}.offsets', offsets, '<i8'))
+
+    directory = {}
+    offset = 0
+    blobs = []
+    for name, array, dtype in tables:
+        data = np.ascontiguousarray(array, dtype=dtype)
+        offset = _align(offset)
+        directory[name] = {'dtype': dtype, 'shape': list(data.shape), 'offset': offset}
+        blobs.append((offset, data.tobytes()))
+        offset += data.nbytes
+
+    header = json.dumps({
+        'source_hash': source_hash,
+        'source_stats': source_stats,
+        'strings': {'symptom_names': list(strings['symptom_names'])},
+        'recommendations': recommendations_config,
+        'arrays': directory,
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    data_start = _align(_PREAMBLE.size + len(header))
+    total_size = data_start + offset
+
+    buffer = bytearray(total_size)
+    buffer[_PREAMBLE.size:_PREAMBLE.size + len(header)] = header
+    for blob_offset, blob in blobs:
+        start = data_start + blob_offset
+        buffer[start:start + len(blob)] = blob
+
+    content_hash = hashlib.sha256(memoryview(buffer)[_PREAMBLE.size:]).digest()
+    _PREAMBLE.pack_into(buffer, 0, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header), content_hash)
+
+    # Write beside the target and rename, so readers never map a partial file
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_bytes(buffer)
+    tmp_path.replace(path)
+
+    logger.info("Wrote knowledge base snapshot %s (%d bytes)", path, total_size)
+    return content_hash.hex()
+
+
+def build_snapshot(data_dir: Path, output_path: Path) -> str:
+    """
+    Validate the JSON knowledge base and compile it into a snapshot
+
+    Args:
+        data_dir: Directory holding diseases.json and recommendations.json
+        output_path: Snapshot file to write
+
+    Returns:
+        Hex content hash of the written snapshot
+
+    Raises:
+        SchemaError: If the JSON files fail validation
+    """
+    data_dir = Path(data_dir)
+    source_paths = [data_dir / 'diseases.json', data_dir / 'recommendations.json']
+    # Stat before reading: a file edited meanwhile no longer matches the stats
+    source_stats = stat_sources(source_paths)
+
+    with open(source_paths[0], 'r', encoding='utf-8') as f:
+        diseases_data = json.load(f)
+    with open(source_paths[1], 'r', encoding='utf-8') as f:
+        recommendations_config = json.load(f)
+
+    validate_knowledge_base(diseases_data, recommendations_config)
+
+    return write_snapshot(
+        output_path,
+        CompiledKnowledgeBase(diseases_data['diseases']),
+        recommendations_config,
+        source_hash=fingerprint_sources(source_paths),
+        source_stats=source_stats
+    )
+
+
+def parse_snapshot(buffer, verify: bool = False) -> LoadedSnapshot:
+    """
+    Decode a snapshot held in memory without copying its arrays
+
+    Args:
+        buffer: bytes-like object (or mmap) with the snapshot contents
+        verify: Recompute the content hash and reject mismatches
+
+    Returns:
+        LoadedSnapshot
+    """
+    if len(buffer) < _PREAMBLE.size:
+        raise SnapshotError("Snapshot is truncated")
+
+    magic, version, header_length, content_hash = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError("Not a knowledge base snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {version} (expected {SNAPSHOT_VERSION})")
+    if verify and hashlib.sha256(memoryview(buffer)[_PREAMBLE.size:]).digest() != content_hash:
+        raise SnapshotError("Snapshot content hash mismatch")
+
+    header_end = _PREAMBLE.size + header_length
+    try:
+        header = json.loads(bytes(buffer[_PREAMBLE.size:header_end]).decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise SnapshotError(f"Corrupt snapshot header: {e}")
+
+    data_start = _align(header_end)
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        start = data_start + spec['offset']
+        if start + count * dtype.itemsize > len(buffer):
+            raise SnapshotError(f"Snapshot array '{name}' is truncated")
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=start).reshape(spec['shape'])
+
+    strings = dict(header['strings'])
+    for name in CompiledKnowledgeBase.DISEASE_STRING_FIELDS:
+        try:
+            strings[name] = StringTable(arrays.pop(f'{name}.data'), arrays.pop(f'{name}.offsets'))
+        except KeyError:
+            raise SnapshotError(f"Snapshot is missing the '{name}' string table")
+
+    return LoadedSnapshot(
+        knowledge_base=CompiledKnowledgeBase.from_tables(arrays, strings),
+        recommendations_config=header['recommendations'],
+        content_hash=content_hash.hex(),
+        source_hash=header.get('source_hash'),
+        source_stats=header.get('source_stats')
+    )
+
+
+def read_snapshot_header(path: Path) -> Dict[str, Any]:
+    """
+    Read only a snapshot's JSON header (symptom names, recommendations
+    config, source hash and stats), without mapping or decoding its arrays
+
+    Args:
+        path: Snapshot file
+
+    Returns:
+        Header dictionary
+    """
+    try:
+        with open(path, 'rb') as f:
+            preamble = f.read(_PREAMBLE.size)
+            if len(preamble) < _PREAMBLE.size:
+                raise SnapshotError("Snapshot is truncated")
+            magic, version, header_length, _ = _PREAMBLE.unpack(preamble)
+            if magic != SNAPSHOT_MAGIC:
+                raise SnapshotError("Not a knowledge base snapshot")
+            if version != SNAPSHOT_VERSION:
+                raise SnapshotError(f"Unsupported snapshot version {version} (expected {SNAPSHOT_VERSION})")
+            header = f.read(header_length)
+    except OSError as e:
+        raise SnapshotError(f"Cannot read snapshot {path}: {e}")
+    try:
+        return json.loads(header.decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise SnapshotError(f"Corrupt snapshot header: {e}")
+
+
+def read_snapshot(path: Path, use_mmap: bool = True, verify: bool = False) -> LoadedSnapshot:
+    """
+    Load a snapshot file
+
+    With use_mmap the arrays are read-only views over a shared memory
+    mapping of the file, so worker processes share the same physical pages.
+
+    Args:
+        path: Snapshot file
+        use_mmap: Map the file instead of reading it into memory
+        verify: Recompute the content hash and reject mismatches
+
+    Returns:
+        LoadedSnapshot
+    """
+    try:
+        if use_mmap:
+            with open(path, 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = Path(path).read_bytes()
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Cannot read snapshot {path}: {e}")
+    return parse_snapshot(buffer, verify=verify)
@@ -0,0 +1,70 @@
+"""
+Temperature Grid Module
+=======================
+
+The 0.1°C grid over the accepted temperature range (35.0-43.0°C).
+
+Clients send temperatures with one decimal, so temperature-dependent
+results (disease multipliers, temperature care texts) are precomputed
+once per grid bucket and looked up by index. A
+temperature only uses a bucket when it is exactly the grid value, i.e.
+the same float the bucket was computed with; anything else (38.55,
+values outside the range) takes the regular computation, so results are
+identical either way.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+GRID_MIN = 35.0
+GRID_MAX = 43.0
+
+# Buckets per degree
+GRID_RESOLUTION = 10
+
+BUCKET_COUNT = int(round((GRID_MAX - GRID_MIN) * GRID_RESOLUTION)) + 1
+
+# Grid temperatures, each the float nearest its one-decimal text (what
+# float('38.5') and JSON parsing produce)
+GRID: List[float] = [round(GRID_MIN + bucket / GRID_RESOLUTION, 1) for bucket in range(BUCKET_COUNT)]
+GRID_ARRAY = np.array(GRID, dtype=np.float64)
+
+# Grid temperature -> bucket
+_BUCKETS = {temperature: bucket for bucket, temperature in enumerate(GRID)}
+
+
+def temperature_bucket(temperature: float) -> Optional[int]:
+    """
+    Grid bucket of a temperature
+
+    Args:
+        temperature: Temperature as a float
+
+    Returns:
+        Bucket index, or None when the temperature is not exactly a grid value
+    """
+    # Integers are excluded: 38 equals 38.0 but is formatted as '38'
+    return _BUCKETS.get(temperature) if isinstance(temperature, float) else None
+
+
+def temperature_buckets(temperatures: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Grid buckets of many temperatures
+
+    Args:
+        temperatures: 1-D array of temperatures
+
+    Returns:
+        Bucket index of each temperature, or None unless all are grid values
+    """
+    if temperatures.dtype != np.float64 or not len(temperatures):
+        return None
+    with np.errstate(invalid='ignore'):
+        in_range = (temperatures >= GRID_MIN) & (temperatures <= GRID_MAX)
+    if not in_range.all():
+        return None
+    buckets = np.rint((temperatures - GRID_MIN) * GRID_RESOLUTION).astype(np.intp)
+    if not np.array_equal(GRID_ARRAY[buckets], temperatures):
+        return None
+    return buckets
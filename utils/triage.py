@@ -0,0 +1,199 @@
+"""
+Triage Module
+=============
+
+Assembles /diagnose response payloads and runs them over streams of
+patient records (NDJSON or CSV) in fixed-size chunks for bulk re-scoring.
+"""
+
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+import csv
+import json
+import logging
+
+from .response_encoder import current_timestamp
+from .results import json_default
+
+logger = logging.getLogger(__name__)
+
+
+def build_diagnosis_payload(
+    diagnosis_engine,
+    diagnoses: list,
+    symptoms_data: dict,
+    temperature: float,
+    recommendations: dict
+) -> dict:
+    """
+    Assemble the diagnosis response for one patient
+
+    Args:
+        diagnosis_engine: Engine of the snapshot serving the request
+        diagnoses: Diagnoses limited to MAX_RESULTS
+        symptoms_data: Validated symptom data
+        temperature: Validated temperature
+        recommendations: Recommendations for the patient
+
+    Returns:
+        Response dictionary (without JSON encoding)
+    """
+    # Assess overall severity
+    overall_severity = diagnosis_engine.assess_overall_severity(
+        diagnoses, symptoms_data, temperature
+    )
+
+    # Calculate symptom summary
+    active_symptoms = [v for v in symptoms_data.values() if v > 0]
+    symptom_avg = sum(active_symptoms) / len(active_symptoms) if active_symptoms else 0
+
+    return {
+        'diagnoses': diagnoses,
+        'overall_severity': overall_severity,
+        'symptom_average': round(symptom_avg, 1),
+        'temperature': temperature,
+        'active_symptom_count': len(active_symptoms),
+        'recommendations': recommendations,
+        'timestamp': current_timestamp(),
+        'critical_warning': len(recommendations.get('immediate', [])) > 0
+    }
+
+
+def read_records(stream: TextIO, input_format: str = 'ndjson') -> Iterator[Any]:
+    """
+    Lazily parse patient records from a text stream
+
+    NDJSON lines that are not valid JSON are yielded as ValueError
+    instances so they are reported in place; blank lines are skipped. CSV
+    input needs a header row of field names; empty cells count as absent.
+
+    Args:
+        stream: Text stream to read
+        input_format: 'ndjson' or 'csv'
+
+    Yields:
+        One record (or ValueError) per input record
+    """
+    if input_format == 'csv':
+        for row in csv.DictReader(stream):
+            yield {field: value for field, value in row.items() if field and value not in ('', None)}
+        return
+
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"Invalid JSON: {e}")
+
+
+def chunked(records: Iterable[Any], chunk_size: int, start: int = 0) -> Iterator[Tuple[int, List[Any]]]:
+    """
+    Group records into (index of first record, records) chunks
+
+    Args:
+        records: Record iterator
+        chunk_size: Records per chunk
+        start: Index of the first record yielded by records
+
+    Yields:
+        Chunks of at most chunk_size records
+    """
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def triage_chunk(
+    engines,
+    start: int,
+    records: List[Any],
+    min_confidence: float,
+    top_k: Optional[int]
+) -> Tuple[List[str], int]:
+    """
+    Diagnose a chunk of records and encode one NDJSON line per record
+
+    Records are validated like /diagnose requests and the valid ones are
+    scored in a single batch. Invalid records produce an error line, so
+    output lines always correspond one-to-one with input records.
+
+    Args:
+        engines: EngineSnapshot to use
+        start: Index of the first record
+        records: Parsed records (ValueError for unparseable input)
+        min_confidence: Minimum confidence threshold
+        top_k: Diagnoses to keep per record
+
+    Returns:
+        Tuple of (NDJSON lines with trailing newline in record order,
+        number of invalid records)
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(records)
+    positions, symptoms_batch, temperatures = [], [], []
+
+    for position, record in enumerate(records):
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            if not isinstance(record, dict):
+                raise ValueError("Invalid input data: record must be an object")
+            temperature, symptoms_data = engines.validator.parse(record)
+        except ValueError as e:
+            results[position] = {'index': start + position, 'error': str(e)}
+            continue
+        positions.append(position)
+        symptoms_batch.append(symptoms_data)
+        temperatures.append(temperature)
+
+    diagnoses_batch = engines.diagnosis_engine.analyze_batch(
+        symptoms_batch, temperatures, min_confidence=min_confidence, top_k=top_k
+    )
+    recommendations_batch = engines.recommendation_engine.generate_batch(
+        diagnoses_batch, symptoms_batch, temperatures
+    )
+
+    for position, diagnoses, symptoms_data, temperature, recommendations in zip(
+        positions, diagnoses_batch, symptoms_batch, temperatures, recommendations_batch
+    ):
+        payload = build_diagnosis_payload(
+            engines.diagnosis_engine, diagnoses, symptoms_data, temperature, recommendations
+        )
+        results[position] = {'index': start + position, **payload}
+
+    lines = [
+        json.dumps(result, ensure_ascii=False, separators=(',', ':'), default=json_default) + '\n'
+        for result in results
+    ]
+    return lines, len(records) - len(positions)
+
+
+# Engines of a triage worker process, built once by init_worker
+_worker_engines = None
+
+
+def init_worker(data_dir, snapshot_path=None, **holder_options):
+    """Process pool initializer: load the knowledge base once per worker"""
+    global _worker_engines
+    from .data_loader import DataLoader
+    from .hot_reload import EngineHolder
+
+    holder = EngineHolder(
+        DataLoader(data_dir, diagnostics=False), cache_size=0, snapshot_path=snapshot_path, **holder_options
+    )
+    _worker_engines = holder.load()
+
+
+def triage_chunk_in_worker(
+    start: int,
+    records: List[Any],
+    min_confidence: float,
+    top_k: Optional[int]
+) -> Tuple[List[str], int]:
+    """Worker task: triage_chunk with the worker's engines"""
+    return triage_chunk(_worker_engines, start, records, min_confidence, top_k)
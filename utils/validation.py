@@ -0,0 +1,179 @@
+"""
+Input Validation Module
+=======================
+
+Validates /diagnose requests against the knowledge base's symptom
+vocabulary and parses them straight into compact symptom vectors.
+"""
+
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Any
+
+import numpy as np
+
+MAX_SYMPTOM_SEVERITY = 10
+DEFAULT_TEMPERATURE = 36.6
+
+
+class SymptomVector(Mapping):
+    """
+    Symptom severities stored as one signed byte per vocabulary entry
+
+    The first entries follow the scoring matrix's symptom order, so the
+    engine reads the buffer directly. It is also a read-only mapping of
+    symptom name to severity for rule code that looks symptoms up by name.
+    """
+
+    __slots__ = ('array', 'index')
+
+    def __init__(self, values: array, index: Dict[str, int]):
+        self.array = values
+        self.index = index
+
+    def __getitem__(self, symptom: str) -> int:
+        return self.array[self.index[symptom]]
+
+    def get(self, symptom: str, default: int = 0) -> int:
+        position = self.index.get(symptom)
+        return default if position is None else self.array[position]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def values(self) -> List[int]:
+        return self.array.tolist()
+
+    def as_numpy(self) -> np.ndarray:
+        """Zero-copy int8 view of the severities"""
+        return np.frombuffer(self.array, dtype=np.int8)
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(zip(self.index, self.array))
+
+
+class SymptomValidator:
+    """
+    Request validator generated from the symptom vocabulary
+
+    Accepts either the flat form used by the web form
+    ({"temperature": 38.5, "fever": 7, ...}) or a sparse form that lists
+    only non-zero symptoms ({"temperature": 38.5, "symptoms": {"fever": 7}}).
+    """
+
+    def __init__(
+        self,
+        symptom_names: Iterable[str],
+        min_temperature: float = 35.0,
+        max_temperature: float = 43.0
+    ):
+        self.symptom_names: Tuple[str, ...] = tuple(dict.fromkeys(symptom_names))
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.symptom_names)}
+        self.min_temperature = min_temperature
+        self.max_temperature = max_temperature
+        self._zeros = array('b', bytes(len(self.symptom_names)))
+
+    def parse(self, data: Dict[str, Any]) -> Tuple[float, SymptomVector]:
+        """
+        Validate a request and extract (temperature, symptom vector)
+
+        Args:
+            data: Request JSON data
+
+        Returns:
+            Tuple of (temperature, SymptomVector)
+
+        Raises:
+            ValueError: If the request is invalid
+        """
+        try:
+            if not isinstance(data, dict):
+                raise ValueError("request body must be a JSON object")
+
+            temperature = float(data.get('temperature', DEFAULT_TEMPERATURE))
+
+            # Validate temperature range
+            if not (self.min_temperature <= temperature <= self.max_temperature):
+                raise ValueError(
+                    f"Temperature must be between {self.min_temperature}°C and {self.max_temperature}°C"
+                )
+
+            values = array('b', self._zeros)
+            index = self.index
+
+            sparse = data.get('symptoms')
+            if sparse is not None:
+                if not isinstance(sparse, dict):
+                    raise ValueError("'symptoms' must be an object of symptom severities")
+                for symptom, raw in sparse.items():
+                    position = index.get(symptom)
+                    if position is None:
+                        raise ValueError(f"Unknown symptom '{symptom}'")
+                    values[position] = self._severity(symptom, raw)
+            else:
+                for symptom, position in index.items():
+                    if symptom in data:
+                        values[position] = self._severity(symptom, data[symptom])
+
+            return temperature, SymptomVector(values, index)
+
+        except (ValueError, TypeError, OverflowError) as e:
+            raise ValueError(f"Invalid input data: {str(e)}")
+
+    def parse_changes(self, data: Dict[str, Any]) -> Tuple[Optional[float], Dict[int, int]]:
+        """
+        Validate an incremental update: only the values that changed
+
+        Accepts {"fever": 7, "temperature": 38.9} or the sparse form
+        {"symptoms": {"fever": 7}, "temperature": 38.9}. Unlike parse, an
+        unknown symptom name is an error in both forms.
+
+        Args:
+            data: Request JSON data
+
+        Returns:
+            Tuple of (new temperature or None, {vector position: severity})
+
+        Raises:
+            ValueError: If the update is invalid
+        """
+        try:
+            if not isinstance(data, dict):
+                raise ValueError("request body must be a JSON object")
+
+            temperature = None
+            if 'temperature' in data:
+                temperature = float(data['temperature'])
+                if not (self.min_temperature <= temperature <= self.max_temperature):
+                    raise ValueError(
+                        f"Temperature must be between {self.min_temperature}°C and {self.max_temperature}°C"
+                    )
+
+            if 'symptoms' in data:
+                symptoms = data['symptoms']
+                if not isinstance(symptoms, dict):
+                    raise ValueError("'symptoms' must be an object of symptom severities")
+            else:
+                symptoms = {name: raw for name, raw in data.items() if name != 'temperature'}
+
+            changes = {}
+            for symptom, raw in symptoms.items():
+                position = self.index.get(symptom)
+                if position is None:
+                    raise ValueError(f"Unknown symptom '{symptom}'")
+                changes[position] = self._severity(symptom, raw)
+
+            return temperature, changes
+
+        except (ValueError, TypeError, OverflowError) as e:
+            raise ValueError(f"Invalid input data: {str(e)}")
+
+    @staticmethod
+    def _severity(symptom: str, raw: Any) -> int:
+        value = int(raw)
+        if not (0 <= value <= MAX_SYMPTOM_SEVERITY):
+            raise ValueError(f"Symptom '{symptom}' must be between 0 and {MAX_SYMPTOM_SEVERITY}")
+        return value